@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos índices por usuário.
+
+Cria um banco SQLite temporário com o esquema atual, remove os índices
+(simulando um app.db antigo), popula as tabelas e mede o plano de
+consulta e a latência das consultas das rotas antes e depois de aplicar
+as migrações.
+
+Uso: python benchmarks/bench_indexes.py [--rows 200000] [--users 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from src.models.user import db
+from src.models import financial  # noqa: F401  (registra as tabelas)
+from src.models.migrations import run_migrations
+
+QUERIES = {
+    'list_expenses': 'SELECT * FROM monthly_expense WHERE user_id = :user_id',
+    'owner_lookup': 'SELECT * FROM monthly_expense WHERE id = :id AND user_id = :user_id',
+    'list_investments': 'SELECT * FROM investment WHERE user_id = :user_id',
+    'list_projections': 'SELECT * FROM cash_flow_projection WHERE user_id = :user_id',
+    'list_api_keys': 'SELECT * FROM api_key WHERE user_id = :user_id'
+}
+
+INDEXES = (
+    'ix_api_key_user_id_id',
+    'ix_monthly_expense_user_id_id',
+    'ix_investment_user_id_id',
+    'ix_cash_flow_projection_user_id_id',
+    'ix_financial_profile_user_id'
+)
+
+def populate(engine, rows, users):
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(text('INSERT INTO user (id, username, email, password, access_key, is_active) '
+                                'VALUES (:id, :u, :e, :p, :k, 1)'),
+                           [{'id': i, 'u': f'user{i}', 'e': f'user{i}@example.com', 'p': 'x', 'k': f'{i:064x}'}
+                            for i in range(1, users + 1)])
+        connection.execute(text('INSERT INTO monthly_expense (user_id, category, description, amount, is_recurring) '
+                                'VALUES (:user_id, :category, :description, :amount, :is_recurring)'),
+                           [{'user_id': rng.randint(1, users), 'category': rng.choice(['food', 'rent', 'transport']),
+                             'description': 'bench', 'amount': rng.uniform(1, 500), 'is_recurring': rng.random() < .5}
+                            for _ in range(rows)])
+        for table in ('investment', 'cash_flow_projection', 'api_key'):
+            count = rows // 10
+            if table == 'investment':
+                sql = ('INSERT INTO investment (user_id, investment_type, name, amount, expected_return, risk_level) '
+                       "VALUES (:user_id, 'stocks', 'bench', 1000, 10, 'medium')")
+            elif table == 'cash_flow_projection':
+                sql = "INSERT INTO cash_flow_projection (user_id, projection_name, projection_data) VALUES (:user_id, 'bench', '[]')"
+            else:
+                sql = "INSERT INTO api_key (user_id, key_name, api_key, is_active) VALUES (:user_id, 'bench', 'secret', 1)"
+            connection.execute(text(sql), [{'user_id': rng.randint(1, users)} for _ in range(count)])
+
+def measure(engine, users, expense_ids, repeat):
+    rng = random.Random(7)
+    results = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            params = [{'user_id': rng.randint(1, users), 'id': rng.choice(expense_ids)} for _ in range(repeat)]
+            plan = connection.execute(text('EXPLAIN QUERY PLAN ' + sql), params[0]).fetchall()
+            start = time.perf_counter()
+            for p in params:
+                connection.execute(text(sql), p).fetchall()
+            elapsed = (time.perf_counter() - start) / repeat
+            results[name] = (' | '.join(row[-1] for row in plan), elapsed * 1000)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000, help='despesas a inserir')
+    parser.add_argument('--users', type=int, default=2_000)
+    parser.add_argument('--repeat', type=int, default=50, help='execuções por consulta')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            for index in INDEXES:
+                connection.execute(text(f'DROP INDEX IF EXISTS {index}'))
+        populate(engine, args.rows, args.users)
+        with engine.connect() as connection:
+            expense_ids = [row[0] for row in connection.execute(text('SELECT id FROM monthly_expense'))]
+
+        before = measure(engine, args.users, expense_ids, args.repeat)
+        start = time.perf_counter()
+        applied = run_migrations(engine)
+        migration_time = time.perf_counter() - start
+        after = measure(engine, args.users, expense_ids, args.repeat)
+
+    print(f'{args.rows} expenses, {args.users} users; migrations {applied} applied in {migration_time:.2f}s\n')
+    for name in QUERIES:
+        print(name)
+        print(f'  before: {before[name][1]:8.3f} ms  {before[name][0]}')
+        print(f'  after:  {after[name][1]:8.3f} ms  {after[name][0]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cliente de dados de mercado contra o servidor falso.
+
+Compara a busca serial antiga (requests.get sem sessão, uma chamada por
+vez) com MarketDataClient (sessão com pool, timeouts, retries e busca
+paralela), medindo ciclos de atualização completos: todas as séries do
+SGS mais as cotações dos símbolos. Imprime JSON com vazão e p50/p95/p99.
+
+Uso: python benchmarks/bench_market_client.py --latency 50 --jitter 20 --error-rate 0.02 --cycles 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import requests
+from fake_upstream import start_fake_upstream
+from src.utils.market_client import BCB_SERIES, MarketDataClient
+
+SYMBOLS = ['PETR4', 'VALE3', 'ITUB4', 'BBDC4', 'ABEV3', 'WEGE3', 'BBAS3', 'RENT3']
+
+def serial_cycle(base_url):
+    errors = 0
+    for code in BCB_SERIES.values():
+        try:
+            response = requests.get(f'{base_url}/dados/serie/bcdata.sgs.{code}/dados/ultimos/1?formato=json')
+            errors += response.status_code != 200
+        except requests.RequestException:
+            errors += 1
+    for symbol in SYMBOLS:
+        try:
+            response = requests.get(f'{base_url}/api/quote/{symbol}')
+            errors += response.status_code != 200
+        except requests.RequestException:
+            errors += 1
+    return errors
+
+def client_cycle(client):
+    return len(client.fetch_market_snapshot(symbols=SYMBOLS)['errors'])
+
+def run(name, cycle, cycles):
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for _ in range(cycles):
+        cycle_start = time.perf_counter()
+        errors += cycle()
+        latencies.append((time.perf_counter() - cycle_start) * 1000)
+    elapsed = time.perf_counter() - start
+    requests_per_cycle = len(BCB_SERIES) + len(SYMBOLS)
+    return {
+        'name': name,
+        'cycles': cycles,
+        'requests_per_second': round(cycles * requests_per_cycle / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 1),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 1),
+        'failed_requests': errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=50.0, help='latência média do servidor falso (ms)')
+    parser.add_argument('--jitter', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--cycles', type=int, default=20)
+    args = parser.parse_args()
+
+    server, url = start_fake_upstream(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    client = MarketDataClient(brapi_url=f'{url}/api', bcb_url=url, read_timeout=5, retries=2, backoff_factor=0.05)
+    try:
+        results = [
+            run('serial_requests_get', lambda: serial_cycle(url), args.cycles),
+            run('market_client', lambda: client_cycle(client), args.cycles)
+        ]
+    finally:
+        server.shutdown()
+
+    print(json.dumps({'config': vars(args), 'results': results}, indent=2))
+
+if __name__ == '__main__':
+    main()
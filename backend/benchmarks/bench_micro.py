@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks do cálculo das projeções e da serialização, sem banco
+nem rede.
+
+Casos:
+  cash_flow_legacy         laço anual original da rota de fluxo de caixa (30 anos)
+  cash_flow_yearly         project_cash_flow + to_rows, 30 anos, capitalização anual
+  cash_flow_monthly        project_cash_flow + to_rows, 30 anos, resolução mensal
+  cash_flow_grid           1000 cenários em uma chamada (30 anos)
+  codec_encode / _decode   projection_codec com a projeção mensal de 30 anos
+  monte_carlo              10.000 trajetórias de 30 anos (semente fixa)
+  goal_solver              1000 metas de cada tipo (aporte, prazo e retorno) em uma chamada
+  expense_to_dict          to_dict() de N despesas do ORM (objetos transientes)
+  expense_rows             as mesmas despesas como tuplas + RowSerializer
+
+Cada caso roda --repeat vezes (após um aquecimento) e o resultado sai em
+JSON com ops/s e p50/p95/p99 em ms, para comparar entre commits:
+
+  python benchmarks/bench_micro.py --output antes.json
+  python benchmarks/bench_micro.py --baseline antes.json
+
+Uso: python benchmarks/bench_micro.py [--repeat 50] [--rows 1000] [--only cash_flow,codec]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.models.financial import MonthlyExpense
+from src.utils import monte_carlo
+from src.utils.goal_solver import parse_goal, solve_goals
+from src.utils.projection_codec import decode_projection, encode_projection
+from src.utils.projection_engine import project_cash_flow, to_rows
+from src.utils.serialization import RowSerializer
+
+YEARS = 30
+PARAMS = {
+    'monthly_income': 12000.0,
+    'monthly_expenses': 7500.0,
+    'monthly_savings': 2500.0,
+    'inflation_rate': 0.045,
+    'investment_return': 0.10
+}
+CATEGORIES = ('Moradia', 'Alimentação', 'Transporte', 'Saúde', 'Lazer', 'Educação')
+
+def legacy_cash_flow(years, monthly_income, monthly_expenses, monthly_savings, inflation_rate, investment_return):
+    """
+    Cálculo anual da primeira versão da rota, mantido como referência
+    """
+    projections = []
+    current_savings = 0
+    for year in range(1, years + 1):
+        adjusted_expenses = monthly_expenses * ((1 + inflation_rate) ** year)
+        annual_income = monthly_income * 12 * ((1 + inflation_rate) ** year)
+        annual_expenses = adjusted_expenses * 12
+        annual_savings = monthly_savings * 12
+        current_savings = (current_savings + annual_savings) * (1 + investment_return)
+        projections.append({
+            'year': year,
+            'annual_income': round(annual_income, 2),
+            'annual_expenses': round(annual_expenses, 2),
+            'annual_savings': round(annual_savings, 2),
+            'accumulated_savings': round(current_savings, 2),
+            'net_cash_flow': round(annual_income - annual_expenses, 2)
+        })
+    return projections
+
+def make_expenses(rows):
+    created_at = datetime(2024, 1, 1)
+    return [
+        MonthlyExpense(id=i, user_id=1, category=CATEGORIES[i % len(CATEGORIES)], description=f'Despesa {i}',
+                       amount=round(10 + (i * 37) % 490 + i % 100 / 100, 2), is_recurring=i % 2 == 0,
+                       created_at=created_at + timedelta(minutes=i))
+        for i in range(1, rows + 1)
+    ]
+
+def build_cases(rows):
+    """
+    Nome -> função sem argumentos a ser medida
+    """
+    monthly_rows = to_rows(project_cash_flow(YEARS, compounding='monthly', resolution='monthly', **PARAMS),
+                           resolution='monthly')
+    blob = encode_projection(monthly_rows)
+    grid_returns = np.linspace(0.02, 0.15, 1000)
+    goals = [
+        parse_goal({'solve': solve, 'target': 1_000_000 + 1000 * index, 'years': YEARS,
+                    'monthly_savings': PARAMS['monthly_savings'], 'target_basis': 'real'})
+        for solve in ('savings', 'years', 'return')
+        for index in range(1000)
+    ]
+
+    expenses = make_expenses(rows)
+    columns = MonthlyExpense.list_columns()
+    tuples = [tuple(getattr(expense, column.key) for column in columns) for expense in expenses]
+    serializer = RowSerializer(columns)
+    assert serializer.rows(tuples) == [expense.to_dict() for expense in expenses]
+
+    return {
+        'cash_flow_legacy': lambda: legacy_cash_flow(YEARS, **PARAMS),
+        'cash_flow_yearly': lambda: to_rows(project_cash_flow(YEARS, **PARAMS)),
+        'cash_flow_monthly': lambda: to_rows(
+            project_cash_flow(YEARS, compounding='monthly', resolution='monthly', **PARAMS), resolution='monthly'
+        ),
+        'cash_flow_grid': lambda: project_cash_flow(YEARS, **{**PARAMS, 'investment_return': grid_returns}),
+        'codec_encode': lambda: encode_projection(monthly_rows),
+        'codec_decode': lambda: decode_projection(blob),
+        'monte_carlo': lambda: monte_carlo.simulate(YEARS, paths=10_000, monthly_savings=PARAMS['monthly_savings'],
+                                                    seed=42),
+        'goal_solver': lambda: solve_goals(goals),
+        'expense_to_dict': lambda: [expense.to_dict() for expense in expenses],
+        'expense_rows': lambda: serializer.rows(tuples)
+    }
+
+def measure(function, repeat, warmup):
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'ops_per_second': round(1000 * repeat / sum(timings), 1),
+        'p50_ms': round(float(np.percentile(timings, 50)), 4),
+        'p95_ms': round(float(np.percentile(timings, 95)), 4),
+        'p99_ms': round(float(np.percentile(timings, 99)), 4)
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline):
+    """
+    Variação do p50 de cada caso em relação a um resultado anterior (%)
+    """
+    previous = baseline.get('results', {})
+    return {
+        name: round((result['p50_ms'] / previous[name]['p50_ms'] - 1) * 100, 1)
+        for name, result in results.items()
+        if previous.get(name, {}).get('p50_ms')
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=1000, help='despesas serializadas por chamada')
+    parser.add_argument('--only', default='', help='prefixos dos casos, separados por vírgula')
+    parser.add_argument('--output', help='grava o JSON também neste arquivo')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior, para comparar o p50')
+    args = parser.parse_args()
+
+    prefixes = [prefix for prefix in args.only.split(',') if prefix]
+    results = {}
+    for name, function in build_cases(args.rows).items():
+        if prefixes and not any(name.startswith(prefix) for prefix in prefixes):
+            continue
+        results[name] = measure(function, args.repeat, args.warmup)
+
+    report = {
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'repeat': args.repeat,
+        'rows': args.rows,
+        'results': results
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            report['p50_change_percent'] = compare(results, json.load(baseline))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização das listagens.
+
+Popula um banco SQLite temporário com N despesas de um usuário e mede o
+tempo para gerar o corpo da resposta de GET /financial/expenses:
+
+  orm_stdlib   objetos do ORM + to_dict() + JSON padrão do Flask (caminho antigo)
+  rows_stdlib  tuplas das colunas + conversão em lote + JSON padrão
+  orm_orjson   objetos do ORM + to_dict() + orjson
+  rows_orjson  tuplas das colunas + conversão em lote + orjson
+
+As variantes com orjson só rodam com o pacote instalado. Todas devem
+gerar o mesmo JSON (conferido antes de medir). Imprime JSON com p50/p95.
+
+Uso: python benchmarks/bench_serialization.py [--rows 10000] [--repeat 30]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import text
+from src.models.user import db
+from src.models.financial import MonthlyExpense
+from src.utils.serialization import OrjsonProvider, orjson, row_serializer
+
+def populate(rows):
+    rng = random.Random(42)
+    db.session.execute(text("INSERT INTO user (id, username, email, password, access_key, is_active) "
+                            "VALUES (1, 'bench', 'bench@example.com', 'x', :key, 1)"), {'key': '0' * 64})
+    db.session.execute(text('INSERT INTO monthly_expense (user_id, category, description, amount, is_recurring, created_at) '
+                            'VALUES (1, :category, :description, :amount, :is_recurring, CURRENT_TIMESTAMP)'),
+                       [{'category': rng.choice(['Moradia', 'Alimentação', 'Transporte', 'Saúde']),
+                         'description': f'Despesa {i}', 'amount': round(rng.uniform(1, 500), 2),
+                         'is_recurring': rng.random() < .5}
+                        for i in range(rows)])
+    db.session.commit()
+
+def orm_body():
+    expenses = MonthlyExpense.query.filter_by(user_id=1).order_by(MonthlyExpense.id).all()
+    return jsonify([expense.to_dict() for expense in expenses]).get_data()
+
+def rows_body(app):
+    columns = MonthlyExpense.list_columns()
+    rows = MonthlyExpense.query.filter_by(user_id=1).order_by(MonthlyExpense.id).with_entities(*columns).all()
+    return jsonify(row_serializer(columns, app.json).rows(rows)).get_data()
+
+def measure(app, body, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        data = body()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': round(float(np.percentile(timings, 50)), 2),
+        'p95_ms': round(float(np.percentile(timings, 95)), 2),
+        'bytes': len(data)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        db.init_app(app)
+        providers = {'stdlib': DefaultJSONProvider(app)}
+        if orjson is not None:
+            providers['orjson'] = OrjsonProvider(app)
+
+        with app.app_context():
+            db.create_all()
+            populate(args.rows)
+
+            results = {}
+            reference = None
+            for provider_name, provider in providers.items():
+                app.json = provider
+                for path, body in (('orm', orm_body), ('rows', lambda: rows_body(app))):
+                    output = json.loads(body())
+                    if reference is None:
+                        reference = output
+                    assert output == reference, f'{path}_{provider_name} differs from orm_stdlib'
+                    results[f'{path}_{provider_name}'] = measure(app, body, args.repeat)
+
+        baseline = results['orm_stdlib']['p50_ms']
+        for result in results.values():
+            result['speedup'] = round(baseline / result['p50_ms'], 2)
+        print(json.dumps({'rows': args.rows, 'repeat': args.repeat, 'results': results}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência no SQLite entre processos (como workers do
+gunicorn).
+
+Vários processos gravam despesas (um commit por gravação, como
+add_expense) enquanto outros leem a listagem de um usuário, durante um
+tempo fixo, em dois modos:
+
+  legacy  create_engine com a URL pura: journal padrão (DELETE), sem PRAGMAs
+  tuned   a configuração de utils/database: WAL, busy_timeout,
+          synchronous=NORMAL, cache/mmap, leitores com query_only
+
+Imprime JSON com vazão, p50/p95/p99 e erros ('database is locked') de
+gravações e leituras em cada modo.
+
+Uso: python benchmarks/bench_sqlite_contention.py [--writers 4] [--readers 4] [--seconds 10]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.models import financial  # noqa: F401  (registra as tabelas)
+from src.utils.database import apply_sqlite_pragmas, create_read_engine, engine_options, sqlite_pragmas
+
+USERS = 50
+SEED_ROWS = 20000
+
+INSERT_EXPENSE = text(
+    'INSERT INTO monthly_expense (user_id, category, description, amount, is_recurring, created_at) '
+    "VALUES (:user_id, 'bench', 'contention', :amount, 1, CURRENT_TIMESTAMP)"
+)
+LIST_EXPENSES = text('SELECT * FROM monthly_expense WHERE user_id = :user_id ORDER BY id LIMIT 500')
+
+def make_engine(url, mode, role):
+    if mode == 'legacy':
+        return create_engine(url)
+    if role == 'reader':
+        return create_read_engine(url, {})
+    engine = create_engine(url, **engine_options(url, {}))
+    apply_sqlite_pragmas(engine, sqlite_pragmas({}))
+    return engine
+
+def prepare(url):
+    engine = create_engine(url)
+    db.metadata.create_all(engine)
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(text('INSERT INTO user (id, username, email, password, access_key, is_active) '
+                                'VALUES (:id, :u, :e, :p, :k, 1)'),
+                           [{'id': i, 'u': f'user{i}', 'e': f'user{i}@example.com', 'p': 'x', 'k': f'{i:064x}'}
+                            for i in range(1, USERS + 1)])
+        connection.execute(INSERT_EXPENSE, [{'user_id': rng.randint(1, USERS), 'amount': rng.uniform(1, 500)}
+                                            for _ in range(SEED_ROWS)])
+    engine.dispose()
+
+def worker(url, mode, role, seconds, start_at, results):
+    engine = make_engine(url, mode, role)
+    rng = random.Random(os.getpid())
+    latencies, errors = [], 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        user_id = rng.randint(1, USERS)
+        start = time.perf_counter()
+        try:
+            if role == 'writer':
+                with engine.begin() as connection:
+                    connection.execute(INSERT_EXPENSE, {'user_id': user_id, 'amount': rng.uniform(1, 500)})
+            else:
+                with engine.connect() as connection:
+                    connection.execute(LIST_EXPENSES, {'user_id': user_id}).fetchall()
+            latencies.append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    results.put((role, latencies, errors))
+
+def summarize(latencies, errors, seconds):
+    if not latencies:
+        return {'ops_per_second': 0, 'errors': errors}
+    return {
+        'ops_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        'errors': errors
+    }
+
+def run(mode, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        prepare(url)
+        results = multiprocessing.Queue()
+        start_at = time.time() + 1.0
+        processes = [
+            multiprocessing.Process(target=worker, args=(url, mode, role, seconds, start_at, results))
+            for role in ['writer'] * writers + ['reader'] * readers
+        ]
+        for process in processes:
+            process.start()
+        collected = {'writer': ([], 0), 'reader': ([], 0)}
+        for _ in processes:
+            role, latencies, errors = results.get()
+            previous_latencies, previous_errors = collected[role]
+            collected[role] = (previous_latencies + latencies, previous_errors + errors)
+        for process in processes:
+            process.join()
+    return {
+        'writes': summarize(*collected['writer'], seconds),
+        'reads': summarize(*collected['reader'], seconds)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--modes', default='legacy,tuned')
+    args = parser.parse_args()
+
+    report = {'writers': args.writers, 'readers': args.readers, 'seconds': args.seconds, 'modes': {}}
+    for mode in args.modes.split(','):
+        report['modes'][mode] = run(mode, args.writers, args.readers, args.seconds)
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
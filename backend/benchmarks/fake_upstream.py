@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Servidor falso dos provedores de mercado (SGS do Banco Central e brapi),
+para testes e benchmarks offline, com latência e erros injetáveis.
+
+Rotas:
+  /dados/serie/bcdata.sgs.<código>/dados/ultimos/<n>   -> últimos n pontos
+  /dados/serie/bcdata.sgs.<código>/dados               -> pontos entre dataInicial e dataFinal
+  /api/quote/<símbolo>[?range=1y]                      -> cotação (e histórico) no formato da brapi
+  /api/available                                       -> universo de símbolos no formato da brapi
+
+Uso: python benchmarks/fake_upstream.py --port 8765 --latency 50 --jitter 20 --error-rate 0.05
+Depois aponte o backend para ele com
+  BCB_API_URL=http://127.0.0.1:8765 BRAPI_BASE_URL=http://127.0.0.1:8765/api
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_SERIES_PATH = re.compile(r'^/dados/serie/bcdata\.sgs\.(\d+)/dados(?:/ultimos/(\d+))?/?$')
+_QUOTE_PATH = re.compile(r'^/api/quote/([A-Za-z0-9.,]+)/?$')
+
+# Primeiro dia das séries simuladas
+SERIES_START = date(2000, 1, 1)
+
+def series_value(code, day):
+    """
+    Valor determinístico de uma série em um dia (mesma entrada, mesmo valor)
+    """
+    seed = zlib.crc32(f'{code}:{day.isoformat()}'.encode())
+    return round(0.2 + (code % 97) / 10 + (seed % 1000) / 1000, 4)
+
+def series_points(code, start, end):
+    monthly = code in (433, 13522)
+    points = []
+    day = start
+    while day <= end:
+        if not monthly or day.day == 1:
+            points.append({'data': day.strftime('%d/%m/%Y'), 'valor': str(series_value(code, day))})
+        day += timedelta(days=1)
+    return points
+
+HISTORY_DAYS = {'5d': 5, '1mo': 30, '3mo': 90, '6mo': 180, '1y': 365, '2y': 730, '5y': 1825, '10y': 3650, 'max': 7300}
+
+def quote(symbol, history_range=None):
+    seed = zlib.crc32(symbol.encode())
+    price = round(5 + seed % 10000 / 100, 2)
+    change = round((seed % 200 - 100) / 100, 2)
+    result = {
+        'symbol': symbol.upper(),
+        'regularMarketPrice': price,
+        'regularMarketChange': change,
+        'regularMarketChangePercent': round(change / price * 100, 2)
+    }
+    if history_range:
+        today = date.today()
+        days = [today - timedelta(days=offset) for offset in range(HISTORY_DAYS.get(history_range, 365), -1, -1)]
+        result['historicalDataPrice'] = [
+            {
+                'date': int(datetime(day.year, day.month, day.day, 13).timestamp()),
+                'close': round(price * (1 + (series_value(seed % 1000, day) - 5) / 100), 2)
+            }
+            for day in days if day.weekday() < 5
+        ]
+    return result
+
+def available_symbols(count=2000):
+    """
+    Universo determinístico de símbolos no formato da B3 (4 letras + classe)
+    """
+    rng = random.Random(count)
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    symbols = {'PETR4', 'VALE3', 'ITUB4', 'BBDC4'}
+    while len(symbols) < count:
+        symbols.add(''.join(rng.choice(letters) for _ in range(4)) + rng.choice(('3', '4', '11')))
+    return sorted(symbols)
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        config = self.server.config
+        delay = max(0.0, config['latency'] + random.uniform(-config['jitter'], config['jitter'])) / 1000
+        if random.random() < config['hang_rate']:
+            delay = config['hang_seconds']
+        time.sleep(delay)
+
+        if random.random() < config['error_rate']:
+            return self._send(503, {'error': 'injected failure'})
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        match = _SERIES_PATH.match(url.path)
+        if match:
+            code = int(match.group(1))
+            today = date.today()
+            if match.group(2):
+                last = int(match.group(2))
+                points = series_points(code, today - timedelta(days=last * 40), today)[-last:]
+            else:
+                start = _parse_date(params.get('dataInicial', [None])[0]) or SERIES_START
+                end = _parse_date(params.get('dataFinal', [None])[0]) or today
+                points = series_points(code, start, min(end, today))
+            return self._send(200, points)
+
+        match = _QUOTE_PATH.match(url.path)
+        if match:
+            history_range = params.get('range', [None])[0]
+            return self._send(200, {'results': [quote(symbol, history_range) for symbol in match.group(1).split(',')]})
+
+        if url.path.rstrip('/') == '/api/available':
+            return self._send(200, {'indexes': ['^BVSP'], 'stocks': available_symbols(config['symbols'])})
+
+        return self._send(404, {'error': 'not found'})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def _parse_date(value):
+    return datetime.strptime(value, '%d/%m/%Y').date() if value else None
+
+def start_fake_upstream(host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                        hang_rate=0.0, hang_seconds=30.0, symbols=2000):
+    """
+    Inicia o servidor em uma thread e retorna (servidor, url base).
+    Latência e jitter em milissegundos.
+    """
+    server = ThreadingHTTPServer((host, port), FakeUpstreamHandler)
+    server.daemon_threads = True
+    server.config = {
+        'latency': latency,
+        'jitter': jitter,
+        'error_rate': error_rate,
+        'hang_rate': hang_rate,
+        'hang_seconds': hang_seconds,
+        'symbols': symbols
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='latência média (ms)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='variação da latência (ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fração de respostas 503')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='fração de respostas que travam')
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    parser.add_argument('--symbols', type=int, default=2000, help='tamanho do universo de símbolos')
+    args = parser.parse_args()
+
+    server, url = start_fake_upstream(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                                      args.hang_rate, args.hang_seconds, args.symbols)
+    print(f'Fake upstream listening on {url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
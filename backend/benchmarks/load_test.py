@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Teste de carga HTTP da API, totalmente offline.
+
+Sobe o servidor falso dos provedores de mercado (fake_upstream) e, a
+menos que --url seja informado, a aplicação em um processo separado
+(servidor threaded do werkzeug) com um banco SQLite temporário. Em
+seguida:
+
+  1. cadastra --users usuários e importa, para cada um, --expenses
+     despesas e --investments investimentos (via /financial/import/*);
+  2. dispara --processes processos geradores, cada um com sua sessão
+     HTTP, que durante --seconds segundos sorteiam ações ponderadas
+     (ACTIONS) em nome de usuários aleatórios: autenticação, CRUD de
+     despesas e investimentos, análises, projeções e mercado;
+  3. imprime JSON com a vazão e p50/p95/p99 por endpoint.
+
+Login e as rotas de perfil não entram na mistura: dependem de
+User.check_password e User.financial_profile, que ainda não existem no
+modelo. O tráfego de autenticação é feito com /auth/validate e novos
+cadastros.
+
+Para comparar commits, grave o resultado e passe-o como --baseline na
+execução seguinte (a variação do p95 de cada endpoint sai em
+'p95_change_percent'):
+
+  python benchmarks/load_test.py --output antes.json
+  python benchmarks/load_test.py --baseline antes.json
+
+Uso: python benchmarks/load_test.py [--users 20] [--processes 4] [--seconds 30] [--url http://127.0.0.1:5000]
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import requests
+from fake_upstream import start_fake_upstream
+
+CATEGORIES = ('Moradia', 'Alimentação', 'Transporte', 'Saúde', 'Lazer', 'Educação', 'Assinaturas')
+INVESTMENT_TYPES = (('Renda Fixa', 'low', 10.5), ('Tesouro Direto', 'low', 11.0), ('Ações', 'high', 14.0),
+                    ('Fundos Imobiliários', 'medium', 9.0), ('Criptomoedas', 'high', 20.0))
+SYMBOLS = ('PETR4', 'VALE3', 'ITUB4', 'BBDC4', 'ABEV3', 'WEGE3', 'BBAS3', 'RENT3')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def run_server(port, env):
+    """
+    Processo da aplicação: configura o ambiente antes de importar src.main
+    """
+    os.environ.update(env)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    from werkzeug.serving import make_server
+    from src.main import app
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+def wait_healthy(base_url, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{base_url}/api/health', timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f'Server at {base_url} did not become healthy')
+
+def expenses_csv(rng, count):
+    lines = ['category,description,amount,is_recurring']
+    for i in range(count):
+        lines.append(f'{rng.choice(CATEGORIES)},Despesa {i},{rng.lognormvariate(4.5, 1.0):.2f},'
+                     f'{"true" if rng.random() < .6 else "false"}')
+    return '\n'.join(lines) + '\n'
+
+def investments_csv(rng, count):
+    lines = ['investment_type,name,amount,expected_return,risk_level']
+    for i in range(count):
+        investment_type, risk_level, expected_return = rng.choice(INVESTMENT_TYPES)
+        lines.append(f'{investment_type},Ativo {i},{rng.lognormvariate(8.5, 1.2):.2f},'
+                     f'{expected_return + rng.uniform(-2, 2):.2f},{risk_level}')
+    return '\n'.join(lines) + '\n'
+
+def register(session, base_url, username):
+    response = session.post(f'{base_url}/api/auth/register', timeout=30,
+                            json={'username': username, 'email': f'{username}@example.com', 'password': 'secret'})
+    response.raise_for_status()
+    return response.json()['user']['access_key']
+
+def seed(base_url, users, expenses, investments, run_id):
+    """
+    Cadastra os usuários com volumes realistas de despesas e investimentos;
+    retorna as chaves de acesso
+    """
+    rng = random.Random(42)
+    keys = []
+    with requests.Session() as session:
+        for i in range(users):
+            key = register(session, base_url, f'load-{run_id}-{i}')
+            headers = {'Authorization': f'Bearer {key}'}
+            for kind, content in (('expenses', expenses_csv(rng, rng.randint(expenses // 2, expenses))),
+                                  ('investments', investments_csv(rng, rng.randint(investments // 2, investments)))):
+                response = session.post(f'{base_url}/api/financial/import/{kind}', headers=headers, timeout=60,
+                                        files={'file': (f'{kind}.csv', io.BytesIO(content.encode()), 'text/csv')})
+                response.raise_for_status()
+            keys.append(key)
+    return keys
+
+class Client:
+    """
+    Estado de um processo gerador: sessão HTTP, chaves dos usuários e os
+    ids criados (para que as remoções apaguem o que o próprio teste gravou)
+    """
+
+    def __init__(self, base_url, keys, seed):
+        self.base_url = base_url
+        self.keys = keys
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.created = defaultdict(list)
+        self.registrations = 0
+        self.seed = seed
+
+    def request(self, method, path, key=None, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if key is not None:
+            headers['Authorization'] = f'Bearer {key}'
+        return self.session.request(method, f'{self.base_url}{path}', headers=headers, timeout=60, **kwargs)
+
+def auth_validate(client, key):
+    return client.request('GET', '/api/auth/validate', key)
+
+def auth_register(client, key):
+    client.registrations += 1
+    username = f'load-new-{client.seed}-{client.registrations}-{client.rng.getrandbits(32):08x}'
+    return client.request('POST', '/api/auth/register',
+                          json={'username': username, 'email': f'{username}@example.com', 'password': 'secret'})
+
+def expenses_list(client, key):
+    return client.request('GET', '/api/financial/expenses', key, params={'limit': 100})
+
+def expenses_add(client, key):
+    response = client.request('POST', '/api/financial/expenses', key, json={
+        'category': client.rng.choice(CATEGORIES),
+        'description': 'Carga',
+        'amount': round(client.rng.lognormvariate(4.5, 1.0), 2),
+        'is_recurring': client.rng.random() < .5
+    })
+    if response.status_code == 201:
+        client.created[('expenses', key)].append(response.json()['expense']['id'])
+    return response
+
+def expenses_delete(client, key):
+    created = client.created[('expenses', key)]
+    if not created:
+        return expenses_add(client, key)
+    return client.request('DELETE', f'/api/financial/expenses/{created.pop()}', key)
+
+def expenses_analytics(client, key):
+    return client.request('GET', '/api/financial/expenses/analytics', key)
+
+def investments_list(client, key):
+    return client.request('GET', '/api/financial/investments', key, params={'limit': 100})
+
+def investments_add(client, key):
+    investment_type, risk_level, expected_return = client.rng.choice(INVESTMENT_TYPES)
+    return client.request('POST', '/api/financial/investments', key, json={
+        'investment_type': investment_type,
+        'name': 'Carga',
+        'amount': round(client.rng.lognormvariate(8.5, 1.2), 2),
+        'expected_return': expected_return,
+        'risk_level': risk_level
+    })
+
+def portfolio_summary(client, key):
+    return client.request('GET', '/api/financial/portfolio/summary', key)
+
+def projections_cash_flow(client, key):
+    return client.request('POST', '/api/financial/projections/cash-flow', key, json={
+        'years': client.rng.choice([10, 20, 30]),
+        'monthly_income': round(client.rng.uniform(3000, 30000), 2),
+        'monthly_expenses': round(client.rng.uniform(2000, 15000), 2),
+        'monthly_savings': round(client.rng.uniform(200, 5000), 2),
+        'inflation_rate': 4.5,
+        'investment_return': client.rng.choice([8.0, 10.0, 12.0])
+    })
+
+def projections_list(client, key):
+    return client.request('GET', '/api/financial/projections', key, params={'limit': 20})
+
+def projections_monte_carlo(client, key):
+    return client.request('POST', '/api/financial/projections/monte-carlo', key, json={
+        'years': 20,
+        'paths': 2000,
+        'monthly_savings': round(client.rng.uniform(200, 5000), 2),
+        'seed': client.rng.getrandbits(31)
+    })
+
+def market_interest_rates(client, key):
+    return client.request('GET', '/api/market/interest-rates', key)
+
+def market_stocks(client, key):
+    return client.request('GET', '/api/market/investments/stocks', key)
+
+def market_quotes_batch(client, key):
+    return client.request('POST', '/api/market/quotes/batch', key,
+                          json={'symbols': client.rng.sample(SYMBOLS, 4)})
+
+def dashboard(client, key):
+    return client.request('GET', '/api/dashboard', key)
+
+# Nome do endpoint -> (ação, peso na mistura)
+ACTIONS = {
+    'GET /auth/validate': (auth_validate, 8),
+    'POST /auth/register': (auth_register, 1),
+    'GET /financial/expenses': (expenses_list, 10),
+    'POST /financial/expenses': (expenses_add, 6),
+    'DELETE /financial/expenses/<id>': (expenses_delete, 4),
+    'GET /financial/expenses/analytics': (expenses_analytics, 6),
+    'GET /financial/investments': (investments_list, 6),
+    'POST /financial/investments': (investments_add, 2),
+    'GET /financial/portfolio/summary': (portfolio_summary, 6),
+    'POST /financial/projections/cash-flow': (projections_cash_flow, 6),
+    'GET /financial/projections': (projections_list, 4),
+    'POST /financial/projections/monte-carlo': (projections_monte_carlo, 2),
+    'GET /market/interest-rates': (market_interest_rates, 5),
+    'GET /market/investments/stocks': (market_stocks, 5),
+    'POST /market/quotes/batch': (market_quotes_batch, 4),
+    'GET /dashboard': (dashboard, 8)
+}
+
+def worker(base_url, keys, actions, seconds, start_at, seed, results):
+    client = Client(base_url, keys, seed)
+    names = list(actions)
+    weights = [ACTIONS[name][1] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        name = client.rng.choices(names, weights)[0]
+        key = client.rng.choice(keys)
+        start = time.perf_counter()
+        try:
+            response = ACTIONS[name][0](client, key)
+            failed = response.status_code >= 400
+        except (requests.RequestException, ValueError):
+            failed = True
+        latencies[name].append((time.perf_counter() - start) * 1000)
+        if failed:
+            errors[name] += 1
+    client.session.close()
+    results.put((dict(latencies), dict(errors)))
+
+def summarize(latencies, errors, seconds):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'mean_ms': round(float(np.mean(latencies)), 2),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2)
+    }
+
+def run_load(base_url, keys, actions, processes, seconds):
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1.0
+    workers = [
+        multiprocessing.Process(target=worker, args=(base_url, keys, actions, seconds, start_at, 1000 + i, results))
+        for i in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    for _ in workers:
+        worker_latencies, worker_errors = results.get()
+        for name, values in worker_latencies.items():
+            latencies[name].extend(values)
+        for name, count in worker_errors.items():
+            errors[name] += count
+    for process in workers:
+        process.join()
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        'total': summarize(everything, sum(errors.values()), seconds) if everything else {},
+        'endpoints': {name: summarize(latencies[name], errors[name], seconds) for name in sorted(latencies)}
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(report, baseline):
+    """
+    Variação do p95 de cada endpoint em relação a um resultado anterior (%)
+    """
+    previous = baseline.get('endpoints', {})
+    return {
+        name: round((result['p95_ms'] / previous[name]['p95_ms'] - 1) * 100, 1)
+        for name, result in report['endpoints'].items()
+        if previous.get(name, {}).get('p95_ms')
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='API já em execução (sem ela, sobe a aplicação com um banco temporário)')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--expenses', type=int, default=300, help='máximo de despesas importadas por usuário')
+    parser.add_argument('--investments', type=int, default=30, help='máximo de investimentos importados por usuário')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--only', default='', help='prefixos dos endpoints da mistura, separados por vírgula')
+    parser.add_argument('--latency', type=float, default=20.0, help='latência do servidor de mercado falso (ms)')
+    parser.add_argument('--output', help='grava o JSON também neste arquivo')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior, para comparar o p95')
+    args = parser.parse_args()
+
+    prefixes = [prefix for prefix in args.only.split(',') if prefix]
+    actions = [name for name in ACTIONS if not prefixes or any(name.startswith(prefix) for prefix in prefixes)]
+    if not actions:
+        parser.error('--only did not match any endpoint')
+
+    upstream, upstream_url = start_fake_upstream(latency=args.latency, jitter=args.latency / 4)
+    server = None
+    with tempfile.TemporaryDirectory() as directory:
+        base_url = args.url
+        if base_url is None:
+            port = free_port()
+            env = {
+                'DATABASE_URL': f"sqlite:///{os.path.join(directory, 'load.db')}",
+                'MARKET_CACHE_PATH': os.path.join(directory, 'market_cache.json'),
+                'BCB_API_URL': upstream_url,
+                'BRAPI_BASE_URL': f'{upstream_url}/api'
+            }
+            server = multiprocessing.get_context('spawn').Process(target=run_server, args=(port, env), daemon=True)
+            server.start()
+            base_url = f'http://127.0.0.1:{port}'
+        try:
+            wait_healthy(base_url)
+            started = time.perf_counter()
+            keys = seed(base_url, args.users, args.expenses, args.investments, run_id=f'{os.getpid()}{int(time.time())}')
+            seed_seconds = time.perf_counter() - started
+            report = run_load(base_url, keys, actions, args.processes, args.seconds)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.join()
+            upstream.shutdown()
+
+    report = {
+        'commit': git_commit(),
+        'config': {
+            'url': args.url,
+            'users': args.users,
+            'expenses': args.expenses,
+            'investments': args.investments,
+            'processes': args.processes,
+            'seconds': args.seconds,
+            'upstream_latency_ms': args.latency,
+            'seed_seconds': round(seed_seconds, 2)
+        },
+        **report
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            report['p95_change_percent'] = compare(report, json.load(baseline))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,36 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+import click
+import hmac
+import threading
+from flask import Flask, Response, request, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
-from src.models.financial import ApiKey, FinancialProfile, MonthlyExpense, Investment, CashFlowProjection
+from src.models.financial import (
+    ApiKey, FinancialProfile, MonthlyExpense, Investment, CashFlowProjection, PortfolioAggregate, ResourceVersion
+)
+from src.models.market import TimeSeriesChunk
+from src.models.job import Job
+from src.models.migrations import run_migrations
 from src.routes.user import user_bp
-from src.routes.auth import auth_bp
+from src.routes.auth import access_key_cache, auth_bp
 from src.routes.financial import financial_bp
 from src.routes.market import market_bp
+from src.routes.dashboard import dashboard_bp
+from src.routes.debug import debug_bp
+from src.routes.jobs import jobs_bp
+from src.utils.compression import init_compression
+from src.utils.database import configure_database
+from src.utils.expense_analytics import analytics_cache
+from src.utils.jobs import job_queue
+from src.utils.metrics import CONTENT_TYPE, cache_collector, init_metrics, market_collector, registry
+from src.utils.serialization import create_json_provider
+from src.utils.market_cache import market_cache
+from src.utils.portfolio import recompute_aggregates
+from src.utils.profiling import init_profiling
+from src.utils.projection_cache import projection_cache
+from src.utils.quote_store import quote_store
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -18,19 +40,80 @@ app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 # Configurar CORS para permitir requisições do frontend
 CORS(app, origins=['*'])
 
+# JSON com orjson quando instalado (JSON_PROVIDER=stdlib desliga)
+app.json = create_json_provider(app)
+
+# Métricas por rota e do banco (antes da compressão, para que a latência a inclua)
+init_metrics(app)
+registry.register_collector(cache_collector({
+    'auth': access_key_cache,
+    'expense_analytics': analytics_cache,
+    'projections': projection_cache
+}))
+registry.register_collector(market_collector(market_cache, quote_store))
+
+# Perfis por amostragem e consultas lentas (ver utils/profiling)
+init_profiling(app)
+
+# Compressão gzip/brotli das respostas grandes
+init_compression(app)
+
 # Registrar blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(financial_bp, url_prefix='/api/financial')
 app.register_blueprint(market_bp, url_prefix='/api/market')
+app.register_blueprint(dashboard_bp, url_prefix='/api')
+app.register_blueprint(debug_bp, url_prefix='/api/debug')
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Configuração do banco de dados (DATABASE_URL, pool e PRAGMAs do SQLite;
+# ver utils/database)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+configure_database(app, db)
 
 with app.app_context():
     db.create_all()
+    run_migrations(db.engine)
+
+# Último snapshot dos dados de mercado
+market_cache.load_snapshot()
+
+_background_lock = threading.Lock()
+_background_started = False
+
+@app.before_request
+def start_background_threads():
+    """
+    Atualização dos dados de mercado (desligue com MARKET_REFRESHER=0) e
+    workers da fila de tarefas (JOB_WORKERS=0: este processo só enfileira).
+    Sobem na primeira requisição, no processo que a atende (depois do fork
+    dos workers do gunicorn), e não nos comandos da CLI.
+    """
+    global _background_started
+    if _background_started:
+        return
+    with _background_lock:
+        if not _background_started:
+            if os.environ.get('MARKET_REFRESHER', '1') != '0':
+                market_cache.start()
+            if job_queue.workers:
+                job_queue.start(app)
+            _background_started = True
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Aplica as migrações de esquema pendentes."""
+    applied = run_migrations(db.engine)
+    click.echo(f'Applied migrations: {applied}' if applied else 'Schema is up to date')
+
+@app.cli.command('recompute-portfolios')
+@click.option('--user-id', type=int, default=None, help='Apenas este usuário')
+def recompute_portfolios_command(user_id):
+    """Refaz os agregados da carteira a partir dos investimentos."""
+    rows = recompute_aggregates(db.session, user_id)
+    db.session.commit()
+    click.echo(f'Rebuilt {rows} portfolio aggregate rows')
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -52,5 +135,16 @@ def serve(path):
 def health_check():
     return {'status': 'healthy', 'message': 'Financial Planner API is running'}, 200
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Métricas no formato do Prometheus; com METRICS_TOKEN definido, exige
+    Authorization: Bearer <token>
+    """
+    token = os.environ.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return {'error': 'Invalid metrics token'}, 401
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,10 +1,15 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
+from sqlalchemy import func
+from src.models.user import db
+from src.utils.projection_codec import decode_projection, encode_projection, summarize_projection
 
-db = SQLAlchemy()
+# As tabelas por usuário são sempre consultadas filtrando pelo dono; o índice
+# (user_id, id) atende tanto às listagens quanto às buscas por id do dono.
 
 class ApiKey(db.Model):
+    __table_args__ = (db.Index('ix_api_key_user_id_id', 'user_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     key_name = db.Column(db.String(100), nullable=False)
@@ -12,6 +17,14 @@ class ApiKey(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
+    @classmethod
+    def list_columns(cls):
+        """
+        Colunas de to_dict() para as listagens, com a chave já mascarada no banco
+        """
+        masked = func.substr(cls.api_key, 1, 8).concat('...').label('api_key')
+        return (cls.id, cls.user_id, cls.key_name, masked, cls.created_at, cls.is_active)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -23,6 +36,8 @@ class ApiKey(db.Model):
         }
 
 class FinancialProfile(db.Model):
+    __table_args__ = (db.Index('ix_financial_profile_user_id', 'user_id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     monthly_income = db.Column(db.Float, default=0.0)
@@ -51,6 +66,8 @@ class FinancialProfile(db.Model):
         }
 
 class MonthlyExpense(db.Model):
+    __table_args__ = (db.Index('ix_monthly_expense_user_id_id', 'user_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category = db.Column(db.String(100), nullable=False)
@@ -59,6 +76,10 @@ class MonthlyExpense(db.Model):
     is_recurring = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @classmethod
+    def list_columns(cls):
+        return (cls.id, cls.user_id, cls.category, cls.description, cls.amount, cls.is_recurring, cls.created_at)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -71,6 +92,8 @@ class MonthlyExpense(db.Model):
         }
 
 class Investment(db.Model):
+    __table_args__ = (db.Index('ix_investment_user_id_id', 'user_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     investment_type = db.Column(db.String(100), nullable=False)  # stocks, bonds, savings, etc.
@@ -80,6 +103,11 @@ class Investment(db.Model):
     risk_level = db.Column(db.String(20), default='medium')  # low, medium, high
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @classmethod
+    def list_columns(cls):
+        return (cls.id, cls.user_id, cls.investment_type, cls.name, cls.amount, cls.expected_return,
+                cls.risk_level, cls.created_at)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -93,18 +121,85 @@ class Investment(db.Model):
         }
 
 class CashFlowProjection(db.Model):
+    __table_args__ = (db.Index('ix_cash_flow_projection_user_id_id', 'user_id', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     projection_name = db.Column(db.String(255), nullable=False)
-    projection_data = db.Column(db.Text)  # JSON string com dados da projeção
+    projection_data = db.Column(db.Text)  # JSON string com dados da projeção (formato antigo)
+    projection_blob = db.Column(db.LargeBinary)  # Séries em colunas float64 (ver projection_codec)
+    horizon_years = db.Column(db.Integer)
+    final_accumulated_savings = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
+    # Colunas lidas pela listagem resumida, sem as séries
+    SUMMARY_COLUMNS = ('id', 'user_id', 'projection_name', 'horizon_years', 'final_accumulated_savings', 'created_at')
+
+    @classmethod
+    def list_columns(cls):
+        return tuple(getattr(cls, column) for column in cls.SUMMARY_COLUMNS)
+
+    def set_projection_data(self, rows):
+        self.projection_blob = encode_projection(rows)
+        self.projection_data = None
+        self.horizon_years, self.final_accumulated_savings = summarize_projection(rows)
+
+    def get_projection_data(self):
+        if self.projection_blob:
+            return decode_projection(self.projection_blob)
+        return json.loads(self.projection_data) if self.projection_data else []
+
+    def to_summary_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'projection_name': self.projection_name,
-            'projection_data': json.loads(self.projection_data) if self.projection_data else {},
+            'horizon_years': self.horizon_years,
+            'final_accumulated_savings': self.final_accumulated_savings,
             'created_at': self.created_at.isoformat()
         }
 
+    def to_dict(self):
+        return {
+            **self.to_summary_dict(),
+            'projection_data': self.get_projection_data()
+        }
+
+class PortfolioAggregate(db.Model):
+    """
+    Totais da carteira de um usuário por tipo de investimento e nível de
+    risco, mantidos pelas rotas que gravam investimentos (ver utils/portfolio)
+    """
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'investment_type', 'risk_level', name='uq_portfolio_aggregate_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    investment_type = db.Column(db.String(100), nullable=False)
+    risk_level = db.Column(db.String(20), nullable=False)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    weighted_return_sum = db.Column(db.Float, nullable=False, default=0.0)  # soma de valor x retorno esperado
+    position_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'investment_type': self.investment_type,
+            'risk_level': self.risk_level,
+            'total_amount': self.total_amount,
+            'expected_return': self.weighted_return_sum / self.total_amount if self.total_amount else 0.0,
+            'position_count': self.position_count,
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class ResourceVersion(db.Model):
+    """
+    Versão de cada recurso (despesas, investimentos, projeções...) de um
+    usuário, incrementada na mesma transação de qualquer gravação nele.
+    É a base dos ETags das rotas de leitura (ver utils/conditional).
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    resource = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
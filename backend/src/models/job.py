@@ -0,0 +1,46 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+class Job(db.Model):
+    """
+    Tarefa em segundo plano (ver utils/jobs). Parâmetros e resultado são
+    guardados em JSON; claim_token identifica a reivindicação do worker
+    que a está executando.
+    """
+    __table_args__ = (
+        db.Index('ix_job_status_id', 'status', 'id'),
+        db.Index('ix_job_user_id_id', 'user_id', 'id'),
+        db.Index('ix_job_claim_token', 'claim_token')
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    params = db.Column(db.Text, nullable=False)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claim_token = db.Column(db.String(32))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': json.loads(self.params),
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = json.loads(self.result) if self.result else None
+        return data
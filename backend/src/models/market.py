@@ -0,0 +1,31 @@
+from src.models.user import db
+from datetime import datetime
+
+class TimeSeriesChunk(db.Model):
+    """
+    Um ano de uma série histórica (SGS ou cotações), em arrays compactos:
+    datas como int32 (dias desde 1970-01-01) e valores como float64
+    """
+    __tablename__ = 'time_series_chunk'
+    __table_args__ = (db.UniqueConstraint('series', 'year', name='uq_time_series_chunk_series_year'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    series = db.Column(db.String(64), nullable=False)  # ex.: sgs:433, quote:PETR4
+    year = db.Column(db.Integer, nullable=False)
+    first_day = db.Column(db.Integer, nullable=False)
+    last_day = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    dates = db.Column(db.LargeBinary, nullable=False)
+    values = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'series': self.series,
+            'year': self.year,
+            'first_day': self.first_day,
+            'last_day': self.last_day,
+            'count': self.count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,112 @@
+"""
+Migrações de esquema.
+
+db.create_all() só cria tabelas que ainda não existem; alterações em
+tabelas já criadas (índices, colunas novas) ficam aqui, numeradas em
+ordem crescente. As versões aplicadas são registradas na tabela
+schema_migrations. Cada migração deve ser idempotente, pois vários
+workers podem iniciar ao mesmo tempo.
+"""
+from datetime import datetime
+import json
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from src.utils.portfolio import recompute_aggregates
+from src.utils.projection_codec import encode_projection, summarize_projection
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def decorator(apply):
+        MIGRATIONS.append((version, description, apply))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return apply
+    return decorator
+
+def _has_table(connection, table):
+    return inspect(connection).has_table(table)
+
+@migration(1, 'Índices por usuário nas tabelas financeiras')
+def add_user_indexes(connection):
+    indexes = {
+        'ix_api_key_user_id_id': ('api_key', 'user_id, id'),
+        'ix_monthly_expense_user_id_id': ('monthly_expense', 'user_id, id'),
+        'ix_investment_user_id_id': ('investment', 'user_id, id'),
+        'ix_cash_flow_projection_user_id_id': ('cash_flow_projection', 'user_id, id'),
+        'ix_financial_profile_user_id': ('financial_profile', 'user_id')
+    }
+    for name, (table, columns) in indexes.items():
+        if _has_table(connection, table):
+            connection.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
+
+@migration(2, 'Séries de projeção em formato binário, com resumo')
+def add_projection_blob(connection):
+    if not _has_table(connection, 'cash_flow_projection'):
+        return
+    columns = {column['name'] for column in inspect(connection).get_columns('cash_flow_projection')}
+    for name, type_ in (('projection_blob', 'BLOB'), ('horizon_years', 'INTEGER'), ('final_accumulated_savings', 'FLOAT')):
+        if name not in columns:
+            connection.execute(text(f'ALTER TABLE cash_flow_projection ADD COLUMN {name} {type_}'))
+
+    # Converte as projeções salvas em JSON, em lotes
+    last_id = 0
+    while True:
+        rows = connection.execute(text(
+            'SELECT id, projection_data FROM cash_flow_projection '
+            'WHERE id > :last_id AND projection_blob IS NULL AND projection_data IS NOT NULL '
+            'ORDER BY id LIMIT 500'
+        ), {'last_id': last_id}).fetchall()
+        if not rows:
+            break
+        updates = []
+        for projection_id, projection_data in rows:
+            series = json.loads(projection_data)
+            horizon_years, final_accumulated_savings = summarize_projection(series)
+            updates.append({
+                'id': projection_id,
+                'blob': encode_projection(series),
+                'horizon': horizon_years,
+                'final': final_accumulated_savings
+            })
+        connection.execute(text(
+            'UPDATE cash_flow_projection SET projection_blob = :blob, projection_data = NULL, '
+            'horizon_years = :horizon, final_accumulated_savings = :final WHERE id = :id'
+        ), updates)
+        last_id = rows[-1][0]
+
+@migration(3, 'Agregados da carteira a partir dos investimentos existentes')
+def backfill_portfolio_aggregates(connection):
+    if _has_table(connection, 'investment') and _has_table(connection, 'portfolio_aggregate'):
+        recompute_aggregates(connection)
+
+def applied_versions(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, description VARCHAR(255), applied_at DATETIME)'
+    ))
+    return {row[0] for row in connection.execute(text('SELECT version FROM schema_migrations'))}
+
+def run_migrations(engine):
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação.
+    Retorna as versões aplicadas.
+    """
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            with engine.begin() as connection:
+                apply(connection)
+                connection.execute(
+                    text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+                    {'v': version, 'd': description, 't': datetime.utcnow()}
+                )
+            applied.append(version)
+        except IntegrityError:
+            # Outro processo aplicou a mesma migração primeiro
+            continue
+    return applied
@@ -21,6 +21,10 @@ class User(db.Model):
         self.password = password
         self.access_key = secrets.token_hex(32)
 
+    @classmethod
+    def list_columns(cls):
+        return (cls.id, cls.username, cls.email, cls.access_key, cls.created_at, cls.is_active)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -1,10 +1,62 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
 from src.models.financial import FinancialProfile
+from src.utils.conditional import bump_versions, conditional
+from src.utils.profiling import is_admin_key
+from src.utils.ttl_cache import TTLCache
 from functools import wraps
+import os
 
 auth_bp = Blueprint('auth', __name__)
 
+# Identidade dos usuários autenticados, por chave de acesso. Evita a
+# consulta ao banco em cada requisição; alterações no usuário devem
+# chamar invalidate_access_key.
+access_key_cache = TTLCache(
+    max_entries=int(os.environ.get('AUTH_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('AUTH_CACHE_TTL', 60))
+)
+
+IDENTITY_FIELDS = ('id', 'username', 'email', 'access_key', 'created_at', 'is_active')
+
+class AuthenticatedUser:
+    """
+    Usuário autenticado montado a partir da identidade em cache. Atributos
+    fora de IDENTITY_FIELDS (relacionamentos, senha) vêm do modelo User,
+    carregado sob demanda; para alterar o usuário use `model`.
+    """
+    __slots__ = IDENTITY_FIELDS + ('_model',)
+
+    def __init__(self, identity):
+        for field, value in zip(IDENTITY_FIELDS, identity):
+            setattr(self, field, value)
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = db.session.get(User, self.id)
+        return self._model
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'access_key': self.access_key,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'is_active': self.is_active
+        }
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+def invalidate_access_key(access_key):
+    """
+    Remove a identidade em cache de uma chave de acesso
+    """
+    access_key_cache.invalidate(access_key)
+
 def require_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -15,11 +67,27 @@ def require_auth(f):
         if access_key.startswith('Bearer '):
             access_key = access_key[7:]
         
-        user = User.query.filter_by(access_key=access_key, is_active=True).first()
-        if not user:
-            return jsonify({'error': 'Invalid access key'}), 401
+        identity = access_key_cache.get(access_key)
+        if identity is None:
+            user = User.query.filter_by(access_key=access_key, is_active=True).first()
+            if not user:
+                return jsonify({'error': 'Invalid access key'}), 401
+            identity = tuple(getattr(user, field) for field in IDENTITY_FIELDS)
+            access_key_cache.set(access_key, identity)
         
-        request.current_user = user
+        request.current_user = AuthenticatedUser(identity)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def require_admin(f):
+    """
+    Apenas chaves de acesso listadas em DEBUG_ADMIN_KEYS (aplicado depois de
+    @require_auth)
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not is_admin_key(request.current_user.access_key):
+            return jsonify({'error': 'Admin access required'}), 403
         return f(*args, **kwargs)
     return decorated_function
 
@@ -90,6 +158,7 @@ def login():
 
 @auth_bp.route('/profile', methods=['GET'])
 @require_auth
+@conditional('user', 'profile')
 def get_profile():
     try:
         user = request.current_user
@@ -104,7 +173,7 @@ def get_profile():
 @require_auth
 def update_profile():
     try:
-        user = request.current_user
+        user = request.current_user.model
         data = request.json
         
         # Atualizar dados do usuário
@@ -118,7 +187,9 @@ def update_profile():
         if 'password' in data:
             user.password_hash = user.hash_password(data['password'])
         
+        bump_versions(user.id, 'user')
         db.session.commit()
+        invalidate_access_key(user.access_key)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -129,6 +200,15 @@ def update_profile():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@auth_bp.route('/cache', methods=['GET'])
+@require_auth
+@require_admin
+def get_auth_cache_stats():
+    try:
+        return jsonify(access_key_cache.stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @auth_bp.route('/validate', methods=['GET'])
 @require_auth
 def validate_key():
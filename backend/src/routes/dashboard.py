@@ -0,0 +1,141 @@
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func, select
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import os
+from src.models.financial import CashFlowProjection, FinancialProfile, db
+from src.routes.auth import require_auth
+from src.routes.market import cached_inflation, cached_interest_rates, cached_stocks
+from src.utils.conditional import conditional
+from src.utils.expense_analytics import expense_analytics
+from src.utils.market_cache import market_cache
+from src.utils.portfolio import portfolio_summary
+from src.utils.quote_store import quote_store
+from src.utils.serialization import row_serializer
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# Versão do formato do payload; mude quando a estrutura mudar
+DASHBOARD_VERSION = 1
+RECENT_PROJECTIONS = 5
+
+# Seções que consultam o banco rodam em paralelo, cada uma com sua sessão
+# (DASHBOARD_WORKERS=0 executa tudo na thread da requisição)
+DASHBOARD_WORKERS = int(os.environ.get('DASHBOARD_WORKERS', 4))
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard') if DASHBOARD_WORKERS else None
+
+def _profile(user_id):
+    profile = FinancialProfile.query.filter_by(user_id=user_id).first()
+    return profile.to_dict() if profile else None
+
+def _expenses(user_id):
+    analytics, _ = expense_analytics(user_id)
+    analytics.pop('categories')
+    return analytics
+
+def _projections(user_id):
+    count = db.session.execute(
+        select(func.count()).select_from(CashFlowProjection).where(CashFlowProjection.user_id == user_id)
+    ).scalar()
+    columns = CashFlowProjection.list_columns()
+    recent = db.session.execute(
+        select(*columns)
+        .where(CashFlowProjection.user_id == user_id)
+        .order_by(CashFlowProjection.id.desc())
+        .limit(RECENT_PROJECTIONS)
+    ).all()
+    return {
+        'count': count,
+        'recent': row_serializer(columns, current_app.json).rows(recent)
+    }
+
+def _market(user_id):
+    """
+    Dados do cache de mercado (não esperam pelo provedor), com o horário
+    de cada busca
+    """
+    rates, rates_source, rates_cache = cached_interest_rates()
+    inflation, inflation_source, inflation_cache = cached_inflation()
+    stocks, stocks_source, stocks_cache = cached_stocks()
+    return {
+        'interest_rates': {'data': rates, 'source': rates_source,
+                           'fetched_at': {name: info['fetched_at'] for name, info in rates_cache.items()}},
+        'inflation': {'data': inflation, 'source': inflation_source, 'fetched_at': inflation_cache['fetched_at']},
+        'stocks': {'data': stocks, 'source': stocks_source, 'fetched_at': stocks_cache['fetched_at']}
+    }
+
+DB_SECTIONS = {
+    'profile': _profile,
+    'expenses': _expenses,
+    'portfolio': portfolio_summary,
+    'projections': _projections
+}
+SECTIONS = {**DB_SECTIONS, 'market': _market}
+
+def _market_version():
+    return f"{market_cache.version('selic', 'cdi', 'ipca_12m', 'quotes')},store@{quote_store.version}"
+
+def _run_in_app_context(app, section, user_id):
+    with app.app_context():
+        return DB_SECTIONS[section](user_id)
+
+def gather_sections(sections, user_id):
+    """
+    Executa as seções pedidas. Retorna (dados, erros), ambos por seção;
+    uma seção que falha não derruba as demais.
+    """
+    results, errors = {}, {}
+    futures = {}
+    if _executor is not None:
+        app = current_app._get_current_object()
+        futures = {
+            # copy_context leva as métricas da requisição (utils/metrics) para a thread
+            section: _executor.submit(contextvars.copy_context().run, _run_in_app_context, app, section, user_id)
+            for section in sections if section in DB_SECTIONS
+        }
+    for section in sections:
+        try:
+            if section in futures:
+                results[section] = futures[section].result()
+            else:
+                results[section] = SECTIONS[section](user_id)
+        except Exception as e:
+            errors[section] = str(e)
+    return results, errors
+
+@dashboard_bp.route('/dashboard', methods=['GET'])
+@require_auth
+@conditional('user', 'profile', 'expenses', 'investments', 'projections', version=_market_version, weak=True)
+def get_dashboard():
+    """
+    Perfil, análise de despesas, carteira, projeções recentes e dados de
+    mercado em uma única resposta (?sections= para escolher as seções).
+    O ETag muda a cada gravação nos dados do usuário ou nova busca no
+    mercado; If-None-Match com o ETag atual recebe 304 sem montar nada.
+    Se alguma seção falhar, a resposta vai sem ETag (no-store).
+    """
+    try:
+        user = request.current_user
+        
+        requested = request.args.get('sections')
+        sections = [section.strip() for section in requested.split(',') if section.strip()] if requested else list(SECTIONS)
+        unknown = [section for section in sections if section not in SECTIONS]
+        if unknown:
+            return jsonify({'error': f'Unknown dashboard sections: {", ".join(unknown)}'}), 400
+        
+        results, errors = gather_sections(sections, user.id)
+        
+        response = jsonify({
+            'version': DASHBOARD_VERSION,
+            'user': user.to_dict(),
+            **results,
+            'errors': errors
+        })
+        if errors:
+            # Sem ETag: um 304 reaproveitaria a resposta com seções faltando
+            # até a próxima gravação
+            response.headers['Cache-Control'] = 'no-store'
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,65 @@
+from flask import Blueprint, jsonify, request
+from src.routes.auth import require_admin, require_auth
+from src.utils.profiling import RECORD_KINDS, read_record, record_names
+
+debug_bp = Blueprint('debug', __name__)
+
+DEFAULT_RECORD_LIMIT = 50
+MAX_RECORD_LIMIT = 500
+
+# Campos da listagem; o perfil completo fica em /profiles/<nome>
+SUMMARY_FIELDS = ('name', 'kind', 'created_at', 'mode', 'trigger', 'method', 'route', 'path', 'status',
+                  'user_id', 'duration_ms')
+
+@debug_bp.route('/profiles', methods=['GET'])
+@require_auth
+@require_admin
+def list_profiles():
+    """
+    Perfis e consultas lentas gravados, do mais recente para o mais antigo.
+    Filtros: ?kind=profile|slow_query, ?route=<prefixo>, ?user_id=<id>
+    """
+    try:
+        kind = request.args.get('kind')
+        route = request.args.get('route')
+        user_id = request.args.get('user_id', type=int)
+        limit = min(max(request.args.get('limit', DEFAULT_RECORD_LIMIT, type=int), 1), MAX_RECORD_LIMIT)
+        if kind is not None and kind not in RECORD_KINDS:
+            raise ValueError(f'kind must be one of: {", ".join(RECORD_KINDS)}')
+        
+        records = []
+        for name in record_names():
+            if len(records) >= limit:
+                break
+            if kind is not None and f'-{kind}-' not in name:
+                continue
+            try:
+                record = read_record(name)
+            except FileNotFoundError:
+                # Apagado pela rotação durante a listagem
+                continue
+            if route is not None and not (record.get('route') or '').startswith(route):
+                continue
+            if user_id is not None and record.get('user_id') != user_id:
+                continue
+            summary = {field: record.get(field) for field in SUMMARY_FIELDS}
+            if record['kind'] == 'slow_query':
+                summary['statement'] = record['statement'][:200]
+            records.append(summary)
+        
+        return jsonify({'records': records, 'count': len(records)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@debug_bp.route('/profiles/<name>', methods=['GET'])
+@require_auth
+@require_admin
+def get_profile_record(name):
+    try:
+        return jsonify(read_record(name)), 200
+    except (ValueError, FileNotFoundError):
+        return jsonify({'error': 'Profile not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,13 +1,212 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import insert
 from src.models.financial import FinancialProfile, MonthlyExpense, Investment, CashFlowProjection, ApiKey, db
-from src.routes.auth import require_auth
-import json
+from src.routes.auth import require_admin, require_auth
+from src.utils.projection_engine import MAX_PROJECTION_YEARS, SERIES_FIELDS, project_cash_flow, select_scenario, to_rows
+from src.utils import monte_carlo
+from src.utils.goal_solver import MAX_BATCH_GOALS, parse_goal, solve_goals
+from src.utils.projection_cache import projection_cache
+from src.utils.database import read_query
+from src.utils.pagination import paginated_response
+from src.utils.serialization import row_serializer
+from src.utils.importers import (
+    DECIMAL_SEPARATORS, TRUE_VALUES, RecordError, detect_format, expense_from_csv, expense_from_ofx,
+    investment_from_csv, iter_records
+)
+from src.utils.export import EXPORT_FORMATS, stream_export
+from src.utils.conditional import bump_versions, conditional
+from src.utils.expense_analytics import DEFAULT_TOP_CATEGORIES, expense_analytics
+from src.utils.portfolio import apply_deltas, bucket_deltas, portfolio_summary, track_investments
+from datetime import datetime
+import itertools
 import math
+import numpy as np
 
 financial_bp = Blueprint('financial', __name__)
 
+# Parâmetros de projeção aceitos pela API (taxas em % ao ano)
+PROJECTION_DEFAULTS = {
+    'monthly_income': 0.0,
+    'monthly_expenses': 0.0,
+    'monthly_savings': 0.0,
+    'inflation_rate': 4.5,
+    'investment_return': 10.0
+}
+RATE_PARAMETERS = ('inflation_rate', 'investment_return')
+MAX_BATCH_SCENARIOS = 5000
+
+IMPORT_MODELS = {
+    'expenses': MonthlyExpense,
+    'investments': Investment
+}
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+def _projection_values(values, many=False):
+    """
+    Valida parâmetros de projeção, convertendo-os para float (ou listas de float)
+    """
+    unknown = [key for key in values if key not in PROJECTION_DEFAULTS]
+    if unknown:
+        raise ValueError(f'Unknown projection parameters: {", ".join(unknown)}')
+    if many:
+        return {key: [float(value) for value in items] for key, items in values.items()}
+    return {key: float(value) for key, value in values.items()}
+
+def _projection_years(data):
+    # Validado já na leitura, para que as tarefas (routes/jobs) falhem na submissão
+    years = int(data.get('years', 10))
+    if years < 1 or years > MAX_PROJECTION_YEARS:
+        raise ValueError(f'years must be between 1 and {MAX_PROJECTION_YEARS}')
+    return years
+
+def cash_flow_params(data):
+    """
+    Parâmetros de project_cash_flow a partir do corpo de /projections/cash-flow
+    (taxas em % ao ano)
+    """
+    return {
+        'years': _projection_years(data),
+        'monthly_income': float(data.get('monthly_income', 0)),
+        'monthly_expenses': float(data.get('monthly_expenses', 0)),
+        'monthly_savings': float(data.get('monthly_savings', 0)),
+        'inflation_rate': float(data.get('inflation_rate', 4.5)) / 100,
+        'investment_return': float(data.get('investment_return', 10.0)) / 100,
+        'compounding': data.get('compounding', 'yearly'),
+        'resolution': data.get('resolution', 'yearly')
+    }
+
+def compute_cash_flow(params):
+    """
+    Linhas da projeção (vetorizada), reaproveitando o resultado de
+    requisições idênticas
+    """
+    return projection_cache.get_or_compute(
+        params,
+        lambda: to_rows(project_cash_flow(**params), params['resolution'])
+    )
+
+def save_projection(user_id, name, rows):
+    """
+    Adiciona a projeção à sessão; o commit (e bump_versions) fica com quem chama
+    """
+    projection = CashFlowProjection(user_id=user_id, projection_name=name)
+    projection.set_projection_data(rows)
+    db.session.add(projection)
+    return projection
+
+def batch_request(data, default_persist='none'):
+    """
+    Valida o corpo de /projections/batch. Os cenários vêm de uma grade de
+    parâmetros ('grid', produto cartesiano) ou de uma lista explícita
+    ('scenarios'), sobre os valores de 'base'. Retorna um dicionário com os
+    cenários, os parâmetros de project_cash_flow (um array por parâmetro),
+    as séries pedidas, os índices a persistir e o nome das projeções.
+    """
+    years = _projection_years(data)
+    base = {**PROJECTION_DEFAULTS, **_projection_values(data.get('base', {}))}
+
+    if data.get('grid'):
+        grid = _projection_values(data['grid'], many=True)
+        count = math.prod(len(values) for values in grid.values())
+        if count > MAX_BATCH_SCENARIOS:
+            raise ValueError(f'At most {MAX_BATCH_SCENARIOS} scenarios per batch')
+        scenarios = [
+            {**base, **dict(zip(grid, values))}
+            for values in itertools.product(*grid.values())
+        ]
+    elif data.get('scenarios'):
+        if len(data['scenarios']) > MAX_BATCH_SCENARIOS:
+            raise ValueError(f'At most {MAX_BATCH_SCENARIOS} scenarios per batch')
+        scenarios = [{**base, **_projection_values(scenario)} for scenario in data['scenarios']]
+    else:
+        raise ValueError('Either grid or scenarios is required')
+
+    fields = data.get('series', ['accumulated_savings', 'real_accumulated_savings', 'net_cash_flow'])
+    unknown = [field for field in fields if field not in SERIES_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown series: {", ".join(unknown)}')
+
+    # Persistir nenhum ('none'), todos ('all') ou uma lista de índices
+    persist = data.get('persist', default_persist)
+    if persist == 'all':
+        persist = list(range(len(scenarios)))
+    elif persist == 'none':
+        persist = []
+    elif not all(isinstance(index, int) and 0 <= index < len(scenarios) for index in persist):
+        raise ValueError('persist must be "none", "all" or a list of scenario indexes')
+
+    # Todos os cenários em um único cálculo: parâmetros como arrays (cenários x períodos)
+    params = {
+        'years': years,
+        'compounding': data.get('compounding', 'yearly'),
+        'resolution': data.get('resolution', 'yearly'),
+        **{
+            key: np.array([scenario[key] for scenario in scenarios]) / (100 if key in RATE_PARAMETERS else 1)
+            for key in PROJECTION_DEFAULTS
+        }
+    }
+    return {
+        'scenarios': scenarios,
+        'params': params,
+        'fields': fields,
+        'persist': persist,
+        'name': data.get('name', f'Projeção {years} anos')
+    }
+
+def save_batch_projections(user_id, batch, series):
+    """
+    Adiciona à sessão os cenários escolhidos em `persist`; retorna índice -> projeção
+    """
+    resolution = batch['params']['resolution']
+    return {
+        index: save_projection(user_id, f"{batch['name']} #{index + 1}",
+                               to_rows(select_scenario(series, index), resolution))
+        for index in batch['persist']
+    }
+
+def monte_carlo_params(data):
+    """
+    Argumentos de monte_carlo.simulate a partir do corpo de
+    /projections/monte-carlo (taxas em % ao ano, como na projeção determinística)
+    """
+    # Limites de simulate já na leitura, para que as tarefas falhem na submissão
+    years = int(data.get('years', 10))
+    paths = int(data.get('paths', 10000))
+    if years < 1 or years > monte_carlo.MAX_YEARS:
+        raise ValueError(f'years must be between 1 and {monte_carlo.MAX_YEARS}')
+    if paths < 1 or paths > monte_carlo.MAX_PATHS:
+        raise ValueError(f'paths must be between 1 and {monte_carlo.MAX_PATHS}')
+    seed = data.get('seed')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise ValueError('seed must be a non-negative integer')
+    target = data.get('target')
+    params = {
+        'years': years,
+        'paths': paths,
+        'initial_balance': float(data.get('initial_balance', 0)),
+        'monthly_savings': float(data.get('monthly_savings', 0)),
+        'return_mean': float(data.get('investment_return', 10.0)) / 100,
+        'return_volatility': float(data.get('return_volatility', 15.0)) / 100,
+        'return_distribution': data.get('return_distribution', 'normal'),
+        'inflation_mean': float(data.get('inflation_rate', 4.5)) / 100,
+        'inflation_volatility': float(data.get('inflation_volatility', 1.5)) / 100,
+        'inflation_distribution': data.get('inflation_distribution', 'normal'),
+        'degrees_of_freedom': float(data.get('degrees_of_freedom', 5)),
+        'seed': seed,
+        'target': float(target) if target is not None else None,
+        'target_basis': data.get('target_basis', 'real')
+    }
+    if params['target_basis'] not in monte_carlo.TARGET_BASES:
+        raise ValueError(f'target_basis must be one of: {", ".join(monte_carlo.TARGET_BASES)}')
+    for name in ('return', 'inflation'):
+        monte_carlo.validate_distribution(name, params[f'{name}_distribution'], params[f'{name}_volatility'],
+                                          params['degrees_of_freedom'])
+    return params
+
 @financial_bp.route('/profile', methods=['GET'])
 @require_auth
+@conditional('profile')
 def get_financial_profile():
     try:
         user = request.current_user
@@ -51,6 +250,7 @@ def update_financial_profile():
         if 'housing_cost' in data:
             profile.housing_cost = float(data['housing_cost'])
         
+        bump_versions(user.id, 'profile')
         db.session.commit()
         
         return jsonify({
@@ -64,11 +264,33 @@ def update_financial_profile():
 
 @financial_bp.route('/expenses', methods=['GET'])
 @require_auth
+@conditional('expenses')
 def get_expenses():
     try:
         user = request.current_user
-        expenses = MonthlyExpense.query.filter_by(user_id=user.id).all()
-        return jsonify([expense.to_dict() for expense in expenses]), 200
+        return paginated_response(read_query(MonthlyExpense).filter_by(user_id=user.id), MonthlyExpense, columns=MonthlyExpense.list_columns())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/expenses/analytics', methods=['GET'])
+@require_auth
+@conditional('expenses', 'profile')
+def get_expense_analytics():
+    """
+    Totais por categoria, divisão entre despesas recorrentes e avulsas,
+    maiores categorias (?top=N) e fatia da renda mensal, agregados no banco
+    """
+    try:
+        user = request.current_user
+        top = request.args.get('top', DEFAULT_TOP_CATEGORIES, type=int)
+        if top < 0:
+            return jsonify({'error': 'top must be zero or positive'}), 400
+        
+        analytics, cached = expense_analytics(user.id, top)
+        if request.args.get('categories', '1').lower() not in TRUE_VALUES:
+            analytics.pop('categories')
+        
+        return jsonify({**analytics, 'cached': cached}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -88,6 +310,7 @@ def add_expense():
         )
         
         db.session.add(expense)
+        bump_versions(user.id, 'expenses')
         db.session.commit()
         
         return jsonify({
@@ -115,6 +338,7 @@ def update_expense(expense_id):
         expense.amount = float(data.get('amount', expense.amount))
         expense.is_recurring = data.get('is_recurring', expense.is_recurring)
         
+        bump_versions(user.id, 'expenses')
         db.session.commit()
         
         return jsonify({
@@ -137,6 +361,7 @@ def delete_expense(expense_id):
             return jsonify({'error': 'Expense not found'}), 404
         
         db.session.delete(expense)
+        bump_versions(user.id, 'expenses')
         db.session.commit()
         
         return jsonify({'message': 'Expense deleted successfully'}), 200
@@ -147,11 +372,11 @@ def delete_expense(expense_id):
 
 @financial_bp.route('/investments', methods=['GET'])
 @require_auth
+@conditional('investments')
 def get_investments():
     try:
         user = request.current_user
-        investments = Investment.query.filter_by(user_id=user.id).all()
-        return jsonify([investment.to_dict() for investment in investments]), 200
+        return paginated_response(read_query(Investment).filter_by(user_id=user.id), Investment, columns=Investment.list_columns())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -172,6 +397,8 @@ def add_investment():
         )
         
         db.session.add(investment)
+        track_investments(user.id, [investment])
+        bump_versions(user.id, 'investments')
         db.session.commit()
         
         return jsonify({
@@ -194,6 +421,8 @@ def delete_investment(investment_id):
             return jsonify({'error': 'Investment not found'}), 404
         
         db.session.delete(investment)
+        track_investments(user.id, [investment], sign=-1)
+        bump_versions(user.id, 'investments')
         db.session.commit()
         
         return jsonify({'message': 'Investment deleted successfully'}), 200
@@ -202,13 +431,162 @@ def delete_investment(investment_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@financial_bp.route('/portfolio/summary', methods=['GET'])
+@require_auth
+@conditional('investments')
+def get_portfolio_summary():
+    """
+    Totais da carteira por tipo e risco e retorno esperado ponderado,
+    lidos dos agregados mantidos a cada gravação de investimento
+    """
+    try:
+        user = request.current_user
+        return jsonify(portfolio_summary(user.id)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/import/<kind>', methods=['POST'])
+@require_auth
+def import_records(kind):
+    """
+    Importa despesas (CSV ou OFX) ou investimentos (CSV) de um arquivo
+    enviado no campo 'file'. Os registros são validados um a um e gravados
+    em inserts de várias linhas; registros inválidos são reportados.
+    ?transaction=chunked confirma cada lote separadamente; ?strict=1 não
+    grava nada se houver algum registro inválido. O campo 'decimal' ('.' ou
+    ',') resolve valores ambíguos como 1,234.
+    """
+    # Registros já confirmados (lotes de ?transaction=chunked), informados também em caso de erro
+    committed = 0
+    try:
+        user = request.current_user
+        
+        if kind not in IMPORT_MODELS:
+            return jsonify({'error': 'Import kind must be expenses or investments'}), 404
+        
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'error': 'File is required'}), 400
+        
+        file_format = detect_format(upload.filename, request.values.get('format'))
+        if kind == 'investments' and file_format != 'csv':
+            return jsonify({'error': 'Investments can only be imported from CSV'}), 400
+        
+        chunked = request.args.get('transaction', 'single') == 'chunked'
+        strict = request.args.get('strict', '').lower() in TRUE_VALUES
+        if chunked and strict:
+            return jsonify({'error': 'strict imports require a single transaction'}), 400
+        
+        decimal = request.values.get('decimal') or None
+        if decimal is not None and decimal not in DECIMAL_SEPARATORS:
+            return jsonify({'error': 'decimal must be "." or ","'}), 400
+        
+        if kind == 'investments':
+            convert = lambda record: investment_from_csv(record, decimal)
+        elif file_format == 'ofx':
+            category = request.values.get('category', 'Importado')
+            convert = lambda record: expense_from_ofx(record, category, decimal)
+        else:
+            convert = lambda record: expense_from_csv(record, decimal)
+        
+        model = IMPORT_MODELS[kind]
+        statement = insert(model)
+        imported_at = datetime.utcnow()
+        batch = []
+        imported = skipped = error_count = 0
+        errors = []
+        
+        for number, record in iter_records(upload.stream, file_format):
+            try:
+                values = convert(record)
+            except RecordError as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                    errors.append({'row': number, 'error': str(e)})
+                continue
+            
+            if values is None:
+                skipped += 1
+                continue
+            
+            values['user_id'] = user.id
+            values.setdefault('created_at', imported_at)
+            batch.append(values)
+            
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                db.session.execute(statement, batch)
+                if kind == 'investments':
+                    apply_deltas(user.id, bucket_deltas(batch))
+                imported += len(batch)
+                batch = []
+                if chunked:
+                    bump_versions(user.id, kind)
+                    db.session.commit()
+                    committed = imported
+        
+        if batch:
+            db.session.execute(statement, batch)
+            if kind == 'investments':
+                apply_deltas(user.id, bucket_deltas(batch))
+            imported += len(batch)
+        
+        if strict and error_count:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Import aborted: invalid records found',
+                'error_count': error_count,
+                'errors': errors
+            }), 400
+        
+        bump_versions(user.id, kind)
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{imported} {kind} imported successfully',
+            'imported': imported,
+            'skipped': skipped,
+            'error_count': error_count,
+            'errors': errors
+        }), 200
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'imported': committed}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'imported': committed}), 500
+
+@financial_bp.route('/export', methods=['GET'])
+@require_auth
+def export_account():
+    """
+    Exporta perfil, despesas, investimentos, chaves de API (sem o segredo)
+    e projeções do usuário em um ZIP gerado em streaming
+    """
+    try:
+        user = request.current_user
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+        
+        filename = f'financial-planner-{user.username}-{datetime.utcnow():%Y%m%d}.zip'
+        return Response(
+            stream_with_context(stream_export(user.id, export_format)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @financial_bp.route('/api-keys', methods=['GET'])
 @require_auth
+@conditional('api_keys')
 def get_api_keys():
     try:
         user = request.current_user
-        api_keys = ApiKey.query.filter_by(user_id=user.id).all()
-        return jsonify([key.to_dict() for key in api_keys]), 200
+        columns = ApiKey.list_columns()
+        api_keys = read_query(*columns).filter(ApiKey.user_id == user.id).all()
+        return jsonify(row_serializer(columns, current_app.json).rows(api_keys)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -226,6 +604,7 @@ def add_api_key():
         )
         
         db.session.add(api_key)
+        bump_versions(user.id, 'api_keys')
         db.session.commit()
         
         return jsonify({
@@ -248,6 +627,7 @@ def delete_api_key(key_id):
             return jsonify({'error': 'API key not found'}), 404
         
         db.session.delete(api_key)
+        bump_versions(user.id, 'api_keys')
         db.session.commit()
         
         return jsonify({'message': 'API key deleted successfully'}), 200
@@ -263,47 +643,13 @@ def calculate_cash_flow():
         user = request.current_user
         data = request.json
         
-        # Parâmetros da projeção
-        years = data.get('years', 10)
-        monthly_income = data.get('monthly_income', 0)
-        monthly_expenses = data.get('monthly_expenses', 0)
-        monthly_savings = data.get('monthly_savings', 0)
-        inflation_rate = data.get('inflation_rate', 4.5) / 100
-        investment_return = data.get('investment_return', 10.0) / 100
-        
-        # Calcular projeção de fluxo de caixa
-        projections = []
-        current_savings = 0
-        
-        for year in range(1, years + 1):
-            # Aplicar inflação aos gastos
-            adjusted_expenses = monthly_expenses * ((1 + inflation_rate) ** year)
-            
-            # Renda anual (assumindo crescimento com inflação)
-            annual_income = monthly_income * 12 * ((1 + inflation_rate) ** year)
-            annual_expenses = adjusted_expenses * 12
-            annual_savings = monthly_savings * 12
-            
-            # Calcular poupança com juros compostos
-            current_savings = (current_savings + annual_savings) * (1 + investment_return)
-            
-            projections.append({
-                'year': year,
-                'annual_income': round(annual_income, 2),
-                'annual_expenses': round(annual_expenses, 2),
-                'annual_savings': round(annual_savings, 2),
-                'accumulated_savings': round(current_savings, 2),
-                'net_cash_flow': round(annual_income - annual_expenses, 2)
-            })
+        # Parâmetros e cálculo da projeção
+        params = cash_flow_params(data)
+        projections = compute_cash_flow(params)
         
         # Salvar projeção no banco de dados
-        projection = CashFlowProjection(
-            user_id=user.id,
-            projection_name=data.get('name', f'Projeção {years} anos'),
-            projection_data=json.dumps(projections)
-        )
-        
-        db.session.add(projection)
+        projection = save_projection(user.id, data.get('name', f"Projeção {params['years']} anos"), projections)
+        bump_versions(user.id, 'projections')
         db.session.commit()
         
         return jsonify({
@@ -312,17 +658,138 @@ def calculate_cash_flow():
             'projection_id': projection.id
         }), 200
         
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@financial_bp.route('/projections/batch', methods=['POST'])
+@require_auth
+def calculate_cash_flow_batch():
+    """
+    Avalia vários cenários de projeção em um único cálculo vetorizado
+    (ver batch_request)
+    """
+    try:
+        user = request.current_user
+        data = request.json
+        
+        batch = batch_request(data)
+        series = project_cash_flow(**batch['params'])
+        
+        saved = save_batch_projections(user.id, batch, series)
+        if saved:
+            bump_versions(user.id, 'projections')
+            db.session.commit()
+        
+        return jsonify({
+            'message': 'Batch projection calculated successfully',
+            'periods': series['period'].tolist(),
+            'resolution': batch['params']['resolution'],
+            'scenarios': batch['scenarios'],
+            'series': {field: np.round(series[field], 2).tolist() for field in batch['fields']},
+            'projection_ids': {str(index): projection.id for index, projection in saved.items()}
+        }), 200
+        
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/projections/monte-carlo', methods=['POST'])
+@require_auth
+def calculate_monte_carlo():
+    try:
+        data = request.json
+        
+        result = monte_carlo.simulate(**monte_carlo_params(data))
+        
+        return jsonify({
+            'message': 'Monte Carlo simulation completed successfully',
+            'simulation': result
+        }), 200
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/projections/goals', methods=['POST'])
+@require_auth
+def solve_projection_goals():
+    """
+    Resolve metas de acumulação em lote: {"goals": [{"solve": "savings" |
+    "years" | "return", "target": ..., ...}], "defaults": {...}}. Ver
+    utils/goal_solver para os parâmetros de cada meta.
+    """
+    try:
+        data = request.json
+        
+        goals = data.get('goals')
+        defaults = data.get('defaults') or {}
+        if not isinstance(goals, list) or not goals:
+            raise ValueError('goals must be a non-empty list')
+        if len(goals) > MAX_BATCH_GOALS:
+            raise ValueError(f'At most {MAX_BATCH_GOALS} goals per request')
+        
+        parsed = []
+        for index, goal in enumerate(goals):
+            try:
+                parsed.append(parse_goal(goal, defaults))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f'goals[{index}]: {e}')
+        
+        return jsonify({
+            'message': 'Goals solved successfully',
+            'goals': solve_goals(parsed)
+        }), 200
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @financial_bp.route('/projections', methods=['GET'])
 @require_auth
+@conditional('projections')
 def get_projections():
     try:
         user = request.current_user
-        projections = CashFlowProjection.query.filter_by(user_id=user.id).all()
-        return jsonify([projection.to_dict() for projection in projections]), 200
+        query = read_query(CashFlowProjection).filter_by(user_id=user.id)
+        
+        # ?view=summary lista apenas nome, horizonte e saldo final, sem decodificar as séries
+        if request.args.get('view') == 'summary':
+            return paginated_response(query, CashFlowProjection, columns=CashFlowProjection.list_columns())
+        
+        return paginated_response(query, CashFlowProjection)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/projections/<int:projection_id>', methods=['GET'])
+@require_auth
+@conditional('projections')
+def get_projection(projection_id):
+    try:
+        user = request.current_user
+        
+        projection = CashFlowProjection.query.filter_by(id=projection_id, user_id=user.id).first()
+        if not projection:
+            return jsonify({'error': 'Projection not found'}), 404
+        
+        return jsonify(projection.to_dict()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@financial_bp.route('/projections/cache', methods=['GET'])
+@require_auth
+@require_admin
+def get_projection_cache_stats():
+    try:
+        return jsonify(projection_cache.stats()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -337,6 +804,7 @@ def delete_projection(projection_id):
             return jsonify({'error': 'Projection not found'}), 404
         
         db.session.delete(projection)
+        bump_versions(user.id, 'projections')
         db.session.commit()
         
         return jsonify({'message': 'Projection deleted successfully'}), 200
@@ -0,0 +1,168 @@
+from flask import Blueprint, jsonify, request, url_for
+from sqlalchemy import select
+from src.models.job import Job
+from src.models.user import db
+from src.routes.auth import require_admin, require_auth
+from src.routes.financial import (
+    batch_request, cash_flow_params, compute_cash_flow, monte_carlo_params, save_batch_projections, save_projection
+)
+from src.utils import monte_carlo
+from src.utils.conditional import bump_versions
+from src.utils.jobs import STATUSES, QueueFullError, job_queue
+from src.utils.projection_engine import project_cash_flow
+import numpy as np
+import os
+
+jobs_bp = Blueprint('jobs', __name__)
+
+# Espera máxima de ?wait= (long polling), em segundos
+MAX_WAIT_SECONDS = float(os.environ.get('JOB_MAX_WAIT', 30))
+DEFAULT_JOB_LIMIT = 50
+
+# Tipos de tarefa: validação dos parâmetros (na submissão, para responder
+# 400 na hora) e execução no worker. As projeções são gravadas em
+# CashFlowProjection; o resultado da tarefa guarda só os ids e resumos.
+
+def run_cash_flow(user_id, params):
+    cash_flow = cash_flow_params(params)
+    rows = compute_cash_flow(cash_flow)
+    projection = save_projection(user_id, params.get('name', f"Projeção {cash_flow['years']} anos"), rows)
+    bump_versions(user_id, 'projections')
+    db.session.flush()
+    return {
+        'projection_id': projection.id,
+        'horizon_years': projection.horizon_years,
+        'final_accumulated_savings': projection.final_accumulated_savings
+    }
+
+def run_projection_batch(user_id, params):
+    batch = batch_request(params, default_persist='all')
+    series = project_cash_flow(**batch['params'])
+    saved = save_batch_projections(user_id, batch, series)
+    if saved:
+        bump_versions(user_id, 'projections')
+    db.session.flush()
+    return {
+        'scenarios': batch['scenarios'],
+        'final': {field: np.round(series[field][..., -1], 2).tolist() for field in batch['fields']},
+        'projection_ids': {str(index): projection.id for index, projection in saved.items()}
+    }
+
+def run_monte_carlo(user_id, params):
+    return monte_carlo.simulate(**monte_carlo_params(params))
+
+JOB_KINDS = {
+    'cash_flow': (cash_flow_params, run_cash_flow),
+    'projection_batch': (batch_request, run_projection_batch),
+    'monte_carlo': (monte_carlo_params, run_monte_carlo)
+}
+for kind, (_, handler) in JOB_KINDS.items():
+    job_queue.register(kind, handler)
+
+@jobs_bp.route('', methods=['POST'])
+@require_auth
+def submit_job():
+    """
+    Enfileira uma tarefa: {"kind": "cash_flow" | "projection_batch" |
+    "monte_carlo", "params": {...}}, com os mesmos parâmetros das rotas
+    síncronas de /financial/projections. Responde 202 com a tarefa.
+    """
+    try:
+        user = request.current_user
+        data = request.json
+        
+        kind = data.get('kind')
+        params = data.get('params') or {}
+        if kind not in JOB_KINDS:
+            raise ValueError(f'kind must be one of: {", ".join(JOB_KINDS)}')
+        validate, _ = JOB_KINDS[kind]
+        validate(params)
+        
+        job = job_queue.submit(user.id, kind, params)
+        
+        response = jsonify({
+            'message': 'Job queued successfully',
+            'job': job.to_dict()
+        })
+        response.headers['Location'] = url_for('jobs.get_job', job_id=job.id)
+        return response, 202
+        
+    except QueueFullError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 429
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('', methods=['GET'])
+@require_auth
+def get_jobs():
+    """
+    Tarefas do usuário, da mais recente para a mais antiga (sem os
+    resultados); ?status= filtra
+    """
+    try:
+        user = request.current_user
+        status = request.args.get('status')
+        limit = min(max(request.args.get('limit', DEFAULT_JOB_LIMIT, type=int), 1), 500)
+        if status is not None and status not in STATUSES:
+            raise ValueError(f'status must be one of: {", ".join(STATUSES)}')
+        
+        query = select(Job).where(Job.user_id == user.id)
+        if status is not None:
+            query = query.where(Job.status == status)
+        jobs = db.session.execute(query.order_by(Job.id.desc()).limit(limit)).scalars()
+        
+        return jsonify([job.to_dict(include_result=False) for job in jobs]), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@require_auth
+def get_job(job_id):
+    """
+    Estado e resultado de uma tarefa. Com ?wait=<segundos> (até
+    JOB_MAX_WAIT) a resposta espera a tarefa terminar (long polling).
+    """
+    try:
+        user = request.current_user
+        wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_WAIT_SECONDS)
+        
+        job = job_queue.wait(user.id, job_id, wait) if wait else job_queue.get(user.id, job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/<int:job_id>', methods=['DELETE'])
+@require_auth
+def cancel_job(job_id):
+    try:
+        user = request.current_user
+        
+        if not job_queue.get(user.id, job_id):
+            return jsonify({'error': 'Job not found'}), 404
+        if not job_queue.cancel(user.id, job_id):
+            return jsonify({'error': 'Only queued jobs can be cancelled'}), 409
+        
+        return jsonify({'message': 'Job cancelled successfully'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/stats', methods=['GET'])
+@require_auth
+@require_admin
+def get_job_stats():
+    try:
+        return jsonify(job_queue.stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
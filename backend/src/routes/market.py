@@ -1,8 +1,14 @@
 from flask import Blueprint, jsonify, request
-import requests
-import json
-from datetime import datetime, timedelta
-from src.routes.auth import require_auth
+from datetime import date, datetime
+import os
+import numpy as np
+from src.models.financial import ApiKey, db
+from src.routes.auth import require_admin, require_auth
+from src.utils.conditional import conditional
+from src.utils.market_client import MarketDataError, market_client
+from src.utils.market_cache import market_cache
+from src.utils.quote_store import DEFAULT_SEARCH_LIMIT, MAX_BATCH_SYMBOLS, MAX_SEARCH_LIMIT, quote_store
+from src.utils.timeseries_store import load_range, resample, resolve_series, sync_series, to_days, to_iso, trailing_compound
 
 market_bp = Blueprint('market', __name__)
 
@@ -41,20 +47,63 @@ MOCK_INVESTMENT_DATA = {
     ]
 }
 
+# Os dados simulados só ocupam os símbolos que ainda não têm cotação real
+quote_store.update(
+    [stock for stock in MOCK_INVESTMENT_DATA['stocks'] if quote_store.get(stock['symbol']) is None],
+    source='mock_data'
+)
+
+def cached_interest_rates():
+    """
+    Taxas de juros do cache de mercado, completando com os dados simulados.
+    Retorna (dados, origem, metadados do cache).
+    """
+    rates = {name: dict(values) for name, values in MOCK_INTEREST_RATES.items()}
+    cache_info = {}
+    for name in ('selic', 'cdi'):
+        point, cache_info[name] = market_cache.get(name)
+        if point:
+            rates[name].update(current_rate=point['value'], last_updated=point['date'])
+    source = 'bcb' if any(info['fetched_at'] for info in cache_info.values()) else 'mock_data'
+    return rates, source, cache_info
+
+def cached_inflation():
+    inflation = {country: dict(values) for country, values in MOCK_INFLATION_DATA.items()}
+    point, cache_info = market_cache.get('ipca_12m')
+    if point:
+        inflation['brazil'].update(
+            current_rate=point['value'],
+            last_12_months=point['value'],
+            last_updated=point['date']
+        )
+    return inflation, 'bcb' if point else 'mock_data', cache_info
+
+def cached_stocks(symbols=None):
+    """
+    Cotações do armazenamento indexado por símbolo (todas ou só as pedidas).
+    A leitura do cache de mercado dispara a atualização quando vencida.
+    """
+    _, cache_info = market_cache.get('quotes')
+    source = 'brapi' if cache_info['fetched_at'] else 'mock_data'
+    return quote_store.quotes(symbols), source, cache_info
+
 @market_bp.route('/inflation', methods=['GET'])
 @require_auth
+@conditional(version=lambda: market_cache.version('ipca_12m'), weak=True)
 def get_inflation_data():
     try:
         country = request.args.get('country', 'brazil')
         
-        # Tentar buscar dados reais da API (se disponível)
-        # Por enquanto, retornar dados simulados
+        # Dados do cache de mercado (nunca esperam pelo provedor),
+        # com os dados simulados como reserva
+        inflation, source, cache_info = cached_inflation()
         
-        if country.lower() in MOCK_INFLATION_DATA:
+        if country.lower() in inflation:
             return jsonify({
                 'country': country,
-                'data': MOCK_INFLATION_DATA[country.lower()],
-                'source': 'mock_data'
+                'data': inflation[country.lower()],
+                'source': source,
+                'cache': cache_info
             }), 200
         else:
             return jsonify({'error': 'Country not supported'}), 404
@@ -64,11 +113,14 @@ def get_inflation_data():
 
 @market_bp.route('/interest-rates', methods=['GET'])
 @require_auth
+@conditional(version=lambda: market_cache.version('selic', 'cdi'), weak=True)
 def get_interest_rates():
     try:
+        rates, source, cache_info = cached_interest_rates()
         return jsonify({
-            'data': MOCK_INTEREST_RATES,
-            'source': 'mock_data',
+            'data': rates,
+            'source': source,
+            'cache': cache_info,
             'last_updated': datetime.now().isoformat()
         }), 200
         
@@ -77,31 +129,187 @@ def get_interest_rates():
 
 @market_bp.route('/investments/stocks', methods=['GET'])
 @require_auth
+@conditional(version=lambda: f"{market_cache.version('quotes')},store@{quote_store.version}", weak=True)
 def get_stock_data():
     try:
-        symbols = request.args.get('symbols', '').split(',')
-        
-        if symbols and symbols[0]:
-            # Filtrar apenas os símbolos solicitados
-            filtered_stocks = [
-                stock for stock in MOCK_INVESTMENT_DATA['stocks']
-                if stock['symbol'] in symbols
-            ]
-            return jsonify({
-                'stocks': filtered_stocks,
-                'source': 'mock_data'
-            }), 200
-        else:
-            return jsonify({
-                'stocks': MOCK_INVESTMENT_DATA['stocks'],
-                'source': 'mock_data'
-            }), 200
+        symbols = [symbol for symbol in request.args.get('symbols', '').split(',') if symbol.strip()]
+        
+        # Apenas os símbolos solicitados, buscados diretamente no índice
+        stocks, source, cache_info = cached_stocks(symbols or None)
+        
+        return jsonify({
+            'stocks': stocks,
+            'source': source,
+            'cache': cache_info
+        }), 200
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@market_bp.route('/quotes/batch', methods=['POST'])
+@require_auth
+def get_quotes_batch():
+    """
+    Cotações de vários símbolos em uma chamada, cada uma com a sua origem
+    e idade; os símbolos sem cotação voltam em 'missing'
+    """
+    try:
+        data = request.get_json() or {}
+        symbols = data.get('symbols')
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+        if not isinstance(symbols, list) or not symbols:
+            return jsonify({'error': 'symbols must be a non-empty list'}), 400
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols per request'}), 400
+        
+        _, cache_info = market_cache.get('quotes')
+        quotes, missing = quote_store.get_many(symbol for symbol in symbols if str(symbol).strip())
+        
+        return jsonify({
+            'quotes': quotes,
+            'missing': missing,
+            'stale': [symbol for symbol, quote in quotes.items() if quote['stale']],
+            'cache': cache_info
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@market_bp.route('/symbols/search', methods=['GET'])
+@require_auth
+def search_symbols():
+    """
+    Busca de símbolos por prefixo para o seletor de ativos
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        limit = min(max(request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int), 1), MAX_SEARCH_LIMIT)
+        
+        # Mantém a lista de símbolos da brapi atualizada
+        market_cache.get('symbols')
+        
+        return jsonify({
+            'query': query.upper(),
+            'symbols': quote_store.search(query, limit)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _parse_day(value, name):
+    if not value:
+        return None
+    try:
+        return int(to_days(date.fromisoformat(value)))
+    except ValueError:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+
+@market_bp.route('/series/<name>', methods=['GET'])
+@require_auth
+def get_series(name):
+    """
+    Histórico local de uma série (selic, cdi, ipca, ipca_12m, sgs:<código>
+    ou quote:<símbolo>) em um intervalo, opcionalmente agregado por mês ou ano
+    """
+    try:
+        series = resolve_series(name)
+        days, values = load_range(
+            series,
+            _parse_day(request.args.get('start'), 'start'),
+            _parse_day(request.args.get('end'), 'end')
+        )
+        
+        frequency = request.args.get('resample')
+        if frequency:
+            dates, values = resample(days, values, frequency, request.args.get('how', 'last'))
+        else:
+            dates = to_iso(days)
+        
+        return jsonify({
+            'series': series,
+            'resample': frequency,
+            'dates': dates,
+            'values': np.round(values, 6).tolist()
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@market_bp.route('/series/<name>/trailing', methods=['GET'])
+@require_auth
+def get_series_trailing(name):
+    """
+    Taxa acumulada nos últimos N pontos (ex.: IPCA em 12 meses)
+    """
+    try:
+        series = resolve_series(name)
+        periods = request.args.get('periods', 12, type=int)
+        days, values = load_range(series)
+        
+        # Valida periods e exige pontos suficientes (inclusive série vazia)
+        value = trailing_compound(values, periods)
+        return jsonify({
+            'series': series,
+            'periods': periods,
+            'value': round(value, 4),
+            'last_date': to_iso(days[-1:])[0]
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@market_bp.route('/series/<name>/sync', methods=['POST'])
+@require_auth
+def sync_series_data(name):
+    """
+    Atualiza a série local buscando apenas os pontos novos
+    """
+    try:
+        user = request.current_user
+        series = resolve_series(name)
+        
+        api_key = None
+        if series.startswith('quote:'):
+            brapi_key = ApiKey.query.filter(
+                ApiKey.user_id == user.id, ApiKey.is_active.is_(True), ApiKey.key_name.ilike('%brapi%')
+            ).first()
+            api_key = brapi_key.api_key if brapi_key else os.environ.get('BRAPI_API_KEY')
+        
+        added = sync_series(series, api_key)
+        return jsonify({
+            'message': 'Series synchronized successfully',
+            'series': series,
+            'added_points': added
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except MarketDataError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 502
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@market_bp.route('/cache', methods=['GET'])
+@require_auth
+@require_admin
+def get_market_cache_stats():
+    try:
+        return jsonify({**market_cache.stats(), 'quote_store': quote_store.stats()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @market_bp.route('/investments/indices', methods=['GET'])
 @require_auth
+@conditional(version=lambda: 'mock_data')
 def get_indices_data():
     try:
         return jsonify({
@@ -124,7 +332,7 @@ def update_live_data():
         user = request.current_user
         
         # Verificar se o usuário tem chaves de API configuradas
-        api_keys = user.api_keys
+        api_keys = ApiKey.query.filter_by(user_id=user.id, is_active=True).all()
         
         if not api_keys:
             return jsonify({
@@ -132,15 +340,41 @@ def update_live_data():
                 'suggestion': 'Add API keys for brapi.dev or other financial data providers'
             }), 400
         
-        # Aqui seria implementada a lógica para buscar dados reais
-        # usando as chaves de API do usuário
+        # Preferir a chave cadastrada para a brapi
+        brapi_key = next((key.api_key for key in api_keys if 'brapi' in key.key_name.lower()), api_keys[0].api_key)
+        
+        # Séries do Banco Central e cotações buscadas em paralelo
+        symbols = [stock['symbol'] for stock in MOCK_INVESTMENT_DATA['stocks']]
+        snapshot = market_client.fetch_market_snapshot(symbols=symbols, api_key=brapi_key)
+        series = snapshot['series']
+        quote_store.update(snapshot['quotes'].values(), datetime.now().timestamp(), 'brapi')
+        
+        # O que não pôde ser buscado continua com os dados simulados
+        interest_rates = {name: dict(values) for name, values in MOCK_INTEREST_RATES.items()}
+        for name in ('selic', 'cdi'):
+            if name in series:
+                interest_rates[name].update(current_rate=series[name]['value'], last_updated=series[name]['date'])
+        
+        inflation = {country: dict(values) for country, values in MOCK_INFLATION_DATA.items()}
+        if 'ipca_12m' in series:
+            inflation['brazil'].update(
+                current_rate=series['ipca_12m']['value'],
+                last_12_months=series['ipca_12m']['value'],
+                last_updated=series['ipca_12m']['date']
+            )
+        
+        investments = dict(MOCK_INVESTMENT_DATA)
+        investments['stocks'] = [
+            snapshot['quotes'].get(stock['symbol'], stock) for stock in MOCK_INVESTMENT_DATA['stocks']
+        ]
         
         updated_data = {
-            'inflation': MOCK_INFLATION_DATA,
-            'interest_rates': MOCK_INTEREST_RATES,
-            'investments': MOCK_INVESTMENT_DATA,
+            'inflation': inflation,
+            'interest_rates': interest_rates,
+            'investments': investments,
             'last_updated': datetime.now().isoformat(),
-            'status': 'updated_with_mock_data'
+            'status': 'partially_updated' if snapshot['errors'] else 'updated',
+            'errors': snapshot['errors']
         }
         
         return jsonify({
@@ -182,15 +416,8 @@ def fetch_brapi_data(api_key, endpoint):
     Função auxiliar para buscar dados da brapi.dev
     """
     try:
-        headers = {'Authorization': f'Bearer {api_key}'}
-        response = requests.get(f'https://brapi.dev/api/{endpoint}', headers=headers)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-            
-    except Exception:
+        return market_client.fetch_brapi(endpoint, api_key)
+    except MarketDataError:
         return None
 
 def fetch_bcb_data(endpoint):
@@ -198,13 +425,6 @@ def fetch_bcb_data(endpoint):
     Função auxiliar para buscar dados do Banco Central do Brasil
     """
     try:
-        response = requests.get(f'https://api.bcb.gov.br/dados/serie/bcdata.sgs.{endpoint}/dados/ultimos/1?formato=json')
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-            
-    except Exception:
+        return market_client.fetch_bcb_latest(endpoint)
+    except MarketDataError:
         return None
-
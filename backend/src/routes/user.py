@@ -1,12 +1,15 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.routes.auth import invalidate_access_key
+from src.utils.conditional import bump_versions, delete_versions
+from src.utils.database import read_query
+from src.utils.pagination import paginated_response
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    return paginated_response(read_query(User), User, columns=User.list_columns())
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -28,12 +31,17 @@ def update_user(user_id):
     data = request.json
     user.username = data.get('username', user.username)
     user.email = data.get('email', user.email)
+    bump_versions(user.id, 'user')
     db.session.commit()
+    invalidate_access_key(user.access_key)
     return jsonify(user.to_dict())
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
+    access_key = user.access_key
+    delete_versions(user.id)
     db.session.delete(user)
     db.session.commit()
+    invalidate_access_key(access_key)
     return '', 204
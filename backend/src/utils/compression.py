@@ -0,0 +1,63 @@
+"""
+Compressão negociada (brotli ou gzip) das respostas grandes.
+
+Aplicada em after_request a respostas 200 de tipos textuais acima de
+COMPRESSION_MIN_SIZE bytes. Respostas em streaming (NDJSON, exportação)
+e arquivos estáticos ficam de fora. O brotli é opcional: sem o pacote
+instalado só o gzip é oferecido.
+"""
+import gzip
+import os
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv', 'application/javascript', 'text/css')
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+def choose_encoding(accept_encodings):
+    """
+    A codificação preferida pelo cliente entre as disponíveis, ou None
+    """
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = accept_encodings.best_match(available)
+    return best if best and accept_encodings[best] > 0 else None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def compress_response(response):
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or request.method == 'HEAD'
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if (response.content_length or 0) < COMPRESSION_MIN_SIZE:
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -0,0 +1,115 @@
+"""
+ETags e GET condicional para as rotas de leitura.
+
+Cada gravação nos dados de um usuário incrementa, na mesma transação, a
+versão do recurso afetado (tabela resource_version). As rotas de leitura
+decoradas com @conditional montam o ETag a partir dessas versões, da URL
+e do Accept, antes de executar a consulta: se o cliente já tem essa
+versão (If-None-Match), a resposta é um 304 sem corpo e a listagem nem
+chega a rodar. Rotas que não dependem do banco (dados de mercado) passam
+uma função que devolve a sua própria versão.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import Response, request
+from sqlalchemy import delete, select
+from src.models.financial import ResourceVersion, db
+from src.utils.database import upsert
+
+# Recursos com versão por usuário
+RESOURCES = ('user', 'profile', 'expenses', 'investments', 'projections', 'api_keys')
+
+# Sufixo do ETag de uma resposta comprimida (ver utils/compression): o
+# ETag forte identifica os bytes, então cada codificação tem o seu
+ENCODING_SUFFIXES = ('-gzip', '-br')
+
+def bump_versions(user_id, *resources):
+    """
+    Incrementa as versões dos recursos na transação corrente (antes do commit)
+    """
+    now = datetime.utcnow()
+    statement = upsert(db.session, ResourceVersion).values([
+        {'user_id': user_id, 'resource': resource, 'version': 1, 'updated_at': now}
+        for resource in resources
+    ])
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id', 'resource'],
+        set_={'version': ResourceVersion.version + 1, 'updated_at': now}
+    ))
+
+def delete_versions(user_id):
+    """
+    Apaga as versões de um usuário removido, na transação corrente
+    """
+    db.session.execute(delete(ResourceVersion).where(ResourceVersion.user_id == user_id))
+
+def resource_versions(user_id, resources):
+    rows = db.session.execute(
+        select(ResourceVersion.resource, ResourceVersion.version)
+        .where(ResourceVersion.user_id == user_id, ResourceVersion.resource.in_(resources))
+    ).all()
+    versions = dict(rows)
+    return [versions.get(resource, 0) for resource in resources]
+
+def make_etag(*parts):
+    token = '|'.join(str(part) for part in (*parts, request.full_path, request.headers.get('Accept', '')))
+    return hashlib.sha1(token.encode()).hexdigest()
+
+def matches(etag):
+    """
+    O ETag do If-None-Match da requisição que corresponde a `etag`, em
+    qualquer codificação (comparação fraca), ou None
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    for suffix in ('', *ENCODING_SUFFIXES):
+        if if_none_match.contains_weak(etag + suffix):
+            return etag + suffix
+    return None
+
+def not_modified(etag, weak=False):
+    """
+    304 com o ETag que o cliente tem: o de uma codificação (-gzip, -br)
+    depende do Accept-Encoding
+    """
+    response = Response(status=304)
+    response.set_etag(etag, weak)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if etag.endswith(ENCODING_SUFFIXES):
+        response.vary.add('Accept-Encoding')
+    return response
+
+def conditional(*resources, version=None, weak=False):
+    """
+    Decorador para rotas de leitura autenticadas (aplicado depois de
+    @require_auth). O ETag depende das versões dos recursos do usuário e,
+    se houver, do retorno de version(); `weak` para respostas cujo corpo
+    muda sem mudar a versão.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            parts = []
+            if resources:
+                user_id = request.current_user.id
+                parts += [user_id, *zip(resources, resource_versions(user_id, resources))]
+            if version is not None:
+                parts.append(version())
+            etag = make_etag(*parts)
+            matched = matches(etag)
+            if matched:
+                return not_modified(matched, weak)
+
+            result = f(*args, **kwargs)
+            response, status = result if isinstance(result, tuple) else (result, None)
+            if not isinstance(response, Response):
+                return result
+            # no-store: resposta parcial que a rota não quer ver reaproveitada
+            if (status or response.status_code) == 200 and not response.cache_control.no_store:
+                response.set_etag(etag, weak)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return result
+        return decorated_function
+    return decorator
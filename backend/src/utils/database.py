@@ -0,0 +1,165 @@
+"""
+Configuração do banco de dados.
+
+A URL vem de DATABASE_URL (padrão: SQLite em src/database/app.db); são
+aceitos SQLite e PostgreSQL, os bancos com upsert (INSERT ... ON CONFLICT)
+usado pelas versões dos recursos e pelos agregados da carteira. Com
+SQLite, cada conexão nova recebe os PRAGMAs de produção: WAL (leitores
+não bloqueiam o escritor e vice-versa), busy_timeout (quem encontra o
+banco travado espera em vez de falhar com 'database is locked'),
+synchronous=NORMAL (seguro com WAL e sem fsync a cada commit), cache e
+mmap maiores. O pool vem de DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+e DB_POOL_RECYCLE.
+
+As listagens usam um engine separado, somente leitura (PRAGMA query_only
+no SQLite, ou DATABASE_READ_URL para uma réplica), com pool próprio, de
+modo que as leituras longas não disputam conexões com as gravações.
+"""
+import os
+from flask import current_app, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+DEFAULT_DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db')
+
+# PRAGMAs aplicados a cada conexão SQLite (sobrescritos por SQLITE_<NOME>)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': '5000',     # ms
+    'synchronous': 'NORMAL',
+    'cache_size': '-65536',     # negativo = KiB (64 MiB)
+    'mmap_size': '268435456',   # 256 MiB
+    'temp_store': 'MEMORY'
+}
+
+# insert() com on_conflict_do_update de cada banco aceito
+UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+def database_url(env=os.environ):
+    """
+    URL do banco. Caminhos SQLite relativos são resolvidos a partir do
+    diretório atual, para que o Flask-SQLAlchemy (que os resolveria a partir
+    da pasta instance) e o engine de leitura abram o mesmo arquivo.
+    """
+    url = make_url(env.get('DATABASE_URL') or f'sqlite:///{DEFAULT_DATABASE_PATH}')
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+            and not url.database.startswith('file:') and not os.path.isabs(url.database):
+        url = url.set(database=os.path.abspath(url.database))
+    return url.render_as_string(hide_password=False)
+
+def check_backend(url, name='DATABASE_URL'):
+    backend = make_url(url).get_backend_name()
+    if backend not in UPSERT_INSERTS:
+        raise ValueError(f'{name} must be one of: {", ".join(UPSERT_INSERTS)} (got {backend})')
+
+def upsert(session, table):
+    """
+    insert() do dialeto da sessão, com on_conflict_do_update
+    """
+    return UPSERT_INSERTS[session.get_bind().dialect.name](table)
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+def is_sqlite_memory(url):
+    return is_sqlite(url) and make_url(url).database in (None, '', ':memory:')
+
+def sqlite_pragmas(env=os.environ):
+    return {name: env.get(f'SQLITE_{name.upper()}', value) for name, value in SQLITE_PRAGMAS.items()}
+
+def engine_options(url, env=os.environ, prefix='DB'):
+    """
+    Opções de create_engine a partir de <prefix>_POOL_SIZE, <prefix>_MAX_OVERFLOW,
+    <prefix>_POOL_TIMEOUT e <prefix>_POOL_RECYCLE
+    """
+    if is_sqlite_memory(url):
+        # Banco em memória (testes): uma conexão só, sem pool configurável
+        return {}
+    options = {
+        'pool_size': int(env.get(f'{prefix}_POOL_SIZE', 5)),
+        'max_overflow': int(env.get(f'{prefix}_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(env.get(f'{prefix}_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(env.get(f'{prefix}_POOL_RECYCLE', -1))
+    }
+    if is_sqlite(url):
+        # O timeout do driver (s) cobre a abertura da transação; o pool
+        # compartilha conexões entre as threads do worker
+        busy_timeout = int(sqlite_pragmas(env)['busy_timeout'])
+        options['connect_args'] = {'timeout': busy_timeout / 1000, 'check_same_thread': False}
+    else:
+        options['pool_pre_ping'] = True
+    return options
+
+def ensure_sqlite_directory(url):
+    if is_sqlite(url) and not is_sqlite_memory(url):
+        path = make_url(url).database
+        if not path.startswith('file:'):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+def apply_sqlite_pragmas(engine, pragmas, read_only=False):
+    """
+    Registra os PRAGMAs para todas as conexões novas do engine
+    """
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                if read_only and name == 'journal_mode':
+                    continue
+                cursor.execute(f'PRAGMA {name}={value}')
+            if read_only:
+                cursor.execute('PRAGMA query_only=ON')
+        finally:
+            cursor.close()
+
+def create_read_engine(url, env=os.environ):
+    """
+    Engine somente leitura: DATABASE_READ_URL, se houver, ou o mesmo banco
+    com query_only
+    """
+    read_url = env.get('DATABASE_READ_URL') or url
+    check_backend(read_url, 'DATABASE_READ_URL')
+    engine = create_engine(read_url, **engine_options(read_url, env, prefix='DB_READ'))
+    if is_sqlite(read_url):
+        apply_sqlite_pragmas(engine, sqlite_pragmas(env), read_only=True)
+    return engine
+
+def configure_database(app, db, env=os.environ):
+    """
+    Configura o Flask-SQLAlchemy (URL, pool, PRAGMAs) e o engine de leitura
+    """
+    url = database_url(env)
+    check_backend(url)
+    ensure_sqlite_directory(url)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url, env)
+    db.init_app(app)
+
+    with app.app_context():
+        if is_sqlite(url):
+            apply_sqlite_pragmas(db.engine, sqlite_pragmas(env))
+        # Um banco em memória só existe na conexão do engine principal
+        app.extensions['read_engine'] = db.engine if is_sqlite_memory(url) else create_read_engine(url, env)
+
+    @app.teardown_appcontext
+    def close_read_session(exception=None):
+        session = g.pop('read_session', None)
+        if session is not None:
+            session.close()
+
+def read_session():
+    """
+    Sessão do engine de leitura, uma por contexto da aplicação
+    """
+    if 'read_session' not in g:
+        g.read_session = Session(bind=current_app.extensions['read_engine'])
+    return g.read_session
+
+def read_query(*entities):
+    return read_session().query(*entities)
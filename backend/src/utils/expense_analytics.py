@@ -0,0 +1,96 @@
+"""
+Análise das despesas de um usuário calculada no banco.
+
+Uma única consulta GROUP BY (categoria, recorrente) devolve uma linha por
+combinação, e dela saem os totais por categoria, a divisão entre
+despesas recorrentes e avulsas, as maiores categorias e a fatia da renda
+mensal. Nenhuma despesa é carregada como objeto do ORM.
+
+O resultado fica em cache por usuário e pelas versões das despesas e do
+perfil (que traz a renda) em resource_version, as mesmas dos ETags: uma
+gravação em qualquer worker do gunicorn muda a chave em todos eles, e as
+entradas antigas saem pelo TTL ou pelo LRU.
+"""
+import os
+from sqlalchemy import func, select
+from src.models.financial import FinancialProfile, MonthlyExpense, db
+from src.utils.conditional import resource_versions
+from src.utils.ttl_cache import TTLCache
+
+DEFAULT_TOP_CATEGORIES = 5
+
+analytics_cache = TTLCache(
+    max_entries=int(os.environ.get('EXPENSE_ANALYTICS_CACHE_SIZE', 5000)),
+    ttl=float(os.environ.get('EXPENSE_ANALYTICS_CACHE_TTL', 300))
+)
+
+def _share(part, whole):
+    return round(part / whole * 100, 2) if whole else None
+
+def compute_expense_analytics(user_id):
+    rows = db.session.execute(
+        select(
+            MonthlyExpense.category,
+            func.coalesce(MonthlyExpense.is_recurring, True),
+            func.sum(MonthlyExpense.amount),
+            func.count()
+        )
+        .where(MonthlyExpense.user_id == user_id)
+        .group_by(MonthlyExpense.category, func.coalesce(MonthlyExpense.is_recurring, True))
+    ).all()
+    monthly_income = db.session.execute(
+        select(FinancialProfile.monthly_income).where(FinancialProfile.user_id == user_id).limit(1)
+    ).scalar()
+
+    categories = {}
+    split = {True: [0.0, 0], False: [0.0, 0]}
+    for category, is_recurring, amount, count in rows:
+        entry = categories.setdefault(category, {
+            'category': category, 'total': 0.0, 'count': 0, 'recurring_total': 0.0, 'one_off_total': 0.0
+        })
+        entry['total'] += amount
+        entry['count'] += count
+        entry['recurring_total' if is_recurring else 'one_off_total'] += amount
+        split[bool(is_recurring)][0] += amount
+        split[bool(is_recurring)][1] += count
+
+    total = split[True][0] + split[False][0]
+    ranked = sorted(categories.values(), key=lambda entry: entry['total'], reverse=True)
+    for entry in ranked:
+        for key in ('total', 'recurring_total', 'one_off_total'):
+            entry[key] = round(entry[key], 2)
+        entry['share'] = _share(entry['total'], total)
+        entry['share_of_income'] = _share(entry['total'], monthly_income)
+
+    return {
+        'total': round(total, 2),
+        'expense_count': split[True][1] + split[False][1],
+        'monthly_income': monthly_income,
+        'share_of_income': _share(total, monthly_income),
+        'recurring': {
+            'total': round(split[True][0], 2),
+            'count': split[True][1],
+            'share': _share(split[True][0], total),
+            'share_of_income': _share(split[True][0], monthly_income)
+        },
+        'one_off': {
+            'total': round(split[False][0], 2),
+            'count': split[False][1],
+            'share': _share(split[False][0], total),
+            'share_of_income': _share(split[False][0], monthly_income)
+        },
+        'categories': ranked
+    }
+
+def expense_analytics(user_id, top=DEFAULT_TOP_CATEGORIES):
+    """
+    Análise das despesas do usuário, do cache quando possível.
+    Retorna (análise, se veio do cache).
+    """
+    key = (user_id, *resource_versions(user_id, ('expenses', 'profile')))
+    analytics = analytics_cache.get(key)
+    cached = analytics is not None
+    if not cached:
+        analytics = compute_expense_analytics(user_id)
+        analytics_cache.set(key, analytics)
+    return {**analytics, 'top_categories': analytics['categories'][:top]}, cached
@@ -0,0 +1,126 @@
+"""
+Exportação completa da conta de um usuário.
+
+Gera um arquivo ZIP em streaming: cada tabela é lida em blocos por
+cursor (id crescente) e escrita em uma entrada do ZIP, em CSV ou NDJSON;
+os bytes comprimidos são devolvidos à medida que ficam prontos, sem
+montar o arquivo em memória.
+"""
+import csv
+import io
+import json
+import zipfile
+from src.models.user import User, db
+from src.models.financial import ApiKey, CashFlowProjection, FinancialProfile, Investment, MonthlyExpense
+from src.utils.projection_engine import row_keys
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_BATCH_SIZE = 500
+
+# Tabelas exportadas: nome da entrada -> modelo
+EXPORT_TABLES = (
+    ('expenses', MonthlyExpense),
+    ('investments', Investment),
+    ('api_keys', ApiKey),
+    ('projections', CashFlowProjection)
+)
+
+# Colunas do CSV das séries de projeção (anuais e mensais)
+PROJECTION_SERIES_COLUMNS = ['projection_id'] + list(dict.fromkeys(row_keys('yearly') + row_keys('monthly')))
+
+class _ChunkBuffer(io.RawIOBase):
+    """
+    Destino não posicionável do ZIP: acumula os bytes escritos até serem
+    retirados com pop()
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_user_rows(model, user_id, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Percorre as linhas do usuário em blocos por id, liberando cada bloco
+    da sessão antes de buscar o próximo
+    """
+    last_id = 0
+    while True:
+        rows = (model.query
+                .filter(model.user_id == user_id, model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+        yield rows
+        last_id = rows[-1].id
+        for row in rows:
+            db.session.expunge(row)
+
+def _profile(user_id):
+    user = db.session.get(User, user_id)
+    profile = FinancialProfile.query.filter_by(user_id=user_id).first()
+    user_data = user.to_dict()
+    user_data.pop('access_key', None)
+    return {
+        'user': user_data,
+        'financial_profile': profile.to_dict() if profile else None
+    }
+
+def stream_export(user_id, export_format='ndjson'):
+    """
+    Gera os bytes do ZIP de exportação do usuário
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(EXPORT_FORMATS)}')
+
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('profile.json', json.dumps(_profile(user_id), indent=2, ensure_ascii=False))
+        yield buffer.pop()
+
+        for name, model in EXPORT_TABLES:
+            with archive.open(f'{name}.{export_format}', 'w', force_zip64=True) as entry:
+                text = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+                writer = None
+                for rows in iter_user_rows(model, user_id):
+                    if export_format == 'ndjson':
+                        for row in rows:
+                            text.write(json.dumps(row.to_dict(), ensure_ascii=False) + '\n')
+                    else:
+                        records = [row.to_summary_dict() if model is CashFlowProjection else row.to_dict() for row in rows]
+                        if writer is None:
+                            writer = csv.DictWriter(text, fieldnames=list(records[0]))
+                            writer.writeheader()
+                        writer.writerows(records)
+                    text.flush()
+                    yield buffer.pop()
+                text.close()
+            yield buffer.pop()
+
+        if export_format == 'csv':
+            # Séries das projeções em formato longo: uma linha por período
+            with archive.open('projection_series.csv', 'w', force_zip64=True) as entry:
+                text = io.TextIOWrapper(entry, encoding='utf-8', newline='')
+                writer = csv.DictWriter(text, fieldnames=PROJECTION_SERIES_COLUMNS, restval='', extrasaction='ignore')
+                writer.writeheader()
+                for rows in iter_user_rows(CashFlowProjection, user_id):
+                    for projection in rows:
+                        writer.writerows({'projection_id': projection.id, **period}
+                                         for period in projection.get_projection_data())
+                    text.flush()
+                    yield buffer.pop()
+                text.close()
+
+    yield buffer.pop()
@@ -0,0 +1,249 @@
+"""
+Solução direta de metas de acumulação, no mesmo modelo de
+project_cash_flow: aportes mensais fixos capitalizados no início de cada
+período, mais um saldo inicial, com taxas anuais efetivas convertidas em
+taxas por período.
+
+  savings  aporte mensal necessário para chegar ao alvo em `years` anos
+  years    tempo até o alvo com um aporte mensal dado
+  return   retorno anual necessário para chegar ao alvo em `years` anos
+
+Aporte e tempo (com alvo nominal) saem de fórmulas fechadas da anuidade
+antecipada. O retorno necessário, e o tempo com alvo em valores de hoje
+(que cresce com a inflação), não têm forma fechada e são resolvidos por
+bisseção vetorizada: todas as metas do lote avançam juntas, como arrays.
+"""
+import math
+import numpy as np
+from src.utils.projection_engine import COMPOUNDING_PERIODS, MAX_PROJECTION_YEARS, annuity_due_factor, periodic_rate
+
+SOLVE_FOR = ('savings', 'years', 'return')
+TARGET_BASES = ('nominal', 'real')
+
+# Intervalo de busca do retorno anual necessário
+MIN_RETURN = -0.5
+MAX_RETURN = 1.0
+BISECTION_STEPS = 100
+MAX_BATCH_GOALS = 10_000
+
+# Parâmetros de cada meta (taxas em % ao ano, como nas rotas de projeção)
+GOAL_DEFAULTS = {
+    'solve': 'savings',
+    'target': None,
+    'years': None,
+    'monthly_savings': 0.0,
+    'initial_balance': 0.0,
+    'investment_return': 10.0,
+    'inflation_rate': 4.5,
+    'target_basis': 'nominal',
+    'compounding': 'yearly'
+}
+# Parâmetro que cada tipo de meta exige (além do alvo)
+REQUIRED = {
+    'savings': 'years',
+    'years': 'monthly_savings',
+    'return': 'years'
+}
+
+def future_value(initial_balance, monthly_savings, annual_rate, periods, periods_per_year):
+    """
+    Saldo após `periods` períodos: saldo inicial capitalizado mais os
+    aportes do início de cada período (accumulated_savings de
+    project_cash_flow quando o saldo inicial é zero)
+    """
+    rate = periodic_rate(np.asarray(annual_rate, dtype=float), periods_per_year)
+    contribution = np.asarray(monthly_savings, dtype=float) * (12 / periods_per_year)
+    return initial_balance * np.power(1.0 + rate, periods) + contribution * annuity_due_factor(rate, periods)
+
+def nominal_target(target, inflation_rate, years, target_basis):
+    """
+    Alvo em valores nominais; um alvo 'real' (em valores de hoje) é
+    corrigido pela inflação até o fim do prazo
+    """
+    target = np.asarray(target, dtype=float)
+    return np.where(target_basis == 'real', target * np.power(1.0 + inflation_rate, years), target)
+
+def required_savings(target, years, initial_balance, annual_rate, periods_per_year):
+    """
+    Aporte mensal que leva o saldo ao alvo (nominal) em `years` anos;
+    zero se o saldo inicial já basta
+    """
+    periods = np.asarray(years, dtype=float) * periods_per_year
+    rate = periodic_rate(np.asarray(annual_rate, dtype=float), periods_per_year)
+    missing = target - initial_balance * np.power(1.0 + rate, periods)
+    contribution = missing / annuity_due_factor(rate, periods)
+    return np.maximum(contribution, 0.0) / (12 / periods_per_year)
+
+def periods_to_goal(target, monthly_savings, initial_balance, annual_rate, periods_per_year):
+    """
+    Número (fracionário) de períodos até o saldo atingir o alvo nominal:
+    P g^n + K (g^n - 1) = T, com g = 1 + taxa e K = aporte (1 + taxa) / taxa.
+    NaN quando o alvo é inalcançável.
+    """
+    rate = periodic_rate(np.asarray(annual_rate, dtype=float), periods_per_year)
+    contribution = np.asarray(monthly_savings, dtype=float) * (12 / periods_per_year)
+    initial_balance = np.asarray(initial_balance, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = contribution * (1.0 + rate) / rate
+        ratio = (target + k) / (initial_balance + k)
+        periods = np.log(ratio) / np.log1p(rate)
+        # Taxa zero: crescimento linear
+        linear = (target - initial_balance) / contribution
+    periods = np.where(rate == 0, linear, periods)
+    periods = np.where(initial_balance >= target, 0.0, periods)
+    return np.where(np.isfinite(periods) & (periods >= 0), periods, np.nan)
+
+def bisect(function, low, high, steps=BISECTION_STEPS):
+    """
+    Raiz de uma função crescente em cada elemento, entre `low` e `high`
+    (arrays). Elementos sem troca de sinal no intervalo voltam como NaN.
+    """
+    low = np.array(low, dtype=float)
+    high = np.array(high, dtype=float)
+    feasible = (function(low) <= 0) & (function(high) >= 0)
+    for _ in range(steps):
+        middle = (low + high) / 2
+        above = function(middle) >= 0
+        high = np.where(above, middle, high)
+        low = np.where(above, low, middle)
+    return np.where(feasible, (low + high) / 2, np.nan)
+
+def periods_to_real_goal(target, monthly_savings, initial_balance, annual_rate, inflation_rate, periods_per_year):
+    """
+    Períodos até o saldo atingir um alvo em valores de hoje, que cresce com
+    a inflação (bisseção sobre o saldo real)
+    """
+    inflation = periodic_rate(np.asarray(inflation_rate, dtype=float), periods_per_year)
+    max_periods = MAX_PROJECTION_YEARS * periods_per_year
+
+    def shortfall(periods):
+        balance = future_value(initial_balance, monthly_savings, annual_rate, periods, periods_per_year)
+        return balance / np.power(1.0 + inflation, periods) - target
+
+    periods = bisect(shortfall, np.zeros_like(inflation * target), np.full_like(inflation * target, max_periods))
+    return np.where(initial_balance >= target, 0.0, periods)
+
+def required_return(target, years, monthly_savings, initial_balance, periods_per_year):
+    """
+    Retorno anual efetivo que leva o saldo ao alvo nominal em `years` anos,
+    entre MIN_RETURN e MAX_RETURN; NaN fora do intervalo
+    """
+    periods = np.asarray(years, dtype=float) * periods_per_year
+    shape = np.broadcast_shapes(np.shape(target), np.shape(periods), np.shape(monthly_savings), np.shape(initial_balance))
+
+    def shortfall(rate):
+        return future_value(initial_balance, monthly_savings, rate, periods, periods_per_year) - target
+
+    return bisect(shortfall, np.full(shape, MIN_RETURN), np.full(shape, MAX_RETURN))
+
+def parse_goal(goal, defaults=None):
+    """
+    Valida uma meta, completando-a com `defaults` e GOAL_DEFAULTS; taxas
+    passam de % para frações
+    """
+    values = {**GOAL_DEFAULTS, **(defaults or {}), **goal}
+    unknown = [key for key in values if key not in GOAL_DEFAULTS]
+    if unknown:
+        raise ValueError(f'Unknown goal parameters: {", ".join(unknown)}')
+    if values['solve'] not in SOLVE_FOR:
+        raise ValueError(f'solve must be one of: {", ".join(SOLVE_FOR)}')
+    if values['target_basis'] not in TARGET_BASES:
+        raise ValueError(f'target_basis must be one of: {", ".join(TARGET_BASES)}')
+    if values['compounding'] not in COMPOUNDING_PERIODS:
+        raise ValueError(f'compounding must be one of: {", ".join(COMPOUNDING_PERIODS)}')
+    required = REQUIRED[values['solve']]
+    if values['target'] is None or values[required] is None:
+        raise ValueError(f"target and {required} are required to solve for {values['solve']}")
+
+    parsed = {
+        'solve': values['solve'],
+        'target_basis': values['target_basis'],
+        'compounding': values['compounding'],
+        'target': float(values['target']),
+        'monthly_savings': float(values['monthly_savings']),
+        'initial_balance': float(values['initial_balance']),
+        'investment_return': float(values['investment_return']) / 100,
+        'inflation_rate': float(values['inflation_rate']) / 100,
+        'years': float(values['years']) if values['years'] is not None else None
+    }
+    not_finite = [key for key, value in parsed.items() if isinstance(value, float) and not math.isfinite(value)]
+    if not_finite:
+        raise ValueError(f'{", ".join(not_finite)} must be finite')
+    if parsed['target'] <= 0:
+        raise ValueError('target must be positive')
+    # Com -100% ou menos o fator (1 + taxa) zera ou fica negativo
+    if parsed['investment_return'] <= -1 or parsed['inflation_rate'] <= -1:
+        raise ValueError('investment_return and inflation_rate must be greater than -100')
+    if parsed['monthly_savings'] < 0 or parsed['initial_balance'] < 0:
+        raise ValueError('monthly_savings and initial_balance must not be negative')
+    if parsed['years'] is not None and not 0 < parsed['years'] <= MAX_PROJECTION_YEARS:
+        raise ValueError(f'years must be between 0 and {MAX_PROJECTION_YEARS}')
+    return parsed
+
+def _column(goals, key):
+    return np.array([goal[key] for goal in goals], dtype=float)
+
+def _round(value, digits):
+    # digits=None arredonda para int; valores não finitos viram None
+    return round(float(value), digits) if np.isfinite(value) else None
+
+def solve_goals(goals):
+    """
+    Resolve uma lista de metas já validadas (parse_goal). As metas com o
+    mesmo tipo e capitalização são resolvidas juntas, como arrays. Retorna
+    uma lista, na mesma ordem, com a meta e a solução ('feasible' indica se
+    há solução nos limites).
+    """
+    results = [None] * len(goals)
+    groups = {}
+    for index, goal in enumerate(goals):
+        groups.setdefault((goal['solve'], goal['compounding']), []).append(index)
+
+    for (solve, compounding), indexes in groups.items():
+        group = [goals[index] for index in indexes]
+        periods_per_year = COMPOUNDING_PERIODS[compounding]
+        target = _column(group, 'target')
+        savings = _column(group, 'monthly_savings')
+        balance = _column(group, 'initial_balance')
+        returns = _column(group, 'investment_return')
+        inflation = _column(group, 'inflation_rate')
+        real = np.array([goal['target_basis'] == 'real' for goal in group])
+
+        # Estouros e divisões por zero viram inf/NaN e a meta sai como
+        # inviável, sem RuntimeWarning
+        with np.errstate(all='ignore'):
+            if solve == 'years':
+                periods = periods_to_goal(target, savings, balance, returns, periods_per_year)
+                if real.any():
+                    periods[real] = periods_to_real_goal(target[real], savings[real], balance[real], returns[real],
+                                                         inflation[real], periods_per_year)
+                # Metas além do horizonte máximo das projeções são inalcançáveis;
+                # o alvo é atingido no fim do primeiro período inteiro
+                periods = np.where(periods <= MAX_PROJECTION_YEARS * periods_per_year, periods, np.nan)
+                periods = np.ceil(np.round(periods, 9))
+                solution = {'years': (periods / periods_per_year, 4), 'periods': (periods, None)}
+            else:
+                periods = _column(group, 'years') * periods_per_year
+                nominal = nominal_target(target, inflation, periods / periods_per_year, np.where(real, 'real', 'nominal'))
+                if solve == 'savings':
+                    savings = required_savings(nominal, periods / periods_per_year, balance, returns, periods_per_year)
+                    solution = {'monthly_savings': (savings, 2)}
+                else:
+                    returns = required_return(nominal, periods / periods_per_year, savings, balance, periods_per_year)
+                    solution = {'investment_return': (returns * 100, 4)}
+
+            # Saldo nominal ao fim do prazo com a solução, para conferência
+            final_balance = future_value(balance, savings, returns, np.nan_to_num(periods), periods_per_year)
+            feasible = np.all([np.isfinite(values) for values, _ in solution.values()], axis=0)
+            solution['final_balance'] = (np.where(feasible, final_balance, np.nan), 2)
+
+        for position, index in enumerate(indexes):
+            goal = goals[index]
+            results[index] = {
+                **goal,
+                'investment_return': _round(goal['investment_return'] * 100, 4),
+                'inflation_rate': _round(goal['inflation_rate'] * 100, 4),
+                **{key: _round(values[position], digits) for key, (values, digits) in solution.items()},
+                'feasible': bool(feasible[position])
+            }
+    return results
@@ -0,0 +1,185 @@
+"""
+Importação em lote de despesas e investimentos.
+
+Os arquivos (CSV ou extrato OFX) são lidos em streaming, registro a
+registro; cada registro é validado e convertido para as colunas do
+modelo, e os erros são reportados com o número da linha (CSV) ou da
+transação (OFX). A gravação é feita pela rota em lotes.
+"""
+import csv
+import io
+import itertools
+import math
+import re
+from datetime import datetime
+
+FORMATS = ('csv', 'ofx')
+DECIMAL_SEPARATORS = ('.', ',')
+# Um só separador seguido de três dígitos: milhar ou decimal?
+AMBIGUOUS_NUMBER = re.compile(r'^[+-]?[1-9]\d{0,2}[.,]\d{3}$')
+RISK_LEVELS = ('low', 'medium', 'high')
+TRUE_VALUES = ('1', 'true', 'yes', 'sim', 's', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'nao', 'não', 'n')
+
+# Cabeçalhos alternativos (em português) aceitos nos CSVs
+COLUMN_ALIASES = {
+    'categoria': 'category',
+    'descricao': 'description',
+    'descrição': 'description',
+    'valor': 'amount',
+    'recorrente': 'is_recurring',
+    'tipo': 'investment_type',
+    'nome': 'name',
+    'retorno_esperado': 'expected_return',
+    'risco': 'risk_level'
+}
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+class RecordError(ValueError):
+    pass
+
+def detect_format(filename, requested=None):
+    """
+    Formato pedido explicitamente ou deduzido da extensão do arquivo
+    """
+    file_format = requested or (filename.rsplit('.', 1)[-1] if filename and '.' in filename else '')
+    file_format = file_format.lower()
+    if file_format == 'qfx':
+        file_format = 'ofx'
+    if file_format not in FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(FORMATS)}')
+    return file_format
+
+def _text_stream(stream):
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+def iter_csv_records(stream):
+    """
+    Gera (número da linha, dict) para cada linha do CSV. O separador
+    (',', ';' ou tab) é detectado pelo cabeçalho.
+    """
+    text = _text_stream(stream)
+    header = text.readline()
+    delimiter = max((',', ';', '\t'), key=header.count)
+    reader = csv.DictReader(itertools.chain([header], text), delimiter=delimiter)
+    reader.fieldnames = [
+        COLUMN_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in reader.fieldnames or []
+    ]
+    for record in reader:
+        yield reader.line_num, record
+
+def iter_ofx_records(stream):
+    """
+    Gera (número da transação, dict) para cada <STMTTRN> de um extrato
+    OFX (SGML ou XML), lendo o arquivo linha a linha
+    """
+    current = None
+    number = 0
+    for line in _text_stream(stream):
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing:
+                    if current is not None:
+                        yield number, current
+                    current = None
+                else:
+                    number += 1
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+def iter_records(stream, file_format):
+    if file_format == 'csv':
+        return iter_csv_records(stream)
+    return iter_ofx_records(stream)
+
+def _parse_float(value, field, decimal=None):
+    """
+    Número com separador de milhar opcional. Sem `decimal` ('.' ou ','), o
+    último separador é o decimal (1,234.56 ou 1.234,56) e um separador
+    repetido é de milhar; um único separador seguido de exatamente três
+    dígitos (1,234 ou 1.234) é ambíguo e rejeitado.
+    """
+    value = str(value).strip()
+    if decimal is None:
+        separators = [char for char in value if char in '.,']
+        if len(set(separators)) == 2:
+            decimal = separators[-1]
+        elif len(separators) > 1:
+            decimal = '.' if separators[0] == ',' else ','
+        elif AMBIGUOUS_NUMBER.match(value):
+            raise RecordError(f'{field} is ambiguous ({value}): send decimal=. or decimal=,')
+        else:
+            decimal = separators[0] if separators else '.'
+    thousands = ',' if decimal == '.' else '.'
+    value = value.replace(thousands, '').replace(decimal, '.')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise RecordError(f'{field} must be a number')
+    if not math.isfinite(number):
+        raise RecordError(f'{field} must be a finite number')
+    return number
+
+def _parse_bool(value, default):
+    if value is None or str(value).strip() == '':
+        return default
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RecordError('is_recurring must be true or false')
+
+def _required(record, field):
+    value = (record.get(field) or '').strip()
+    if not value:
+        raise RecordError(f'{field} is required')
+    return value
+
+def _parse_ofx_date(value):
+    # Ex.: 20250105120000[-3:BRT] -> só a data importa
+    try:
+        return datetime.strptime(value[:8], '%Y%m%d')
+    except (TypeError, ValueError):
+        raise RecordError('DTPOSTED must be a date (YYYYMMDD)')
+
+def expense_from_csv(record, decimal=None):
+    return {
+        'category': _required(record, 'category'),
+        'description': (record.get('description') or '').strip(),
+        'amount': _parse_float(_required(record, 'amount'), 'amount', decimal),
+        'is_recurring': _parse_bool(record.get('is_recurring'), True)
+    }
+
+def expense_from_ofx(record, category, decimal=None):
+    """
+    Apenas débitos viram despesas; créditos retornam None e são ignorados
+    """
+    amount = _parse_float(record.get('TRNAMT'), 'TRNAMT', decimal)
+    if amount >= 0:
+        return None
+    values = {
+        'category': category,
+        'description': (record.get('NAME') or record.get('MEMO') or '')[:255],
+        'amount': -amount,
+        'is_recurring': False
+    }
+    if record.get('DTPOSTED'):
+        values['created_at'] = _parse_ofx_date(record['DTPOSTED'])
+    return values
+
+def investment_from_csv(record, decimal=None):
+    risk_level = (record.get('risk_level') or 'medium').strip().lower()
+    if risk_level not in RISK_LEVELS:
+        raise RecordError(f'risk_level must be one of: {", ".join(RISK_LEVELS)}')
+    expected_return = (record.get('expected_return') or '').strip()
+    return {
+        'investment_type': _required(record, 'investment_type'),
+        'name': _required(record, 'name'),
+        'amount': _parse_float(_required(record, 'amount'), 'amount', decimal),
+        'expected_return': _parse_float(expected_return, 'expected_return', decimal) if expected_return else 0.0,
+        'risk_level': risk_level
+    }
@@ -0,0 +1,308 @@
+"""
+Fila de tarefas pesadas (projeções longas, lotes com muitos cenários,
+simulações grandes) executadas fora da requisição.
+
+As tarefas ficam na tabela job, de modo que sobrevivem a reinícios e
+podem ser executadas por qualquer processo. Um worker reivindica a
+próxima tarefa com um único UPDATE, atômico no banco, que também respeita
+o limite de tarefas simultâneas por usuário (JOB_USER_CONCURRENCY). Cada
+processo roda JOB_WORKERS threads; as do próprio processo são acordadas
+por submit() e as dos demais consultam a fila a cada JOB_POLL_INTERVAL
+segundos.
+
+As tarefas em execução recebem um heartbeat; se o processo morrer, após
+JOB_STALE_SECONDS sem heartbeat elas voltam para a fila (até
+JOB_MAX_ATTEMPTS tentativas). Tarefas terminadas são apagadas depois de
+JOB_RETENTION_DAYS dias.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import aliased
+from src.models.job import Job
+from src.models.user import db
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    pass
+
+class JobQueue:
+
+    def __init__(self, workers=2, user_concurrency=1, max_pending=20, poll_interval=1.0,
+                 heartbeat_interval=10.0, stale_after=60.0, max_attempts=3, retention_days=7):
+        self.workers = workers
+        self.user_concurrency = user_concurrency
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self.handlers = {}
+        self._app = None
+        self._threads = []
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._finished = threading.Condition()
+        self._stop = threading.Event()
+
+    def register(self, kind, handler):
+        """
+        `handler(user_id, params)` roda dentro de um contexto da aplicação e
+        devolve o resultado (serializável em JSON). O que ele adicionar à
+        sessão é gravado no mesmo commit que marca a tarefa como concluída.
+        """
+        self.handlers[kind] = handler
+        return handler
+
+    def start(self, app):
+        """
+        Inicia as threads de trabalho e a de manutenção (heartbeat,
+        recuperação de tarefas órfãs e limpeza)
+        """
+        if self._threads:
+            return
+        self._app = app
+        self._stop.clear()
+        with app.app_context():
+            self.recover()
+        self._threads = [
+            threading.Thread(target=self._work, daemon=True, name=f'job-worker-{index}')
+            for index in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._maintain, daemon=True, name='job-maintenance'))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    # Requisições
+
+    def submit(self, user_id, kind, params):
+        """
+        Grava a tarefa na fila e acorda um worker do processo
+        """
+        if kind not in self.handlers:
+            raise ValueError(f'kind must be one of: {", ".join(self.handlers)}')
+        pending = db.session.execute(
+            select(func.count()).select_from(Job)
+            .where(Job.user_id == user_id, Job.status.in_(('queued', 'running')))
+        ).scalar()
+        if pending >= self.max_pending:
+            raise QueueFullError(f'At most {self.max_pending} pending jobs per user')
+        job = Job(user_id=user_id, kind=kind, status='queued', params=json.dumps(params))
+        db.session.add(job)
+        db.session.commit()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def get(self, user_id, job_id):
+        return db.session.execute(select(Job).where(Job.id == job_id, Job.user_id == user_id)).scalar()
+
+    def wait(self, user_id, job_id, timeout):
+        """
+        Espera (até `timeout` segundos) a tarefa terminar; retorna a tarefa,
+        terminada ou não, ou None se ela não existir
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(user_id, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.status in FINISHED_STATUSES or remaining <= 0:
+                return job
+            # Encerra a transação de leitura para enxergar o commit do worker
+            db.session.rollback()
+            with self._finished:
+                self._finished.wait(min(remaining, self.poll_interval))
+
+    def cancel(self, user_id, job_id):
+        """
+        Cancela uma tarefa que ainda está na fila; retorna se cancelou
+        """
+        cancelled = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.user_id == user_id, Job.status == 'queued')
+            .values(status='cancelled', finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return bool(cancelled)
+
+    # Workers
+
+    def claim(self):
+        """
+        Reivindica a tarefa mais antiga da fila cujo usuário esteja abaixo do
+        limite de tarefas simultâneas. Retorna a tarefa ou None.
+        """
+        # Leitura barata antes do UPDATE, que precisa da trava de escrita
+        if db.session.execute(select(Job.id).where(Job.status == 'queued').limit(1)).first() is None:
+            db.session.rollback()
+            return None
+
+        candidate = aliased(Job, name='candidate')
+        running = aliased(Job, name='running_job')
+        running_count = (
+            select(func.count()).select_from(running)
+            .where(running.user_id == candidate.user_id, running.status == 'running')
+            .correlate(candidate)
+            .scalar_subquery()
+        )
+        next_id = (
+            select(candidate.id)
+            .where(candidate.status == 'queued', running_count < self.user_concurrency)
+            .order_by(candidate.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == next_id, Job.status == 'queued')
+            .values(status='running', claim_token=token, started_at=now, heartbeat_at=now, attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return None
+        return db.session.execute(select(Job).where(Job.claim_token == token)).scalar()
+
+    def execute(self, job):
+        token = job.claim_token
+        with self._running_lock:
+            self._running.add(token)
+        # Só conclui a tarefa quem ainda a detém: se a manutenção a devolveu
+        # à fila (heartbeat perdido) e outro worker a reivindicou, o token mudou
+        owned = (Job.id == job.id, Job.claim_token == token, Job.status == 'running')
+        try:
+            result = self.handlers[job.kind](job.user_id, json.loads(job.params))
+            finished = db.session.execute(
+                update(Job).where(*owned)
+                .values(status='succeeded', result=json.dumps(result), finished_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if finished:
+                db.session.commit()
+            else:
+                # Descarta também o que o handler gravou (projeções, versões)
+                db.session.rollback()
+                logger.warning('Job %s was reclaimed before it finished; result discarded', job.id)
+        except Exception as e:
+            db.session.rollback()
+            db.session.execute(
+                update(Job).where(*owned)
+                .values(status='failed', error=str(e), finished_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        finally:
+            with self._running_lock:
+                self._running.discard(token)
+            with self._finished:
+                self._finished.notify_all()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                with self._app.app_context():
+                    job = self.claim()
+                    if job is not None:
+                        self.execute(job)
+                        continue
+            except Exception:
+                logger.exception('Job worker error')
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+    # Manutenção
+
+    def heartbeat(self):
+        with self._running_lock:
+            tokens = list(self._running)
+        if tokens:
+            db.session.execute(
+                update(Job).where(Job.claim_token.in_(tokens), Job.status == 'running')
+                .values(heartbeat_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+    def recover(self):
+        """
+        Devolve à fila as tarefas cujo worker parou de dar sinal (ou as marca
+        como falhas após JOB_MAX_ATTEMPTS tentativas); retorna quantas
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stale = (Job.status == 'running', Job.heartbeat_at < cutoff)
+        failed = db.session.execute(
+            update(Job).where(*stale, Job.attempts >= self.max_attempts)
+            .values(status='failed', error='Worker lost', finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        requeued = db.session.execute(
+            update(Job).where(*stale)
+            .values(status='queued', claim_token=None, started_at=None, heartbeat_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if requeued:
+            with self._wakeup:
+                self._wakeup.notify_all()
+        return failed + requeued
+
+    def purge(self):
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        db.session.execute(
+            delete(Job).where(Job.status.in_(FINISHED_STATUSES), Job.finished_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def _maintain(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                with self._app.app_context():
+                    self.heartbeat()
+                    self.recover()
+                    self.purge()
+            except Exception:
+                logger.exception('Job maintenance error')
+
+    def stats(self):
+        with self._running_lock:
+            running = len(self._running)
+        return {
+            'workers': len([thread for thread in self._threads if thread.name.startswith('job-worker')]),
+            'running_here': running,
+            'user_concurrency': self.user_concurrency,
+            'max_pending': self.max_pending
+        }
+
+job_queue = JobQueue(
+    workers=int(os.environ.get('JOB_WORKERS', 2)),
+    user_concurrency=int(os.environ.get('JOB_USER_CONCURRENCY', 1)),
+    max_pending=int(os.environ.get('JOB_MAX_PENDING', 20)),
+    poll_interval=float(os.environ.get('JOB_POLL_INTERVAL', 1.0)),
+    heartbeat_interval=float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 10.0)),
+    stale_after=float(os.environ.get('JOB_STALE_SECONDS', 60.0)),
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 3)),
+    retention_days=float(os.environ.get('JOB_RETENTION_DAYS', 7))
+)
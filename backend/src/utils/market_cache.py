@@ -0,0 +1,274 @@
+"""
+Cache de dados de mercado com stale-while-revalidate.
+
+Cada série tem seu TTL. As leituras nunca esperam pelo provedor: um
+valor vencido continua sendo servido (marcado como 'stale') enquanto uma
+atualização roda em segundo plano, com no máximo uma atualização em
+andamento por série. Uma thread de atualização mantém as séries quentes
+renovadas antes de vencerem, e o último valor de cada série é gravado em
+SQLite para que um reinício não comece com o cache frio.
+
+Cada worker do gunicorn tem seu próprio cache e sua própria thread; o
+snapshot em SQLite é compartilhado.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from src.utils.market_client import BCB_SERIES, latest_point, market_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'market_cache.db')
+DEFAULT_TICKERS = 'PETR4,VALE3,ITUB4,BBDC4'
+
+# TTL por série, em segundos
+DEFAULT_TTLS = {
+    'selic': 3600,
+    'cdi': 3600,
+    'ipca_12m': 6 * 3600,
+    'quotes': 60,
+    'symbols': 24 * 3600
+}
+
+# Fração do TTL a partir da qual a thread de atualização renova a série
+REFRESH_AHEAD = 0.8
+
+class MarketDataCache:
+
+    def __init__(self, fetchers, ttls, snapshot_path=DEFAULT_SNAPSHOT_PATH, refresh_interval=15.0, clock=time.time):
+        self.fetchers = fetchers
+        self.ttls = ttls
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._entries = {}
+        self._errors = {}
+        self._refreshing = set()
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, key):
+        """
+        Retorna (valor, metadados) sem bloquear. O valor é None enquanto a
+        série nunca tiver sido buscada; se estiver vencido ou ausente, uma
+        atualização é disparada em segundo plano.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        age = self._clock() - entry['fetched_at'] if entry else None
+        stale = entry is None or age >= self.ttls[key]
+        if stale:
+            self.revalidate(key)
+        if entry is None:
+            return None, {'fetched_at': None, 'age_seconds': None, 'stale': True}
+        return entry['value'], {
+            'fetched_at': datetime.fromtimestamp(entry['fetched_at']).isoformat(),
+            'age_seconds': round(age, 1),
+            'stale': stale
+        }
+
+    def version(self, *keys):
+        """
+        Identificador dos valores atuais das séries (o horário de cada
+        busca e se está vencida), para ETags. Como get, dispara a
+        atualização das vencidas.
+        """
+        now = self._clock()
+        parts = []
+        for key in keys:
+            with self._lock:
+                entry = self._entries.get(key)
+            stale = entry is None or now - entry['fetched_at'] >= self.ttls[key]
+            if stale:
+                self.revalidate(key)
+            parts.append(f"{key}@{entry['fetched_at']:.3f}{'-stale' if stale else ''}" if entry else f'{key}@-')
+        return ','.join(parts)
+
+    def subscribe(self, key, callback):
+        """
+        Registra callback(valor, fetched_at) chamado a cada novo valor da
+        série, seja de uma atualização ou do snapshot. Se a série já tiver
+        valor, o callback é chamado imediatamente.
+        """
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(callback)
+            entry = self._entries.get(key)
+        if entry:
+            callback(entry['value'], entry['fetched_at'])
+
+    def _notify(self, key, entry):
+        for callback in self._subscribers.get(key, ()):
+            try:
+                callback(entry['value'], entry['fetched_at'])
+            except Exception as e:
+                logger.warning('Market data subscriber failed for %s: %s', key, e)
+
+    def revalidate(self, key):
+        """
+        Dispara a atualização da série em segundo plano, se já não houver uma
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh_and_release, args=(key,), daemon=True,
+                         name=f'market-cache-{key}').start()
+
+    def _refresh_and_release(self, key):
+        try:
+            self.refresh(key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def refresh(self, key):
+        """
+        Busca a série no provedor e atualiza cache e snapshot. Em caso de
+        falha o valor anterior é mantido.
+        """
+        try:
+            with self._lock:
+                previous = self._entries.get(key, {}).get('value')
+            value = self.fetchers[key](previous)
+        except Exception as e:
+            logger.warning('Market data refresh failed for %s: %s', key, e)
+            with self._lock:
+                self._errors[key] = str(e)
+            return False
+
+        entry = {'value': value, 'fetched_at': self._clock()}
+        with self._lock:
+            self._entries[key] = entry
+            self._errors.pop(key, None)
+        self._persist(key, entry)
+        self._notify(key, entry)
+        return True
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        connection = sqlite3.connect(self.snapshot_path, timeout=5)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS market_snapshot ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)'
+        )
+        return connection
+
+    def _persist(self, key, entry):
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO market_snapshot (key, value, fetched_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(entry['value']), entry['fetched_at'])
+                )
+        except sqlite3.Error as e:
+            logger.warning('Could not persist market snapshot for %s: %s', key, e)
+
+    def load_snapshot(self):
+        """
+        Carrega o último snapshot gravado (valores possivelmente vencidos)
+        """
+        try:
+            with self._connect() as connection:
+                rows = connection.execute('SELECT key, value, fetched_at FROM market_snapshot').fetchall()
+        except sqlite3.Error as e:
+            logger.warning('Could not load market snapshot: %s', e)
+            return 0
+        loaded = {}
+        with self._lock:
+            for key, value, fetched_at in rows:
+                current = self._entries.get(key)
+                if key in self.fetchers and (current is None or current['fetched_at'] < fetched_at):
+                    loaded[key] = self._entries[key] = {'value': json.loads(value), 'fetched_at': fetched_at}
+        for key, entry in loaded.items():
+            self._notify(key, entry)
+        return len(rows)
+
+    def refresh_due(self):
+        """
+        Renova as séries ausentes ou próximas de vencer
+        """
+        now = self._clock()
+        with self._lock:
+            due = [
+                key for key in self.fetchers
+                if key not in self._entries
+                or now - self._entries[key]['fetched_at'] >= self.ttls[key] * REFRESH_AHEAD
+            ]
+        for key in due:
+            self.revalidate(key)
+        return due
+
+    def start(self):
+        """
+        Inicia a thread de atualização
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='market-cache-refresher')
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh_due()
+            self._stop.wait(self.refresh_interval)
+
+    def stats(self):
+        now = self._clock()
+        with self._lock:
+            return {
+                key: {
+                    'ttl_seconds': self.ttls[key],
+                    'age_seconds': round(now - self._entries[key]['fetched_at'], 1) if key in self._entries else None,
+                    'refreshing': key in self._refreshing,
+                    'last_error': self._errors.get(key)
+                }
+                for key in self.fetchers
+            }
+
+def _series_fetcher(code):
+    return lambda previous: latest_point(market_client.fetch_bcb_latest(code))
+
+def _quotes_fetcher(tickers, api_key):
+    def fetch(previous):
+        snapshot = market_client.fetch_market_snapshot(series={}, symbols=tickers, api_key=api_key)
+        if not snapshot['quotes']:
+            raise RuntimeError('; '.join(snapshot['errors'].values()) or 'No quotes returned')
+        # Cada cotação guarda o momento em que foi buscada; símbolos que
+        # falharam mantêm a cotação (e o horário) anterior
+        fetched_at = time.time()
+        quotes = {symbol: {**quote, 'fetched_at': fetched_at} for symbol, quote in snapshot['quotes'].items()}
+        return {**(previous or {}), **quotes}
+    return fetch
+
+def _symbols_fetcher(api_key):
+    return lambda previous: market_client.fetch_available_symbols(api_key)
+
+def create_market_cache():
+    """
+    Cria o cache a partir de MARKET_TICKERS, MARKET_TTL_<SÉRIE>,
+    MARKET_CACHE_PATH, MARKET_REFRESH_INTERVAL e BRAPI_API_KEY
+    """
+    tickers = [symbol.strip().upper() for symbol in os.environ.get('MARKET_TICKERS', DEFAULT_TICKERS).split(',') if symbol.strip()]
+    fetchers = {name: _series_fetcher(BCB_SERIES[name]) for name in ('selic', 'cdi', 'ipca_12m')}
+    fetchers['quotes'] = _quotes_fetcher(tickers, os.environ.get('BRAPI_API_KEY'))
+    fetchers['symbols'] = _symbols_fetcher(os.environ.get('BRAPI_API_KEY'))
+    ttls = {key: float(os.environ.get(f'MARKET_TTL_{key.upper()}', ttl)) for key, ttl in DEFAULT_TTLS.items()}
+    return MarketDataCache(
+        fetchers,
+        ttls,
+        snapshot_path=os.environ.get('MARKET_CACHE_PATH', DEFAULT_SNAPSHOT_PATH),
+        refresh_interval=float(os.environ.get('MARKET_REFRESH_INTERVAL', 15))
+    )
+
+market_cache = create_market_cache()
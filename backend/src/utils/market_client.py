@@ -0,0 +1,201 @@
+"""
+Cliente HTTP para os provedores de dados de mercado (brapi.dev e SGS do
+Banco Central).
+
+Usa uma única requests.Session com pool de conexões, timeouts em todas
+as chamadas e novas tentativas com backoff exponencial para erros
+transitórios. Várias séries e símbolos são buscados em paralelo em um
+pool de threads. As URLs base podem ser trocadas por variáveis de
+ambiente (ex.: para um servidor falso em benchmarks).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BRAPI_BASE_URL = os.environ.get('BRAPI_BASE_URL', 'https://brapi.dev/api')
+BCB_BASE_URL = os.environ.get('BCB_API_URL', 'https://api.bcb.gov.br')
+
+# Códigos das séries do SGS (Banco Central)
+BCB_SERIES = {
+    'selic': 432,       # Meta Selic (% a.a.)
+    'cdi': 4389,        # CDI anualizado base 252 (% a.a.)
+    'ipca': 433,        # IPCA mensal (%)
+    'ipca_12m': 13522   # IPCA acumulado em 12 meses (%)
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# A API do SGS limita cada consulta de série diária a 10 anos
+BCB_MAX_WINDOW_YEARS = 10
+
+class MarketDataError(Exception):
+    pass
+
+class MarketDataClient:
+
+    def __init__(self, brapi_url=BRAPI_BASE_URL, bcb_url=BCB_BASE_URL, connect_timeout=3.05, read_timeout=10.0,
+                 retries=2, backoff_factor=0.3, pool_size=20, max_workers=8):
+        self.brapi_url = brapi_url.rstrip('/')
+        self.bcb_url = bcb_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='market-data')
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            connect_timeout=float(os.environ.get('MARKET_CONNECT_TIMEOUT', 3.05)),
+            read_timeout=float(os.environ.get('MARKET_READ_TIMEOUT', 10)),
+            retries=int(os.environ.get('MARKET_RETRIES', 2)),
+            max_workers=int(os.environ.get('MARKET_MAX_WORKERS', 8))
+        )
+
+    def get_json(self, url, params=None, headers=None, timeout=None):
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            raise MarketDataError(f'{url}: {e}') from e
+        if response.status_code != 200:
+            raise MarketDataError(f'{url}: HTTP {response.status_code}')
+        try:
+            return response.json()
+        except ValueError as e:
+            raise MarketDataError(f'{url}: invalid JSON') from e
+
+    def fetch_brapi(self, endpoint, api_key=None, params=None):
+        headers = {'Authorization': f'Bearer {api_key}'} if api_key else None
+        return self.get_json(f'{self.brapi_url}/{endpoint.lstrip("/")}', params=params, headers=headers)
+
+    def fetch_bcb_latest(self, code, last=1):
+        """
+        Últimos `last` pontos de uma série do SGS: [{'data': 'dd/mm/aaaa', 'valor': '...'}]
+        """
+        return self.get_json(f'{self.bcb_url}/dados/serie/bcdata.sgs.{code}/dados/ultimos/{last}',
+                             params={'formato': 'json'})
+
+    def fetch_bcb_range(self, code, start, end):
+        """
+        Pontos de uma série do SGS entre duas datas, buscados em janelas de
+        até BCB_MAX_WINDOW_YEARS anos (limite da API) em paralelo
+        """
+        windows = []
+        window_start = start
+        while window_start <= end:
+            window_end = min(end, window_start + timedelta(days=365 * BCB_MAX_WINDOW_YEARS - 1))
+            windows.append((window_start, window_end))
+            window_start = window_end + timedelta(days=1)
+
+        calls = {
+            index: (lambda first=first, last=last: self.get_json(
+                f'{self.bcb_url}/dados/serie/bcdata.sgs.{code}/dados',
+                params={'formato': 'json', 'dataInicial': f'{first:%d/%m/%Y}', 'dataFinal': f'{last:%d/%m/%Y}'}
+            ))
+            for index, (first, last) in enumerate(windows)
+        }
+        results, errors = self.fan_out(calls)
+        if errors:
+            raise MarketDataError('; '.join(errors.values()))
+        return [point for index in range(len(windows)) for point in results[index]]
+
+    def fetch_quote_history(self, symbol, api_key=None, history_range='1y'):
+        """
+        Fechamentos diários de um ativo: [(data, preço)]
+        """
+        data = self.fetch_brapi(f'quote/{symbol}', api_key, params={'range': history_range, 'interval': '1d'})
+        results = data.get('results') or []
+        if not results:
+            raise MarketDataError(f'No quote for {symbol}')
+        return [
+            (datetime.fromtimestamp(point['date'], tz=timezone.utc).date(), point['close'])
+            for point in results[0].get('historicalDataPrice') or []
+            if point.get('close') is not None
+        ]
+
+    def fetch_quote(self, symbol, api_key=None):
+        """
+        Cotação de um ativo no formato usado pela API: symbol, price, change, change_percent
+        """
+        data = self.fetch_brapi(f'quote/{symbol}', api_key)
+        results = data.get('results') or []
+        if not results:
+            raise MarketDataError(f'No quote for {symbol}')
+        quote = results[0]
+        return {
+            'symbol': quote.get('symbol', symbol),
+            'price': quote.get('regularMarketPrice'),
+            'change': quote.get('regularMarketChange'),
+            'change_percent': quote.get('regularMarketChangePercent')
+        }
+
+    def fetch_available_symbols(self, api_key=None):
+        """
+        Universo de símbolos negociados listados pela brapi
+        """
+        data = self.fetch_brapi('available', api_key)
+        symbols = data.get('stocks') or []
+        if not symbols:
+            raise MarketDataError('No symbols available')
+        return symbols
+
+    def fan_out(self, calls):
+        """
+        Executa as chamadas ({nome: função sem argumentos}) em paralelo.
+        Retorna (resultados, erros), ambos indexados pelo nome.
+        """
+        futures = {name: self._executor.submit(call) for name, call in calls.items()}
+        results, errors = {}, {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+        return results, errors
+
+    def fetch_market_snapshot(self, series=None, symbols=(), api_key=None):
+        """
+        Busca em paralelo o último valor das séries do SGS e as cotações
+        dos símbolos. Retorna {'series': {...}, 'quotes': {...}, 'errors': {...}}.
+        """
+        series = BCB_SERIES if series is None else series
+        calls = {
+            ('series', name): (lambda code=code: latest_point(self.fetch_bcb_latest(code)))
+            for name, code in series.items()
+        }
+        calls.update({
+            ('quotes', symbol): (lambda symbol=symbol: self.fetch_quote(symbol, api_key))
+            for symbol in symbols
+        })
+        results, errors = self.fan_out(calls)
+        snapshot = {'series': {}, 'quotes': {}, 'errors': {}}
+        for (kind, name), value in results.items():
+            snapshot[kind][name] = value
+        for (kind, name), error in errors.items():
+            snapshot['errors'][f'{kind}.{name}'] = error
+        return snapshot
+
+def latest_point(points):
+    """
+    Converte o último ponto de uma série do SGS em {'value', 'date' (ISO)}
+    """
+    if not points:
+        raise MarketDataError('Empty series')
+    point = points[-1]
+    return {
+        'value': float(point['valor']),
+        'date': datetime.strptime(point['data'], '%d/%m/%Y').date().isoformat()
+    }
+
+market_client = MarketDataClient.from_env()
@@ -0,0 +1,316 @@
+"""
+Métricas da aplicação no formato texto do Prometheus (GET /api/metrics).
+
+Os hooks de requisição medem, por blueprint e rota (o padrão da URL, não
+o caminho), a latência total, o tempo de CPU da thread, a contagem por
+status e as requisições em andamento. Os listeners do SQLAlchemy contam
+os comandos SQL e o tempo gasto no banco em cada requisição, inclusive
+nas threads que a requisição dispara com contextvars.copy_context()
+(ver routes/dashboard). Latência alta com pouco tempo de banco e CPU
+alta aponta para cálculo ou serialização; muito tempo de banco, para as
+consultas.
+
+As respostas 5xx devolvidas pelos blocos `except Exception` das rotas
+entram em http_request_errors_total, assim como as exceções não tratadas.
+
+Local a cada processo, como os caches: com vários workers do gunicorn
+cada um expõe os próprios números e o Prometheus soma as séries.
+"""
+import contextvars
+import threading
+import time
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites dos histogramas, em segundos e em comandos por requisição
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self.header()
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set(self, labels=(), value=0):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, labels=(), value=0.0):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = sorted((labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items())
+        lines = self.header()
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+class MetricsRegistry:
+    """
+    Métricas registradas e coletores chamados a cada leitura (para valores
+    que já existem em outro lugar, como as estatísticas dos caches)
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """
+        `collector()` devolve uma lista de métricas (Gauge/Counter) já preenchidas
+        """
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+REQUEST_LABELS = ('blueprint', 'route', 'method')
+
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Latência das requisições (soma por blueprint para o total do blueprint)',
+    REQUEST_LABELS)
+request_cpu = registry.histogram(
+    'http_request_cpu_seconds', 'Tempo de CPU da thread da requisição', REQUEST_LABELS)
+requests_total = registry.counter(
+    'http_requests_total', 'Requisições atendidas, por status', REQUEST_LABELS + ('status',))
+request_errors = registry.counter(
+    'http_request_errors_total', 'Respostas 5xx, inclusive as devolvidas pelos blocos except das rotas',
+    REQUEST_LABELS + ('status',))
+requests_in_flight = registry.gauge(
+    'http_requests_in_flight', 'Requisições em andamento', ('blueprint',))
+request_db_statements = registry.histogram(
+    'http_request_db_statements', 'Comandos SQL executados por requisição', REQUEST_LABELS, STATEMENT_BUCKETS)
+request_db_duration = registry.histogram(
+    'http_request_db_duration_seconds', 'Tempo no banco por requisição', REQUEST_LABELS)
+db_statement_duration = registry.histogram(
+    'db_statement_duration_seconds', 'Duração de cada comando SQL, pelo primeiro verbo', ('operation',))
+
+class RequestStats:
+    """
+    Comandos SQL e tempo de banco acumulados por uma requisição (as threads
+    auxiliares somam no mesmo objeto)
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.statements += 1
+            self.db_seconds += seconds
+
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+def current_request_stats():
+    return _request_stats.get()
+
+def _operation(statement):
+    verb = statement.lstrip().split(None, 1)[:1]
+    return verb[0].upper() if verb else 'UNKNOWN'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    db_statement_duration.observe((_operation(statement),), elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(elapsed)
+
+def _handle_error(exception_context):
+    # Comando que falhou: descarta o início registrado
+    starts = exception_context.connection.info.get('metrics_query_start') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+def _request_labels():
+    rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    return (request.blueprint or 'app', rule, request.method)
+
+def _before_request():
+    g.metrics_labels = _request_labels()
+    g.metrics_started = (time.perf_counter(), time.thread_time())
+    g.metrics_token = _request_stats.set(RequestStats())
+    requests_in_flight.inc((g.metrics_labels[0],))
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    labels = g.metrics_labels
+    status = str(response.status_code)
+    request_duration.observe(labels, time.perf_counter() - started[0])
+    request_cpu.observe(labels, time.thread_time() - started[1])
+    requests_total.inc(labels + (status,))
+    if response.status_code >= 500:
+        request_errors.inc(labels + (status,))
+    stats = _request_stats.get()
+    if stats is not None:
+        request_db_statements.observe(labels, stats.statements)
+        request_db_duration.observe(labels, stats.db_seconds)
+    return response
+
+def _teardown_request(exception=None):
+    labels = g.pop('metrics_labels', None)
+    if labels is None:
+        return
+    requests_in_flight.dec((labels[0],))
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        try:
+            _request_stats.reset(token)
+        except ValueError:
+            _request_stats.set(None)
+
+def cache_collector(caches):
+    """
+    Coletor das estatísticas de caches com stats() no formato do TTLCache
+    (entries, hits, misses, evictions); `caches` é nome -> cache
+    """
+    def collect():
+        entries = Gauge('cache_entries', 'Entradas em cada cache', ('cache',))
+        hits = Counter('cache_hits_total', 'Acertos de cada cache', ('cache',))
+        misses = Counter('cache_misses_total', 'Faltas de cada cache', ('cache',))
+        evictions = Counter('cache_evictions_total', 'Entradas removidas por limite de tamanho', ('cache',))
+        for name, cache in caches.items():
+            stats = cache.stats()
+            entries.set((name,), stats['entries'])
+            hits.inc((name,), stats['hits'])
+            misses.inc((name,), stats['misses'])
+            evictions.inc((name,), stats['evictions'])
+        return [entries, hits, misses, evictions]
+    return collect
+
+def market_collector(market_cache, quote_store):
+    """
+    Coletor da idade de cada chave do cache de mercado e do tamanho do
+    QuoteStore
+    """
+    def collect():
+        age = Gauge('market_cache_age_seconds', 'Idade do último valor de cada chave do cache de mercado', ('key',))
+        refreshing = Gauge('market_cache_refreshing', 'Chaves com atualização em andamento', ('key',))
+        failing = Gauge('market_cache_last_error', 'Chaves cuja última atualização falhou', ('key',))
+        for key, stats in market_cache.stats().items():
+            if stats['age_seconds'] is not None:
+                age.set((key,), stats['age_seconds'])
+            refreshing.set((key,), int(stats['refreshing']))
+            failing.set((key,), int(stats['last_error'] is not None))
+        store = Gauge('quote_store_entries', 'Símbolos e cotações no QuoteStore', ('kind',))
+        stats = quote_store.stats()
+        store.set(('symbols',), stats['symbols'])
+        store.set(('quotes',), stats['quotes'])
+        return [age, refreshing, failing, store]
+    return collect
+
+def init_metrics(app):
+    """
+    Registra os hooks de requisição e os listeners de SQL. Chame antes dos
+    outros after_request (como a compressão) para que a latência os inclua.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,157 @@
+"""
+Simulação de Monte Carlo da projeção de fluxo de caixa.
+
+Retornos de investimento e inflação são sorteados ano a ano para cada
+trajetória. As trajetórias são simuladas em blocos de tamanho fixo, como
+arrays NumPy, cada um com sua própria semente derivada de um único
+SeedSequence: o resultado depende apenas da semente, e não de quantos
+processos participaram. Para muitas trajetórias os blocos são distribuídos
+em um ProcessPoolExecutor, liberando o worker do gunicorn mais cedo.
+"""
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+DISTRIBUTIONS = ('normal', 'lognormal', 'student_t')
+PERCENTILES = (5, 25, 50, 75, 95)
+TARGET_BASES = ('real', 'nominal')
+
+MAX_PATHS = 100_000
+MAX_YEARS = 100
+# Sementes sorteadas cabem em um inteiro exato do JSON (2^53), para que o
+# cliente possa reenviá-las e reproduzir a simulação
+SEED_BITS = 53
+CHUNK_SIZE = 5_000
+PARALLEL_THRESHOLD = int(os.environ.get('MONTE_CARLO_PARALLEL_THRESHOLD', 20_000))
+MAX_WORKERS = int(os.environ.get('MONTE_CARLO_WORKERS', os.cpu_count() or 1))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # forkserver: um fork do processo do worker herdaria travas
+            # (logging, sqlite) seguradas pelas threads de mercado, tarefas e dashboard
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS,
+                                            mp_context=multiprocessing.get_context('forkserver'))
+        return _executor
+
+def draw_rates(rng, distribution, mean, volatility, size, degrees_of_freedom=5):
+    """
+    Sorteia taxas anuais (frações) com a média e a volatilidade informadas.
+    Perdas são limitadas a -100%.
+    """
+    if distribution == 'normal':
+        rates = rng.normal(mean, volatility, size)
+    elif distribution == 'lognormal':
+        # Parâmetros do log do fator (1 + taxa) que preservam média e desvio
+        sigma2 = np.log1p(volatility ** 2 / (1.0 + mean) ** 2)
+        mu = np.log1p(mean) - sigma2 / 2
+        rates = np.expm1(rng.normal(mu, np.sqrt(sigma2), size))
+    elif distribution == 'student_t':
+        # t de Student reescalada para ter o desvio padrão pedido
+        scale = volatility * np.sqrt((degrees_of_freedom - 2) / degrees_of_freedom)
+        rates = mean + scale * rng.standard_t(degrees_of_freedom, size)
+    else:
+        raise ValueError(f'distribution must be one of: {", ".join(DISTRIBUTIONS)}')
+    return np.maximum(rates, -1.0)
+
+def _simulate_chunk(seed_sequence, n_paths, years, initial_balance, annual_savings,
+                    returns, inflation, degrees_of_freedom):
+    # Executado nos processos do pool: precisa ser uma função de módulo
+    rng = np.random.default_rng(seed_sequence)
+    size = (n_paths, years)
+    growth = 1.0 + draw_rates(rng, *returns, size, degrees_of_freedom)
+    deflator = np.cumprod(1.0 + draw_rates(rng, *inflation, size, degrees_of_freedom), axis=1)
+
+    nominal = np.empty(size)
+    balance = np.full(n_paths, float(initial_balance))
+    for year in range(years):
+        balance = (balance + annual_savings) * growth[:, year]
+        nominal[:, year] = balance
+    return nominal, nominal / deflator
+
+def validate_distribution(name, distribution, volatility, degrees_of_freedom):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f'{name}_distribution must be one of: {", ".join(DISTRIBUTIONS)}')
+    if volatility < 0:
+        raise ValueError(f'{name}_volatility must not be negative')
+    if distribution == 'student_t' and degrees_of_freedom <= 2:
+        raise ValueError('degrees_of_freedom must be greater than 2')
+
+def simulate(years, paths=10_000, initial_balance=0.0, monthly_savings=0.0,
+             return_mean=0.10, return_volatility=0.15, return_distribution='normal',
+             inflation_mean=0.045, inflation_volatility=0.015, inflation_distribution='normal',
+             degrees_of_freedom=5, seed=None, target=None, target_basis='real'):
+    """
+    Simula `paths` trajetórias de `years` anos e retorna as faixas de
+    percentis (P5/P25/P50/P75/P95) do saldo acumulado, nominal e real.
+    Taxas e volatilidades são frações anuais. Se `target` for informado,
+    inclui a probabilidade de atingi-lo no fim do horizonte e, ano a ano,
+    a fração de trajetórias que já o atingiram.
+    """
+    years = int(years)
+    paths = int(paths)
+    if years < 1 or years > MAX_YEARS:
+        raise ValueError(f'years must be between 1 and {MAX_YEARS}')
+    if paths < 1 or paths > MAX_PATHS:
+        raise ValueError(f'paths must be between 1 and {MAX_PATHS}')
+    if target_basis not in TARGET_BASES:
+        raise ValueError(f'target_basis must be one of: {", ".join(TARGET_BASES)}')
+    validate_distribution('return', return_distribution, return_volatility, degrees_of_freedom)
+    validate_distribution('inflation', inflation_distribution, inflation_volatility, degrees_of_freedom)
+
+    if seed is None:
+        seed = secrets.randbits(SEED_BITS)
+    seed_sequence = np.random.SeedSequence(seed)
+    chunk_sizes = [CHUNK_SIZE] * (paths // CHUNK_SIZE)
+    if paths % CHUNK_SIZE:
+        chunk_sizes.append(paths % CHUNK_SIZE)
+    chunk_seeds = seed_sequence.spawn(len(chunk_sizes))
+
+    returns = (return_distribution, return_mean, return_volatility)
+    inflation = (inflation_distribution, inflation_mean, inflation_volatility)
+    args = [
+        (chunk_seed, n_paths, years, initial_balance, monthly_savings * 12,
+         returns, inflation, degrees_of_freedom)
+        for chunk_seed, n_paths in zip(chunk_seeds, chunk_sizes)
+    ]
+
+    if paths >= PARALLEL_THRESHOLD and MAX_WORKERS > 1 and len(args) > 1:
+        results = list(_get_executor().map(_simulate_chunk, *zip(*args)))
+    else:
+        results = [_simulate_chunk(*chunk_args) for chunk_args in args]
+
+    nominal = np.concatenate([result[0] for result in results])
+    real = np.concatenate([result[1] for result in results])
+
+    result = {
+        'years': list(range(1, years + 1)),
+        'paths': paths,
+        'seed': seed_sequence.entropy,
+        'percentiles': {
+            'nominal': _percentile_bands(nominal),
+            'real': _percentile_bands(real)
+        }
+    }
+
+    if target is not None:
+        balances = real if target_basis == 'real' else nominal
+        reached = balances >= float(target)
+        result['target'] = {
+            'value': float(target),
+            'basis': target_basis,
+            'probability': round(float(reached[:, -1].mean()), 4),
+            'probability_by_year': np.round(np.logical_or.accumulate(reached, axis=1).mean(axis=0), 4).tolist()
+        }
+
+    return result
+
+def _percentile_bands(balances):
+    bands = np.round(np.percentile(balances, PERCENTILES, axis=0), 2)
+    return {f'p{percentile}': band.tolist() for percentile, band in zip(PERCENTILES, bands)}
@@ -0,0 +1,83 @@
+"""
+Paginação por cursor (keyset) e streaming NDJSON para rotas de listagem.
+
+Sem parâmetros, as rotas continuam devolvendo o array JSON completo.
+Com ?after=<id>&limit=<n> devolvem uma página ordenada por id e, se
+houver mais linhas, o cursor da próxima página no cabeçalho
+X-Next-After. Com Accept: application/x-ndjson as linhas são
+serializadas e enviadas uma a uma, à medida que saem do cursor.
+
+Quando a rota informa as colunas (list_columns() do modelo), a consulta
+devolve tuplas em vez de objetos do ORM (ver utils/serialization).
+"""
+from flask import Response, current_app, jsonify, request, stream_with_context, url_for
+from src.utils.serialization import row_serializer
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def page_args():
+    """
+    Lê ?after e ?limit; limit é limitado a MAX_PAGE_SIZE
+    """
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    elif after is not None:
+        limit = DEFAULT_PAGE_SIZE
+    return after, limit
+
+def ndjson_response(rows, serialize):
+    """
+    Resposta em streaming, uma linha JSON por item de `rows`
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        for row in rows:
+            yield dumps(serialize(row)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def paginated_response(query, model, serialize=lambda item: item.to_dict(), columns=None):
+    """
+    Responde a uma listagem de `model` (ordenada por id) conforme os
+    parâmetros de paginação e o cabeçalho Accept da requisição. Com
+    `columns`, só essas colunas são lidas e `serialize` é ignorado.
+    """
+    after, limit = page_args()
+    query = query.order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+
+    serialize_all = lambda items: [serialize(item) for item in items]
+    if columns is not None:
+        query = query.with_entities(*columns)
+        serializer = row_serializer(columns, current_app.json)
+        serialize, serialize_all = serializer.row, serializer.rows
+
+    if wants_ndjson():
+        if limit is not None:
+            query = query.limit(limit)
+        return ndjson_response(query.yield_per(STREAM_BATCH_SIZE), serialize)
+
+    if limit is None:
+        return jsonify(serialize_all(query.all())), 200
+
+    items = query.limit(limit + 1).all()
+    response = jsonify(serialize_all(items[:limit]))
+    if len(items) > limit:
+        next_after = items[limit - 1].id
+        response.headers['X-Next-After'] = str(next_after)
+        # Mantém os demais parâmetros da consulta (?view=summary etc.)
+        next_url = url_for(request.endpoint, _external=True, **{
+            **(request.view_args or {}), **request.args.to_dict(flat=False), 'after': next_after, 'limit': limit
+        })
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response, 200
@@ -0,0 +1,137 @@
+"""
+Agregados da carteira por usuário.
+
+Para cada (usuário, tipo de investimento, nível de risco) a tabela
+portfolio_aggregate guarda o total aplicado, a soma de valor x retorno
+esperado e o número de posições. As rotas que gravam investimentos
+aplicam a variação na mesma transação (upsert com incremento), então o
+resumo da carteira lê poucas linhas, qualquer que seja o número de
+posições. recompute_aggregates refaz tudo a partir da tabela investment.
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal, select
+from src.models.financial import Investment, PortfolioAggregate, db
+from src.utils.database import upsert
+
+DEFAULT_RISK_LEVEL = 'medium'
+
+def bucket_deltas(investments, sign=1):
+    """
+    Agrupa investimentos (objetos ou dicts de colunas) por tipo e risco.
+    Retorna {(tipo, risco): [valor, valor x retorno, posições]}; sign=-1
+    para remoções.
+    """
+    deltas = defaultdict(lambda: [0.0, 0.0, 0])
+    for investment in investments:
+        if isinstance(investment, dict):
+            investment_type, risk_level = investment['investment_type'], investment.get('risk_level')
+            amount, expected_return = investment['amount'], investment.get('expected_return')
+        else:
+            investment_type, risk_level = investment.investment_type, investment.risk_level
+            amount, expected_return = investment.amount, investment.expected_return
+        delta = deltas[(investment_type, risk_level or DEFAULT_RISK_LEVEL)]
+        delta[0] += sign * amount
+        delta[1] += sign * amount * (expected_return or 0.0)
+        delta[2] += sign
+    return deltas
+
+def apply_deltas(user_id, deltas):
+    """
+    Soma as variações aos agregados do usuário na transação corrente
+    """
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    statement = upsert(db.session, PortfolioAggregate).values([
+        {
+            'user_id': user_id,
+            'investment_type': investment_type,
+            'risk_level': risk_level,
+            'total_amount': amount,
+            'weighted_return_sum': weighted,
+            'position_count': count,
+            'updated_at': now
+        }
+        for (investment_type, risk_level), (amount, weighted, count) in deltas.items()
+    ])
+    excluded = statement.excluded
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id', 'investment_type', 'risk_level'],
+        set_={
+            'total_amount': PortfolioAggregate.total_amount + excluded.total_amount,
+            'weighted_return_sum': PortfolioAggregate.weighted_return_sum + excluded.weighted_return_sum,
+            'position_count': PortfolioAggregate.position_count + excluded.position_count,
+            'updated_at': excluded.updated_at
+        }
+    ))
+    if any(count < 0 for _, _, count in deltas.values()):
+        db.session.execute(delete(PortfolioAggregate).where(
+            PortfolioAggregate.user_id == user_id,
+            PortfolioAggregate.position_count <= 0
+        ))
+
+def track_investments(user_id, investments, sign=1):
+    apply_deltas(user_id, bucket_deltas(investments, sign))
+
+def recompute_aggregates(connection, user_id=None):
+    """
+    Refaz os agregados (de um usuário ou de todos) a partir dos
+    investimentos. Aceita uma sessão ou conexão; não confirma a transação.
+    Retorna o número de linhas de agregado gravadas.
+    """
+    risk_level = func.coalesce(Investment.risk_level, DEFAULT_RISK_LEVEL)
+    source = select(
+        Investment.user_id,
+        Investment.investment_type,
+        risk_level,
+        func.sum(Investment.amount),
+        func.sum(Investment.amount * func.coalesce(Investment.expected_return, 0.0)),
+        func.count(),
+        literal(datetime.utcnow())
+    ).group_by(Investment.user_id, Investment.investment_type, risk_level)
+    clear = delete(PortfolioAggregate)
+    if user_id is not None:
+        source = source.where(Investment.user_id == user_id)
+        clear = clear.where(PortfolioAggregate.user_id == user_id)
+
+    connection.execute(clear)
+    result = connection.execute(insert(PortfolioAggregate).from_select(
+        ['user_id', 'investment_type', 'risk_level', 'total_amount', 'weighted_return_sum',
+         'position_count', 'updated_at'],
+        source
+    ))
+    return result.rowcount
+
+def _group(buckets, total_amount):
+    return {
+        'total_amount': round(buckets['amount'], 2),
+        'expected_return': round(buckets['weighted'] / buckets['amount'], 4) if buckets['amount'] else 0.0,
+        'position_count': buckets['count'],
+        'share': round(buckets['amount'] / total_amount * 100, 2) if total_amount else 0.0
+    }
+
+def portfolio_summary(user_id):
+    """
+    Totais da carteira por tipo e por risco, com o retorno esperado
+    ponderado pelo valor aplicado
+    """
+    aggregates = PortfolioAggregate.query.filter_by(user_id=user_id).all()
+    overall = {'amount': 0.0, 'weighted': 0.0, 'count': 0}
+    by_type = defaultdict(lambda: {'amount': 0.0, 'weighted': 0.0, 'count': 0})
+    by_risk = defaultdict(lambda: {'amount': 0.0, 'weighted': 0.0, 'count': 0})
+    for aggregate in aggregates:
+        for buckets in (overall, by_type[aggregate.investment_type], by_risk[aggregate.risk_level]):
+            buckets['amount'] += aggregate.total_amount
+            buckets['weighted'] += aggregate.weighted_return_sum
+            buckets['count'] += aggregate.position_count
+
+    total_amount = overall['amount']
+    summary = _group(overall, total_amount)
+    del summary['share']
+    summary['by_type'] = {name: _group(buckets, total_amount) for name, buckets in sorted(by_type.items())}
+    summary['by_risk'] = {name: _group(buckets, total_amount) for name, buckets in sorted(by_risk.items())}
+    summary['updated_at'] = max((aggregate.updated_at for aggregate in aggregates), default=None)
+    if summary['updated_at']:
+        summary['updated_at'] = summary['updated_at'].isoformat()
+    return summary
@@ -0,0 +1,369 @@
+"""
+Perfis de requisições e captura de consultas lentas, gravados em disco.
+
+Uma fração das requisições (PROFILE_SAMPLE_RATE, opcionalmente restrita
+às rotas de PROFILE_ROUTES) é perfilada, assim como qualquer requisição
+com o cabeçalho X-Debug-Profile feita com uma chave de DEBUG_ADMIN_KEYS.
+Dois modos:
+
+  cprofile  cProfile na thread da requisição: funções ordenadas pelo
+            tempo acumulado. Só um perfil por vez no processo (o
+            profiler do Python é global); os demais sorteios são pulados.
+  sampling  uma thread lê a pilha da requisição a cada
+            PROFILE_SAMPLING_INTERVAL_MS e conta as pilhas no formato
+            "collapsed" (uma linha por pilha, pronta para flame graphs).
+
+O cabeçalho escolhe o modo (X-Debug-Profile: sampling); o sorteio usa
+PROFILE_MODE. Perfis de requisições mais rápidas que PROFILE_MIN_MS são
+descartados. Com SLOW_QUERY_MS definido, todo comando SQL acima desse
+tempo é gravado com o seu EXPLAIN QUERY PLAN (no SQLite), a rota e o
+usuário; dos parâmetros só ficam a quantidade e os tipos, pois os valores
+podem ser senhas e chaves de acesso.
+
+Os registros são arquivos JSON em PROFILE_DIR; acima de PROFILE_MAX_FILES
+os mais antigos são apagados. A listagem fica em /api/debug/profiles.
+"""
+import cProfile
+import contextvars
+import itertools
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.utils.metrics import current_request_stats
+
+PROFILE_HEADER = 'X-Debug-Profile'
+PROFILE_MODES = ('cprofile', 'sampling')
+RECORD_KINDS = ('profile', 'slow_query')
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'profiles')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 500))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_ROUTES = tuple(route.strip() for route in os.environ.get('PROFILE_ROUTES', '').split(',') if route.strip())
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'cprofile')
+PROFILE_MIN_MS = float(os.environ.get('PROFILE_MIN_MS', 0))
+PROFILE_SAMPLING_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLING_INTERVAL_MS', 5))
+PROFILE_TOP_FUNCTIONS = int(os.environ.get('PROFILE_TOP_FUNCTIONS', 50))
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+DEBUG_ADMIN_KEYS = frozenset(key.strip() for key in os.environ.get('DEBUG_ADMIN_KEYS', '').split(',') if key.strip())
+
+# Comandos com plano de execução (os demais, como PRAGMA, não têm)
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+RECORD_NAME = re.compile(r'^[0-9T]+-(profile|slow_query)-\d+-\d+\.json$')
+MAX_RECORDED_STATEMENTS = 20
+MAX_STACKS = 200
+
+_profiler_lock = threading.Lock()
+_sequence = itertools.count(1)
+_request_info = contextvars.ContextVar('profiling_request', default=None)
+
+def is_admin_key(access_key):
+    if access_key and access_key.startswith('Bearer '):
+        access_key = access_key[7:]
+    return bool(access_key) and access_key in DEBUG_ADMIN_KEYS
+
+def _short_path(filename):
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+# Registros em disco
+
+def write_record(kind, record, directory=None):
+    """
+    Grava um registro e apaga os mais antigos acima de PROFILE_MAX_FILES.
+    Retorna o nome do arquivo.
+    """
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.utcnow()
+    name = f"{now.strftime('%Y%m%dT%H%M%S')}{now.microsecond // 1000:03d}-{kind}-{os.getpid()}-{next(_sequence)}.json"
+    record = {'name': name, 'kind': kind, 'created_at': now.isoformat(), **record}
+    temporary = os.path.join(directory, f'.{name}.tmp')
+    with open(temporary, 'w') as file:
+        json.dump(record, file, default=str)
+    os.replace(temporary, os.path.join(directory, name))
+    rotate(directory)
+    return name
+
+def record_names(directory=None):
+    """
+    Nomes dos registros, do mais recente para o mais antigo
+    """
+    directory = directory or PROFILE_DIR
+    try:
+        names = [name for name in os.listdir(directory) if RECORD_NAME.match(name)]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+def rotate(directory=None, max_files=None):
+    directory = directory or PROFILE_DIR
+    max_files = PROFILE_MAX_FILES if max_files is None else max_files
+    for name in record_names(directory)[max_files:]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+def read_record(name, directory=None):
+    if not RECORD_NAME.match(name):
+        raise ValueError('Invalid record name')
+    with open(os.path.join(directory or PROFILE_DIR, name)) as file:
+        return json.load(file)
+
+# Perfis de requisições
+
+class StackSampler(threading.Thread):
+    """
+    Lê a pilha de uma thread em intervalos fixos e conta as pilhas
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return {
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'stacks': [{'stack': stack, 'count': count} for stack, count in self.stacks.most_common(MAX_STACKS)]
+        }
+
+class RequestProfile:
+    """
+    Perfil de uma requisição, com os comandos SQL mais lentos que ela executou
+    """
+
+    def __init__(self, mode, trigger):
+        self.mode = mode
+        self.trigger = trigger
+        self.statements = []
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._sampler = None
+
+    def start(self):
+        if self.mode == 'cprofile':
+            if not _profiler_lock.acquire(blocking=False):
+                return False
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLING_INTERVAL_MS / 1000)
+            self._sampler.start()
+        return True
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            _profiler_lock.release()
+            return {'functions': self._top_functions()}
+        return self._sampler.stop()
+
+    def add_statement(self, statement, seconds):
+        with self._lock:
+            self.statements.append({'statement': statement, 'duration_ms': round(seconds * 1000, 3)})
+            self.statements.sort(key=lambda item: item['duration_ms'], reverse=True)
+            del self.statements[MAX_RECORDED_STATEMENTS:]
+
+    def _top_functions(self):
+        stats = pstats.Stats(self._profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        return [
+            {
+                'function': f'{function} ({_short_path(filename)}:{line})',
+                'primitive_calls': primitive_calls,
+                'calls': calls,
+                'total_ms': round(total * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3)
+            }
+            for (filename, line, function), (primitive_calls, calls, total, cumulative, _) in rows
+        ]
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+def _current_user_id():
+    user = getattr(request, 'current_user', None)
+    return user.id if user is not None else None
+
+def choose_profile():
+    """
+    RequestProfile para a requisição atual, ou None se ela não for perfilada
+    """
+    header = request.headers.get(PROFILE_HEADER)
+    if header and is_admin_key(request.headers.get('Authorization')):
+        mode = header.lower() if header.lower() in PROFILE_MODES else PROFILE_MODE
+        return RequestProfile(mode, 'header')
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        if not PROFILE_ROUTES or _route().startswith(PROFILE_ROUTES):
+            return RequestProfile(PROFILE_MODE, 'sample')
+    return None
+
+def _before_request():
+    profile = choose_profile()
+    info = {'method': request.method, 'path': request.path, 'route': _route(), 'profile': None}
+    if profile is not None and profile.start():
+        info['profile'] = profile
+        g.profile_started = time.perf_counter()
+    g.profiling_token = _request_info.set(info)
+
+def _after_request(response):
+    info = _request_info.get()
+    started = g.pop('profile_started', None)
+    if info is None or started is None:
+        return response
+    profile = info['profile']
+    info['profile'] = None
+    result = profile.stop()
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < PROFILE_MIN_MS and profile.trigger == 'sample':
+        return response
+
+    stats = current_request_stats()
+    name = write_record('profile', {
+        'mode': profile.mode,
+        'trigger': profile.trigger,
+        'method': info['method'],
+        'path': info['path'],
+        'route': info['route'],
+        'status': response.status_code,
+        'user_id': _current_user_id(),
+        'duration_ms': round(duration_ms, 3),
+        'sql': {
+            'statements': stats.statements if stats else None,
+            'db_ms': round(stats.db_seconds * 1000, 3) if stats else None,
+            'slowest': profile.statements
+        },
+        **result
+    })
+    response.headers['X-Profile-Id'] = name
+    return response
+
+def _teardown_request(exception=None):
+    info = _request_info.get()
+    if info is not None and info['profile'] is not None:
+        # A resposta não chegou a after_request (exceção): libera o profiler
+        info['profile'].stop()
+        info['profile'] = None
+    token = g.pop('profiling_token', None)
+    if token is not None:
+        try:
+            _request_info.reset(token)
+        except ValueError:
+            _request_info.set(None)
+
+# Consultas lentas
+
+def explain(cursor, statement, parameters):
+    """
+    Plano de execução de um comando SQLite, como lista de linhas
+    """
+    if isinstance(parameters, list):
+        parameters = parameters[0] if parameters else ()
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ())
+        return [{'id': row[0], 'parent': row[1], 'detail': row[3]} for row in plan_cursor.fetchall()]
+    finally:
+        plan_cursor.close()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('profiling_query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('profiling_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    info = _request_info.get()
+    if info is not None and info['profile'] is not None:
+        info['profile'].add_statement(statement, elapsed)
+    if not SLOW_QUERY_MS or elapsed * 1000 < SLOW_QUERY_MS:
+        return
+
+    plan = None
+    if conn.dialect.name == 'sqlite' and _EXPLAINABLE.match(statement):
+        try:
+            plan = explain(cursor, statement, parameters)
+        except Exception as e:
+            plan = {'error': str(e)}
+    write_record('slow_query', {
+        'method': info['method'] if info else None,
+        'path': info['path'] if info else None,
+        'route': info['route'] if info else None,
+        'user_id': _request_user_id(),
+        'duration_ms': round(elapsed * 1000, 3),
+        'statement': statement,
+        'parameters': _describe_parameters(parameters, executemany),
+        'executemany': executemany,
+        'plan': plan
+    })
+
+def _parameter_types(parameters):
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+def _describe_parameters(parameters, executemany):
+    # Nunca os valores: os comandos levam senhas (hash) e chaves de acesso
+    parameters = parameters or ()
+    if executemany:
+        return {'rows': len(parameters), 'types': _parameter_types(parameters[0]) if parameters else []}
+    return {'count': len(parameters), 'types': _parameter_types(parameters)}
+
+def _request_user_id():
+    try:
+        return _current_user_id()
+    except RuntimeError:
+        # Fora de uma requisição (tarefas em segundo plano)
+        return None
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get('profiling_query_start') if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+def init_profiling(app):
+    """
+    Registra os hooks de requisição e os listeners de SQL. Chame depois de
+    init_metrics, para que o EXPLAIN não entre no tempo medido do comando.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,207 @@
+"""
+Cache de resultados de projeção.
+
+A chave é um hash SHA-256 dos parâmetros normalizados, de modo que
+requisições equivalentes (mesmos valores, em qualquer ordem ou formato
+numérico) compartilham o mesmo resultado. O armazenamento é plugável:
+'memory' mantém um LRU no próprio processo; 'sqlite' usa uma tabela
+compartilhada entre os workers do gunicorn. Ambos têm tamanho limitado
+e descartam as entradas menos usadas recentemente.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'projection_cache.db')
+
+def normalize_params(params):
+    """
+    Normaliza os parâmetros: números viram float arredondado. Textos
+    ficam como vieram, já que project_cash_flow os valida sem normalizar
+    (senão 'Monthly' acertaria o cache de 'monthly', mas daria 400 fora dele)
+    """
+    normalized = {}
+    for key, value in params.items():
+        if isinstance(value, bool) or value is None:
+            normalized[key] = value
+        elif isinstance(value, (int, float)):
+            normalized[key] = round(float(value), 8)
+        else:
+            normalized[key] = str(value)
+    return normalized
+
+def make_key(params):
+    canonical = json.dumps(normalize_params(params), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class MemoryBackend:
+    """
+    LRU em memória, local a cada processo
+    """
+    name = 'memory'
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Grava o valor e retorna quantas entradas foram descartadas
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteBackend:
+    """
+    LRU em uma tabela SQLite, compartilhada entre processos
+    """
+    name = 'sqlite'
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS projection_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_projection_cache_last_access '
+                'ON projection_cache (last_access)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connection()
+        row = connection.execute('SELECT value FROM projection_cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE projection_cache SET last_access = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """
+        Grava o valor e retorna quantas entradas foram descartadas
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT OR REPLACE INTO projection_cache (key, value, last_access) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time())
+            )
+            excess = connection.execute('SELECT COUNT(*) FROM projection_cache').fetchone()[0] - self.max_entries
+            if excess <= 0:
+                return 0
+            cursor = connection.execute(
+                'DELETE FROM projection_cache WHERE key IN '
+                '(SELECT key FROM projection_cache ORDER BY last_access LIMIT ?)',
+                (excess,)
+            )
+            return cursor.rowcount
+
+    def clear(self):
+        self._connection().execute('DELETE FROM projection_cache')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM projection_cache').fetchone()[0]
+
+class ProjectionCache:
+    """
+    Memoização de projeções com contadores de acertos, falhas e descartes
+    (contados por processo)
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, params, compute):
+        """
+        Retorna o resultado em cache para `params` ou chama `compute()` e
+        guarda o resultado, que precisa ser serializável em JSON
+        """
+        key = make_key(params)
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        value = compute()
+        evicted = self.backend.set(key, value)
+        with self._lock:
+            self.misses += 1
+            self.evictions += evicted
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend.name,
+                'entries': len(self.backend),
+                'max_entries': self.backend.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+def create_projection_cache():
+    """
+    Cria o cache a partir de PROJECTION_CACHE_BACKEND ('memory' ou 'sqlite'),
+    PROJECTION_CACHE_SIZE e PROJECTION_CACHE_PATH
+    """
+    backend_name = os.environ.get('PROJECTION_CACHE_BACKEND', 'memory').lower()
+    max_entries = int(os.environ.get('PROJECTION_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+    if backend_name == 'sqlite':
+        backend = SQLiteBackend(os.environ.get('PROJECTION_CACHE_PATH', DEFAULT_SQLITE_PATH), max_entries)
+    elif backend_name == 'memory':
+        backend = MemoryBackend(max_entries)
+    else:
+        raise ValueError(f'Unknown projection cache backend: {backend_name}')
+    return ProjectionCache(backend)
+
+projection_cache = create_projection_cache()
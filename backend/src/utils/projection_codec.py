@@ -0,0 +1,75 @@
+"""
+Codificação binária das séries de uma projeção.
+
+As linhas da projeção (uma por período) são guardadas em colunas: um
+array float64 little-endian por campo, concatenados após um cabeçalho
+JSON curto com os nomes dos campos e o número de linhas. O conteúdo
+pode ser comprimido com zlib.
+
+Layout: MAGIC (4 bytes) | flags (1 byte) | tamanho do cabeçalho (uint32) |
+cabeçalho JSON | arrays (comprimidos se flags & FLAG_ZLIB)
+"""
+import json
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b'CFP1'
+FLAG_ZLIB = 0x01
+DTYPE = np.dtype('<f8')
+_PREFIX = struct.Struct('<4sBI')
+
+# Campos que identificam o período e voltam como inteiros
+INDEX_FIELDS = ('year', 'month')
+
+def encode_projection(rows, compress=True):
+    """
+    Codifica uma lista de dicts com os mesmos campos numéricos
+    """
+    fields = list(rows[0]) if rows else []
+    columns = np.array([[row[field] for field in fields] for row in rows], dtype=DTYPE).reshape(len(rows), len(fields))
+    payload = np.ascontiguousarray(columns.T).tobytes()
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 6)
+        flags |= FLAG_ZLIB
+    header = json.dumps({'fields': fields, 'rows': len(rows)}, separators=(',', ':')).encode('utf-8')
+    return _PREFIX.pack(MAGIC, flags, len(header)) + header + payload
+
+def decode_columns(blob):
+    """
+    Decodifica para um dicionário campo -> array NumPy
+    """
+    magic, flags, header_size = _PREFIX.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError('Invalid projection encoding')
+    offset = _PREFIX.size
+    header = json.loads(blob[offset:offset + header_size])
+    payload = blob[offset + header_size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    values = np.frombuffer(payload, dtype=DTYPE).reshape(len(header['fields']), header['rows'])
+    return dict(zip(header['fields'], values))
+
+def decode_projection(blob):
+    """
+    Decodifica de volta para a lista de dicts original
+    """
+    columns = decode_columns(blob)
+    fields = list(columns)
+    values = [
+        columns[field].astype(int).tolist() if field in INDEX_FIELDS else columns[field].tolist()
+        for field in fields
+    ]
+    return [dict(zip(fields, row)) for row in zip(*values)]
+
+def summarize_projection(rows):
+    """
+    Horizonte (em anos) e saldo acumulado final, guardados junto da projeção
+    para listagens que não precisam das séries
+    """
+    if not rows:
+        return 0, None
+    last = rows[-1]
+    horizon_years = last['year'] if 'year' in last else -(-last.get('month', len(rows)) // 12)
+    return horizon_years, last.get('accumulated_savings')
@@ -0,0 +1,154 @@
+"""
+Motor de projeção de fluxo de caixa.
+
+As séries são calculadas de forma vetorizada com NumPy: os fatores de
+crescimento (inflação e juros compostos) saem de fórmulas fechadas,
+calculadas uma única vez como arrays, em vez de um laço por ano.
+Todos os parâmetros numéricos aceitam escalares ou arrays, de modo que
+vários cenários podem ser avaliados de uma vez por broadcasting; o eixo
+dos períodos é sempre o último.
+"""
+import numpy as np
+
+MAX_PROJECTION_YEARS = 100
+
+# Períodos de capitalização por ano
+COMPOUNDING_PERIODS = {
+    'yearly': 1,
+    'monthly': 12
+}
+
+RESOLUTIONS = ('yearly', 'monthly')
+
+# Séries devolvidas por project_cash_flow (além de 'period')
+SERIES_FIELDS = (
+    'income',
+    'expenses',
+    'savings',
+    'accumulated_savings',
+    'net_cash_flow',
+    'real_accumulated_savings',
+    'real_net_cash_flow'
+)
+
+def periodic_rate(annual_rate, periods_per_year):
+    """
+    Converte uma taxa anual efetiva na taxa equivalente por período
+    """
+    return np.power(1.0 + annual_rate, 1.0 / periods_per_year) - 1.0
+
+def annuity_due_factor(rate, periods):
+    """
+    Fator de valor futuro de aportes unitários feitos no início de cada
+    período: sum((1 + rate) ** k for k in 1..periods)
+    """
+    rate = np.asarray(rate, dtype=float)
+    growth = np.power(1.0 + rate, periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (growth - 1.0) / rate * (1.0 + rate)
+    return np.where(rate == 0, periods * np.ones_like(factor), factor)
+
+def _as_param(value):
+    # Acrescenta o eixo dos períodos para permitir broadcasting por cenário
+    return np.asarray(value, dtype=float)[..., np.newaxis]
+
+def project_cash_flow(years, monthly_income=0.0, monthly_expenses=0.0, monthly_savings=0.0,
+                      inflation_rate=0.045, investment_return=0.10,
+                      compounding='yearly', resolution='yearly'):
+    """
+    Projeta renda, gastos e poupança acumulada ao longo de `years` anos.
+
+    Taxas são frações anuais efetivas (0.045 = 4,5% a.a.). Renda e gastos
+    acompanham a inflação; os aportes mensais são fixos e capitalizados no
+    início de cada período. Com compounding='yearly' o resultado reproduz o
+    cálculo anual original; com 'monthly' os aportes e a inflação são
+    aplicados mês a mês. As séries reais são deflacionadas pela inflação
+    acumulada até o fim de cada período.
+
+    Retorna um dicionário com 'period' (1..N) e os arrays de SERIES_FIELDS,
+    com formato (*formato_dos_parâmetros, N).
+    """
+    years = int(years)
+    if years < 1 or years > MAX_PROJECTION_YEARS:
+        raise ValueError(f'years must be between 1 and {MAX_PROJECTION_YEARS}')
+    if compounding not in COMPOUNDING_PERIODS:
+        raise ValueError(f'compounding must be one of: {", ".join(COMPOUNDING_PERIODS)}')
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'resolution must be one of: {", ".join(RESOLUTIONS)}')
+    if resolution == 'monthly' and compounding != 'monthly':
+        raise ValueError('monthly resolution requires monthly compounding')
+
+    periods_per_year = COMPOUNDING_PERIODS[compounding]
+    income = _as_param(monthly_income)
+    expenses = _as_param(monthly_expenses)
+    savings = _as_param(monthly_savings)
+    inflation = _as_param(inflation_rate)
+    returns = _as_param(investment_return)
+
+    n_periods = years * periods_per_year
+    t = np.arange(1, n_periods + 1, dtype=float)
+    months_per_period = 12 / periods_per_year
+
+    # Fatores de crescimento calculados uma única vez para todos os períodos
+    inflation_factor = np.power(1.0 + periodic_rate(inflation, periods_per_year), t)
+    savings_factor = annuity_due_factor(periodic_rate(returns, periods_per_year), t)
+
+    shape = np.broadcast_shapes(income.shape, expenses.shape, savings.shape,
+                                inflation.shape, returns.shape, t.shape)
+    contribution = savings * months_per_period
+    series = {
+        'income': income * months_per_period * inflation_factor,
+        'expenses': expenses * months_per_period * inflation_factor,
+        'savings': contribution,
+        'accumulated_savings': contribution * savings_factor
+    }
+    series = {field: np.broadcast_to(values, shape) for field, values in series.items()}
+    inflation_factor = np.broadcast_to(inflation_factor, shape)
+
+    if resolution == 'yearly' and periods_per_year > 1:
+        # Agrega os meses de cada ano; saldos e deflator ficam no fim do ano
+        yearly_shape = shape[:-1] + (years, periods_per_year)
+        for field in ('income', 'expenses', 'savings'):
+            series[field] = series[field].reshape(yearly_shape).sum(axis=-1)
+        series['accumulated_savings'] = series['accumulated_savings'][..., periods_per_year - 1::periods_per_year]
+        inflation_factor = inflation_factor[..., periods_per_year - 1::periods_per_year]
+
+    series['net_cash_flow'] = series['income'] - series['expenses']
+    series['real_accumulated_savings'] = series['accumulated_savings'] / inflation_factor
+    series['real_net_cash_flow'] = series['net_cash_flow'] / inflation_factor
+    series['period'] = np.arange(1, series['net_cash_flow'].shape[-1] + 1)
+    return series
+
+def row_keys(resolution='yearly'):
+    """
+    Nomes das colunas de cada linha da projeção, na ordem de SERIES_FIELDS
+    """
+    prefix = 'annual' if resolution == 'yearly' else 'monthly'
+    index_key = 'year' if resolution == 'yearly' else 'month'
+    return [
+        index_key,
+        f'{prefix}_income',
+        f'{prefix}_expenses',
+        f'{prefix}_savings',
+        'accumulated_savings',
+        'net_cash_flow',
+        'real_accumulated_savings',
+        'real_net_cash_flow'
+    ]
+
+def to_rows(series, resolution='yearly'):
+    """
+    Converte as séries de um único cenário em linhas (dicts) arredondadas
+    em centavos, no formato usado pela API e salvo em CashFlowProjection
+    """
+    columns = [np.round(series[field], 2).tolist() for field in SERIES_FIELDS]
+    keys = row_keys(resolution)
+    return [dict(zip(keys, values)) for values in zip(series['period'].tolist(), *columns)]
+
+def select_scenario(series, index):
+    """
+    Extrai um cenário de uma projeção calculada em lote (eixo 0)
+    """
+    scenario = {field: series[field][index] for field in SERIES_FIELDS}
+    scenario['period'] = series['period']
+    return scenario
@@ -0,0 +1,150 @@
+"""
+Cotações indexadas por símbolo.
+
+Um dicionário símbolo -> cotação resolve cada consulta em O(1), e uma
+lista ordenada com o universo de símbolos negociados permite a busca
+por prefixo (bisect) usada pelo seletor de ativos do frontend. Cada
+cotação guarda quando foi atualizada e de onde veio, para que respostas
+parcialmente atualizadas possam indicar a idade de cada símbolo.
+
+O armazenamento é alimentado pelo cache de mercado (cotações e lista de
+símbolos da brapi) e é local a cada processo, como o próprio cache.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+from src.utils.market_cache import market_cache
+
+MAX_BATCH_SYMBOLS = 500
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Acima disso é mais barato reordenar a lista inteira do que inserir um a um
+_BULK_INSERT_THRESHOLD = 64
+
+def normalize_symbol(symbol):
+    return str(symbol).strip().upper()
+
+class QuoteStore:
+
+    def __init__(self, max_age=60.0, clock=time.time):
+        self.max_age = max_age
+        self._clock = clock
+        self._quotes = {}
+        self._symbols = []
+        self._known = set()
+        self._lock = threading.Lock()
+        # Incrementada a cada gravação, para ETags
+        self.version = 0
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def _register(self, symbols):
+        # Copy-on-write: buscas em andamento continuam com a lista anterior
+        new = set(symbols).difference(self._known)
+        if not new:
+            return
+        if len(new) > _BULK_INSERT_THRESHOLD:
+            ordered = sorted(self._known.union(new))
+        else:
+            ordered = list(self._symbols)
+            for symbol in new:
+                insort(ordered, symbol)
+        self._known.update(new)
+        self._symbols = ordered
+
+    def register_symbols(self, symbols):
+        """
+        Acrescenta símbolos ao universo pesquisável, mesmo sem cotação
+        """
+        symbols = [normalize_symbol(symbol) for symbol in symbols if symbol]
+        with self._lock:
+            self._register(symbols)
+
+    def update(self, quotes, updated_at=None, source='brapi'):
+        """
+        Grava cotações no formato da API (symbol, price, change,
+        change_percent). Um 'fetched_at' na própria cotação tem precedência
+        sobre updated_at; sem nenhum dos dois a cotação é sempre antiga.
+        """
+        entries = {}
+        for quote in quotes:
+            quote = dict(quote)
+            fetched_at = quote.pop('fetched_at', updated_at)
+            symbol = normalize_symbol(quote['symbol'])
+            entries[symbol] = ({**quote, 'symbol': symbol}, fetched_at, source)
+        with self._lock:
+            self._register(entries)
+            self._quotes.update(entries)
+            self.version += 1
+        return len(entries)
+
+    def _describe(self, entry, now):
+        quote, updated_at, source = entry
+        age = now - updated_at if updated_at is not None else None
+        return {
+            **quote,
+            'source': source,
+            'updated_at': datetime.fromtimestamp(updated_at).isoformat() if updated_at is not None else None,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'stale': age is None or age >= self.max_age
+        }
+
+    def get(self, symbol):
+        entry = self._quotes.get(normalize_symbol(symbol))
+        return self._describe(entry, self._clock()) if entry else None
+
+    def get_many(self, symbols):
+        """
+        Resolve os símbolos pedidos em O(k). Retorna (cotações com os
+        metadados de atualização, símbolos sem cotação), na ordem pedida.
+        """
+        now = self._clock()
+        quotes = self._quotes
+        found, missing = {}, []
+        for symbol in dict.fromkeys(normalize_symbol(symbol) for symbol in symbols):
+            entry = quotes.get(symbol)
+            if entry is None:
+                missing.append(symbol)
+            else:
+                found[symbol] = self._describe(entry, now)
+        return found, missing
+
+    def quotes(self, symbols=None):
+        """
+        Cotações sem metadados, todas (em ordem de símbolo) ou só as pedidas
+        """
+        if symbols is None:
+            with self._lock:
+                entries = sorted(self._quotes.items())
+            return [quote for _, (quote, _, _) in entries]
+        quotes = self._quotes
+        return [
+            quotes[symbol][0] for symbol in dict.fromkeys(normalize_symbol(symbol) for symbol in symbols)
+            if symbol in quotes
+        ]
+
+    def search(self, prefix, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Símbolos que começam com o prefixo, em ordem alfabética
+        """
+        prefix = normalize_symbol(prefix)
+        with self._lock:
+            symbols = self._symbols
+        results = []
+        index = bisect_left(symbols, prefix)
+        while index < len(symbols) and len(results) < limit and symbols[index].startswith(prefix):
+            symbol = symbols[index]
+            results.append({'symbol': symbol, 'has_quote': symbol in self._quotes})
+            index += 1
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {'symbols': len(self._symbols), 'quotes': len(self._quotes), 'max_age_seconds': self.max_age}
+
+quote_store = QuoteStore(max_age=market_cache.ttls['quotes'])
+market_cache.subscribe('quotes', lambda quotes, fetched_at: quote_store.update(quotes.values(), fetched_at, 'brapi'))
+market_cache.subscribe('symbols', lambda symbols, fetched_at: quote_store.register_symbols(symbols))
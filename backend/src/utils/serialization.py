@@ -0,0 +1,110 @@
+"""
+Serialização rápida das listagens.
+
+Em vez de carregar objetos do ORM e chamar to_dict() em cada um, as
+listagens selecionam só as colunas expostas pela API (list_columns() de
+cada modelo) e recebem tuplas, convertidas em dicts de uma vez. O JSON é
+gerado pelo provider da aplicação: com o orjson instalado (opcional) a
+serialização é feita em C e as datas saem em ISO 8601 direto do
+datetime; sem ele, o provider padrão do Flask é usado e as datas são
+convertidas com isoformat() antes.
+
+JSON_PROVIDER=stdlib força o provider padrão mesmo com o orjson instalado.
+"""
+import json
+import os
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import DateTime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Provider JSON do Flask baseado no orjson. Tipos que o orjson não
+    conhece (Decimal, por exemplo) passam pelo default do Flask. Objetos que
+    ele recusa (inteiros com mais de 64 bits, como a semente gerada pelo
+    monte_carlo) são serializados pelo json da biblioteca padrão.
+    """
+    native_datetimes = True
+
+    def _options(self, **kwargs):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get('sort_keys', self.sort_keys):
+            options |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent') or (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _fallback_default(self, o):
+        # Mesma saída do orjson para datas e arrays do numpy
+        if isinstance(o, date):
+            return o.isoformat()
+        if hasattr(o, 'tolist'):
+            return o.tolist()
+        return self.default(o)
+
+    def _stdlib_dumps(self, obj, **kwargs):
+        indent = 2 if self._options(**kwargs) & orjson.OPT_INDENT_2 else None
+        return json.dumps(obj, default=self._fallback_default, ensure_ascii=False, indent=indent,
+                          separators=(',', ': ') if indent else (',', ':'),
+                          sort_keys=kwargs.get('sort_keys', self.sort_keys))
+
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(**kwargs)).decode()
+        except orjson.JSONEncodeError:
+            return self._stdlib_dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._options())
+        except orjson.JSONEncodeError:
+            body = self._stdlib_dumps(obj).encode()
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+def create_json_provider(app):
+    if orjson is not None and os.environ.get('JSON_PROVIDER', 'auto') != 'stdlib':
+        return OrjsonProvider(app)
+    return DefaultJSONProvider(app)
+
+def _is_datetime(column):
+    return isinstance(getattr(column, 'type', None), DateTime)
+
+class RowSerializer:
+    """
+    Converte tuplas de colunas selecionadas em dicts, com as chaves na
+    ordem das colunas. Datas viram texto ISO, a menos que o provider
+    JSON as serialize nativamente.
+    """
+
+    def __init__(self, columns, native_datetimes=False):
+        self.columns = tuple(columns)
+        self.names = tuple(column.key for column in self.columns)
+        self.datetime_indexes = () if native_datetimes else tuple(
+            index for index, column in enumerate(self.columns) if _is_datetime(column)
+        )
+
+    def row(self, row):
+        if self.datetime_indexes:
+            row = list(row)
+            for index in self.datetime_indexes:
+                value = row[index]
+                row[index] = value.isoformat() if isinstance(value, date) else value
+        return dict(zip(self.names, row))
+
+    def rows(self, rows):
+        names = self.names
+        if not self.datetime_indexes:
+            return [dict(zip(names, row)) for row in rows]
+        return [self.row(row) for row in rows]
+
+def row_serializer(columns, json_provider):
+    return RowSerializer(columns, native_datetimes=getattr(json_provider, 'native_datetimes', False))
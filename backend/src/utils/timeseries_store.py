@@ -0,0 +1,185 @@
+"""
+Armazenamento local de séries históricas (SGS do Banco Central e
+cotações da brapi).
+
+Cada série é guardada em blocos anuais (TimeSeriesChunk) com as datas em
+int32 (dias desde 1970-01-01) e os valores em float64, em vez de uma
+linha por ponto. A sincronização é incremental: só são buscados os
+pontos posteriores ao último já gravado. Consultas por intervalo leem
+apenas os blocos necessários e os agregados mensais/anuais são
+calculados de forma vetorizada.
+"""
+import os
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import func
+from src.models.user import db
+from src.models.market import TimeSeriesChunk
+from src.utils.market_client import BCB_SERIES, market_client
+
+DAY_DTYPE = np.dtype('<i4')
+VALUE_DTYPE = np.dtype('<f8')
+
+# Início do histórico na primeira sincronização de uma série do SGS
+SGS_HISTORY_START = date.fromisoformat(os.environ.get('SGS_HISTORY_START', '2000-01-01'))
+
+RESAMPLE_FREQUENCIES = {'monthly': 'M', 'yearly': 'Y'}
+AGGREGATIONS = ('last', 'first', 'mean', 'sum', 'min', 'max', 'compound')
+
+# Janelas de histórico da brapi, da menor para a maior
+QUOTE_RANGES = (('5d', 5), ('1mo', 30), ('3mo', 90), ('1y', 365), ('5y', 1825), ('max', None))
+
+def resolve_series(name):
+    """
+    Converte um nome da API (selic, ipca, sgs:433, quote:PETR4) na chave
+    armazenada
+    """
+    if name in BCB_SERIES:
+        return f'sgs:{BCB_SERIES[name]}'
+    kind, _, identifier = name.partition(':')
+    if kind == 'sgs' and identifier.isdigit():
+        return f'sgs:{int(identifier)}'
+    if kind == 'quote' and identifier.isalnum():
+        return f'quote:{identifier.upper()}'
+    raise ValueError(f'Unknown series: {name}')
+
+def to_days(dates):
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64).astype(DAY_DTYPE)
+
+def to_iso(days):
+    return np.asarray(days).astype('datetime64[D]').astype(str).tolist()
+
+def last_day(series):
+    return db.session.query(func.max(TimeSeriesChunk.last_day)).filter_by(series=series).scalar()
+
+def load_range(series, start=None, end=None):
+    """
+    Pontos da série entre `start` e `end` (dias, inclusive): (dias, valores)
+    """
+    query = TimeSeriesChunk.query.filter_by(series=series)
+    if start is not None:
+        query = query.filter(TimeSeriesChunk.last_day >= start)
+    if end is not None:
+        query = query.filter(TimeSeriesChunk.first_day <= end)
+    chunks = query.order_by(TimeSeriesChunk.year).all()
+    if not chunks:
+        return np.empty(0, DAY_DTYPE), np.empty(0, VALUE_DTYPE)
+
+    days = np.concatenate([np.frombuffer(chunk.dates, DAY_DTYPE) for chunk in chunks])
+    values = np.concatenate([np.frombuffer(chunk.values, VALUE_DTYPE) for chunk in chunks])
+    lower = 0 if start is None else np.searchsorted(days, start, side='left')
+    upper = len(days) if end is None else np.searchsorted(days, end, side='right')
+    return days[lower:upper], values[lower:upper]
+
+def append_points(series, days, values):
+    """
+    Grava pontos na série, mesclando com os blocos anuais existentes (em
+    datas repetidas prevalece o valor novo). Não faz commit.
+    """
+    days = np.asarray(days, DAY_DTYPE)
+    values = np.asarray(values, VALUE_DTYPE)
+    years = days.astype('datetime64[D]').astype('datetime64[Y]').astype(int) + 1970
+
+    for year in np.unique(years):
+        in_year = years == year
+        chunk = TimeSeriesChunk.query.filter_by(series=series, year=int(year)).first()
+        if chunk is None:
+            chunk = TimeSeriesChunk(series=series, year=int(year))
+            db.session.add(chunk)
+            merged_days, merged_values = days[in_year], values[in_year]
+        else:
+            merged_days = np.concatenate([np.frombuffer(chunk.dates, DAY_DTYPE), days[in_year]])
+            merged_values = np.concatenate([np.frombuffer(chunk.values, VALUE_DTYPE), values[in_year]])
+
+        # np.unique mantém a primeira ocorrência: invertendo, o valor novo vence
+        unique_days, index = np.unique(merged_days[::-1], return_index=True)
+        unique_values = merged_values[::-1][index]
+
+        chunk.dates = unique_days.astype(DAY_DTYPE).tobytes()
+        chunk.values = unique_values.astype(VALUE_DTYPE).tobytes()
+        chunk.first_day = int(unique_days[0])
+        chunk.last_day = int(unique_days[-1])
+        chunk.count = len(unique_days)
+
+def resample(days, values, frequency='monthly', how='last'):
+    """
+    Agrega pontos (ordenados por data) por mês ou ano. 'compound' acumula
+    taxas percentuais: (prod(1 + v/100) - 1) * 100.
+    Retorna (rótulos dos períodos, valores).
+    """
+    if frequency not in RESAMPLE_FREQUENCIES:
+        raise ValueError(f'resample must be one of: {", ".join(RESAMPLE_FREQUENCIES)}')
+    if how not in AGGREGATIONS:
+        raise ValueError(f'how must be one of: {", ".join(AGGREGATIONS)}')
+    if len(days) == 0:
+        return [], np.empty(0, VALUE_DTYPE)
+
+    periods = np.asarray(days).astype('datetime64[D]').astype(f'datetime64[{RESAMPLE_FREQUENCIES[frequency]}]')
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+
+    if how == 'last':
+        aggregated = values[ends - 1]
+    elif how == 'first':
+        aggregated = values[starts]
+    elif how == 'sum':
+        aggregated = np.add.reduceat(values, starts)
+    elif how == 'mean':
+        aggregated = np.add.reduceat(values, starts) / (ends - starts)
+    elif how == 'min':
+        aggregated = np.minimum.reduceat(values, starts)
+    elif how == 'max':
+        aggregated = np.maximum.reduceat(values, starts)
+    else:
+        aggregated = (np.multiply.reduceat(1 + values / 100, starts) - 1) * 100
+    return periods[starts].astype(str).tolist(), aggregated
+
+def trailing_compound(values, periods=12):
+    """
+    Taxa acumulada dos últimos `periods` pontos de uma série percentual
+    (ex.: IPCA em 12 meses)
+    """
+    if periods < 1:
+        raise ValueError('periods must be at least 1')
+    if len(values) < periods:
+        raise ValueError(f'At least {periods} points are required')
+    return float((np.prod(1 + values[-periods:] / 100) - 1) * 100)
+
+def _quote_range(days_missing):
+    for history_range, days in QUOTE_RANGES:
+        if days is None or days_missing <= days:
+            return history_range
+
+def sync_series(series, api_key=None, today=None):
+    """
+    Busca no provedor apenas os pontos posteriores ao último gravado e os
+    acrescenta à série. Retorna o número de pontos novos.
+    """
+    today = today or date.today()
+    last = last_day(series)
+    last_date = date(1970, 1, 1) + timedelta(days=last) if last is not None else None
+    kind, _, identifier = series.partition(':')
+
+    if kind == 'sgs':
+        start = last_date + timedelta(days=1) if last_date else SGS_HISTORY_START
+        if start > today:
+            return 0
+        points = market_client.fetch_bcb_range(int(identifier), start, today)
+        dates = [f'{point["data"][6:]}-{point["data"][3:5]}-{point["data"][:2]}' for point in points]
+        values = [float(point['valor']) for point in points]
+    else:
+        history_range = _quote_range((today - last_date).days) if last_date else 'max'
+        history = market_client.fetch_quote_history(identifier, api_key, history_range)
+        dates = [day for day, _ in history]
+        values = [close for _, close in history]
+
+    days = to_days(dates)
+    values = np.asarray(values, VALUE_DTYPE)
+    if last is not None:
+        new = days > last
+        days, values = days[new], values[new]
+    if len(days):
+        order = np.argsort(days, kind='stable')
+        append_points(series, days[order], values[order])
+        db.session.commit()
+    return int(len(days))
@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Adicionar o diretório do backend ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Banco e cache de mercado temporários, sem a atualização em segundo plano
+DATA_DIR = tempfile.mkdtemp(prefix='backend-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(DATA_DIR, 'app.db')}")
+os.environ.setdefault('MARKET_CACHE_PATH', os.path.join(DATA_DIR, 'market_cache.db'))
+os.environ.setdefault('MARKET_REFRESHER', '0')
+os.environ.setdefault('JOB_WORKERS', '0')
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth_headers(client):
+    username = uuid.uuid4().hex[:8]
+    response = client.post('/api/auth/register', json={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': 'secret'
+    })
+    return {'Authorization': f"Bearer {response.json['user']['access_key']}"}
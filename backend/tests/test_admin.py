@@ -0,0 +1,11 @@
+import pytest
+
+@pytest.mark.parametrize('path', ['/api/auth/cache', '/api/financial/projections/cache', '/api/market/cache', '/api/jobs/stats'])
+def test_cache_stats_require_admin(client, auth_headers, path):
+    assert client.get(path, headers=auth_headers).status_code == 403
+
+def test_cache_stats_for_admin(client, auth_headers, monkeypatch):
+    from src.utils import profiling
+    key = auth_headers['Authorization'][7:]
+    monkeypatch.setattr(profiling, 'DEBUG_ADMIN_KEYS', {key})
+    assert client.get('/api/auth/cache', headers=auth_headers).status_code == 200
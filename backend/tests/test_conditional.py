@@ -0,0 +1,39 @@
+import uuid
+from src.models.financial import ResourceVersion
+
+def test_not_modified_echoes_the_encoded_etag(client, auth_headers):
+    etag = client.get('/api/financial/expenses', headers=auth_headers).headers['ETag'].strip('"')
+
+    response = client.get('/api/financial/expenses', headers={**auth_headers, 'If-None-Match': f'"{etag}-gzip"'})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == f'"{etag}-gzip"'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    response = client.get('/api/financial/expenses', headers={**auth_headers, 'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == f'"{etag}"'
+    assert 'Vary' not in response.headers
+
+def test_market_routes_use_weak_etags(client, auth_headers):
+    response = client.get('/api/market/interest-rates', headers=auth_headers)
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    response = client.get('/api/market/interest-rates', headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+def test_delete_user_removes_resource_versions(app, client):
+    username = uuid.uuid4().hex[:8]
+    user_id = client.post('/api/auth/register', json={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': 'secret'
+    }).json['user']['id']
+    client.put(f'/api/users/{user_id}', json={'username': f'{username}-renamed'})
+    with app.app_context():
+        assert ResourceVersion.query.filter_by(user_id=user_id).count() > 0
+
+    assert client.delete(f'/api/users/{user_id}').status_code == 204
+    with app.app_context():
+        assert ResourceVersion.query.filter_by(user_id=user_id).count() == 0
@@ -0,0 +1,22 @@
+from src.routes import dashboard
+
+def test_dashboard_is_conditional(client, auth_headers):
+    response = client.get('/api/dashboard?sections=profile,expenses', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['errors'] == {}
+
+    response = client.get('/api/dashboard?sections=profile,expenses',
+                          headers={**auth_headers, 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+def test_dashboard_with_failed_sections_is_not_cached(client, auth_headers, monkeypatch):
+    def failing(user_id):
+        raise RuntimeError('database is locked')
+    monkeypatch.setitem(dashboard.DB_SECTIONS, 'profile', failing)
+    monkeypatch.setitem(dashboard.SECTIONS, 'profile', failing)
+
+    response = client.get('/api/dashboard?sections=profile,expenses', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['errors'] == {'profile': 'database is locked'}
+    assert 'ETag' not in response.headers
+    assert response.headers['Cache-Control'] == 'no-store'
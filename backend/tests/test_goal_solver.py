@@ -0,0 +1,45 @@
+import warnings
+import pytest
+from src.utils.goal_solver import parse_goal, solve_goals
+
+@pytest.mark.parametrize('goal', [
+    {'solve': 'savings', 'target': float('nan'), 'years': 10},
+    {'solve': 'savings', 'target': 'inf', 'years': 10},
+    {'solve': 'savings', 'target': 1e6, 'years': float('nan')},
+    {'solve': 'years', 'target': 1e6, 'monthly_savings': float('inf')},
+    {'solve': 'savings', 'target': 1e6, 'years': 10, 'investment_return': float('nan')}
+])
+def test_parse_goal_rejects_non_finite_values(goal):
+    with pytest.raises(ValueError, match='must be finite'):
+        parse_goal(goal)
+
+@pytest.mark.parametrize('rates', [
+    {'investment_return': -100},
+    {'investment_return': -150},
+    {'inflation_rate': -100}
+])
+def test_parse_goal_rejects_rates_at_or_below_minus_100(rates):
+    with pytest.raises(ValueError, match='greater than -100'):
+        parse_goal({'solve': 'savings', 'target': 1e6, 'years': 10, **rates})
+
+def test_parse_goal_accepts_rates_above_minus_100():
+    goal = parse_goal({'solve': 'savings', 'target': 1e6, 'years': 10, 'investment_return': -99.9})
+    assert goal['investment_return'] == pytest.approx(-0.999)
+
+@pytest.mark.parametrize('goal', [
+    {'solve': 'years', 'target': 1e308, 'monthly_savings': 1e300, 'investment_return': 1000},
+    {'solve': 'return', 'target': 1e300, 'years': 100, 'monthly_savings': 1e300},
+    {'solve': 'savings', 'target': 1e300, 'years': 100, 'investment_return': 5000,
+     'inflation_rate': 5000, 'target_basis': 'real'}
+])
+def test_solve_goals_does_not_warn_on_overflow(goal):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        result = solve_goals([parse_goal(goal)])[0]
+    assert isinstance(result['feasible'], bool)
+
+def test_goals_route_rejects_nan_target(client, auth_headers):
+    response = client.post('/api/financial/projections/goals', headers=auth_headers,
+                           json={'goals': [{'solve': 'savings', 'target': 'nan', 'years': 10}]})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'goals[0]: target must be finite'
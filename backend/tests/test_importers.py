@@ -0,0 +1,70 @@
+import io
+import pytest
+from src.routes import financial
+from src.utils.importers import RecordError, _parse_float
+
+@pytest.mark.parametrize('value, expected', [
+    ('1234.56', 1234.56),
+    ('1,234.56', 1234.56),
+    ('1,234,567.89', 1234567.89),
+    ('1.234,56', 1234.56),
+    ('1.234.567,89', 1234567.89),
+    ('1.234.567', 1234567.0),
+    ('12,5', 12.5),
+    ('0.125', 0.125),
+    ('1234,567', 1234.567),
+    ('-1,234.56', -1234.56),
+    (' 99 ', 99.0)
+])
+def test_parse_float_accepts_us_and_brazilian_formats(value, expected):
+    assert _parse_float(value, 'amount') == expected
+
+@pytest.mark.parametrize('value', ['1,234', '1.234', '-12.500'])
+def test_parse_float_rejects_ambiguous_thousands(value):
+    with pytest.raises(RecordError, match='ambiguous'):
+        _parse_float(value, 'amount')
+
+@pytest.mark.parametrize('value, decimal, expected', [
+    ('1,234', '.', 1234.0),
+    ('1,234', ',', 1.234),
+    ('1.234', '.', 1.234),
+    ('1.234', ',', 1234.0),
+    ('1.234,56', ',', 1234.56)
+])
+def test_parse_float_with_explicit_decimal(value, decimal, expected):
+    assert _parse_float(value, 'amount', decimal) == expected
+
+@pytest.mark.parametrize('value', ['abc', 'nan', 'NaN', 'inf', '-inf', 'Infinity', '1e999'])
+def test_parse_float_rejects_text_and_non_finite_values(value):
+    with pytest.raises(RecordError):
+        _parse_float(value, 'amount')
+
+def _upload(content, **fields):
+    return {'file': (io.BytesIO(content.encode()), 'expenses.csv'), **fields}
+
+def test_import_reports_ambiguous_amounts(client, auth_headers):
+    content = 'category,amount\nfood,"1,234"\nrent,"2.500,00"\n'
+    response = client.post('/api/financial/import/expenses', headers=auth_headers, data=_upload(content))
+    assert response.status_code == 200
+    assert response.json['imported'] == 1
+    assert response.json['errors'][0]['row'] == 2
+
+    response = client.post('/api/financial/import/expenses', headers=auth_headers,
+                           data=_upload(content, decimal=','))
+    assert response.json['imported'] == 2
+    assert client.post('/api/financial/import/expenses', headers=auth_headers,
+                       data=_upload(content, decimal='x')).status_code == 400
+
+def test_chunked_import_error_reports_committed_records(client, auth_headers, monkeypatch):
+    def broken_records(stream, file_format):
+        for number in range(1, 6):
+            yield number, {'category': 'food', 'amount': '10'}
+        raise ValueError('Malformed file')
+
+    monkeypatch.setattr(financial, 'IMPORT_BATCH_SIZE', 2)
+    monkeypatch.setattr(financial, 'iter_records', broken_records)
+    response = client.post('/api/financial/import/expenses?transaction=chunked', headers=auth_headers,
+                           data=_upload('category,amount\n'))
+    assert response.status_code == 400
+    assert response.json == {'error': 'Malformed file', 'imported': 4}
+    assert len(client.get('/api/financial/expenses', headers=auth_headers).json) == 4
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete, update
+from src.models.financial import ResourceVersion
+from src.models.job import Job
+from src.models.user import db
+from src.utils.jobs import JobQueue
+
+@pytest.fixture
+def queue(app):
+    queue = JobQueue(workers=0, user_concurrency=1, stale_after=60)
+    queue.register('echo', lambda user_id, params: params)
+    with app.app_context():
+        db.session.execute(delete(Job))
+        db.session.commit()
+        yield queue
+        db.session.rollback()
+
+def test_claim_respects_user_concurrency(queue):
+    first = queue.submit(1001, 'echo', {'n': 1}).id
+    queue.submit(1001, 'echo', {'n': 2})
+    other_user = queue.submit(1002, 'echo', {'n': 3}).id
+
+    assert queue.claim().id == first
+    # A segunda tarefa do usuário 1001 espera a primeira terminar
+    assert queue.claim().id == other_user
+    assert queue.claim() is None
+
+    queue.execute(db.session.get(Job, first))
+    assert queue.claim().params == '{"n": 2}'
+
+def test_reclaimed_job_result_is_discarded(queue):
+    def reclaimed(user_id, params):
+        # Outro worker reivindicou a tarefa enquanto esta rodava
+        db.session.add(ResourceVersion(user_id=user_id, resource='projections', version=1))
+        with db.engine.begin() as connection:
+            connection.execute(update(Job).where(Job.id == job_id).values(claim_token='other-worker'))
+        return {'done': True}
+    queue.register('reclaimed', reclaimed)
+
+    job_id = queue.submit(1099, 'reclaimed', {}).id
+    queue.execute(queue.claim())
+
+    job = db.session.get(Job, job_id)
+    assert job.status == 'running'
+    assert job.claim_token == 'other-worker'
+    assert job.result is None
+    assert db.session.get(ResourceVersion, (1099, 'projections')) is None
+
+def test_recover_requeues_jobs_with_stale_heartbeat(queue):
+    job_id = queue.submit(1001, 'echo', {}).id
+    assert queue.claim().id == job_id
+    assert queue.recover() == 0
+
+    db.session.execute(update(Job).values(heartbeat_at=datetime.utcnow() - timedelta(seconds=120)))
+    db.session.commit()
+    assert queue.recover() == 1
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.claim_token, job.attempts) == ('queued', None, 1)
+    assert queue.claim().attempts == 2
+
+def test_recover_fails_jobs_after_max_attempts(queue):
+    queue.max_attempts = 1
+    job_id = queue.submit(1001, 'echo', {}).id
+    queue.claim()
+    db.session.execute(update(Job).values(heartbeat_at=datetime.utcnow() - timedelta(seconds=120)))
+    db.session.commit()
+
+    assert queue.recover() == 1
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.error) == ('failed', 'Worker lost')
+
+@pytest.mark.parametrize('body, error', [
+    ({'kind': 'unknown'}, 'kind must be one of'),
+    ({'kind': 'monte_carlo', 'params': {'years': 10, 'paths': 0}}, 'paths must be between'),
+    ({'kind': 'monte_carlo', 'params': {'years': 10, 'seed': -1}}, 'seed must be a non-negative integer'),
+    ({'kind': 'monte_carlo', 'params': {'return_distribution': 'cauchy'}}, 'return_distribution must be one of'),
+    ({'kind': 'monte_carlo', 'params': {'inflation_volatility': -1}}, 'inflation_volatility must not be negative'),
+    ({'kind': 'projection_batch', 'params': {}}, 'Either grid or scenarios is required'),
+    ({'kind': 'cash_flow', 'params': {'years': 'ten'}}, '')
+])
+def test_submit_rejects_invalid_jobs(client, auth_headers, body, error):
+    response = client.post('/api/jobs', headers=auth_headers, json=body)
+    assert response.status_code == 400
+    assert error in response.json['error']
+    assert client.get('/api/jobs', headers=auth_headers).json == []
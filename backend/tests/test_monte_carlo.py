@@ -0,0 +1,18 @@
+import json
+
+def test_unseeded_monte_carlo(client, auth_headers):
+    response = client.post('/api/financial/projections/monte-carlo', headers=auth_headers,
+                           json={'years': 5, 'paths': 100, 'monthly_savings': 1000})
+    assert response.status_code == 200
+    # Decodificado com o json da biblioteca padrão: o orjson lê inteiros
+    # acima de 64 bits como float
+    simulation = json.loads(response.get_data())['simulation']
+    assert isinstance(simulation['seed'], int)
+    assert simulation['years'] == [1, 2, 3, 4, 5]
+
+def test_unseeded_monte_carlo_is_reproducible(client, auth_headers):
+    body = {'years': 5, 'paths': 100}
+    first = client.post('/api/financial/projections/monte-carlo', headers=auth_headers, json=body).json
+    seed = first['simulation']['seed']
+    again = client.post('/api/financial/projections/monte-carlo', headers=auth_headers, json={**body, 'seed': seed}).json
+    assert again['simulation'] == first['simulation']
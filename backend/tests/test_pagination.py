@@ -0,0 +1,14 @@
+def test_next_link_keeps_query_arguments(client, auth_headers):
+    for years in (1, 2, 3):
+        client.post('/api/financial/projections/cash-flow', headers=auth_headers, json={'years': years})
+
+    response = client.get('/api/financial/projections?view=summary&limit=2', headers=auth_headers)
+    assert response.status_code == 200
+    link = response.headers['Link']
+    assert 'view=summary' in link and 'limit=2' in link and f"after={response.headers['X-Next-After']}" in link
+
+    next_url = link[link.index('<') + 1:link.index('>')]
+    page = client.get(next_url, headers=auth_headers).json
+    assert len(page) == 1
+    assert 'projection_data' not in page[0]
+    assert 'Link' not in client.get(next_url, headers=auth_headers).headers
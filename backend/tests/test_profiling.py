@@ -0,0 +1,26 @@
+from src.utils import profiling
+
+def test_slow_query_capture_is_off_by_default():
+    assert profiling.SLOW_QUERY_MS == 0
+
+def test_slow_queries_do_not_record_parameter_values(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'SLOW_QUERY_MS', 1e-9)
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+
+    response = client.post('/api/auth/register', json={
+        'username': 'slowquery',
+        'email': 'slowquery@example.com',
+        'password': 'hunter2-secret'
+    })
+    access_key = response.json['user']['access_key']
+    client.get('/api/auth/profile', headers={'Authorization': f'Bearer {access_key}'})
+
+    names = profiling.record_names(str(tmp_path))
+    assert names
+    for name in names:
+        record = profiling.read_record(name, str(tmp_path))
+        assert set(record['parameters']) in ({'count', 'types'}, {'rows', 'types'})
+        contents = (tmp_path / name).read_text()
+        assert access_key not in contents
+        assert 'hunter2-secret' not in contents
+        assert 'slowquery@example.com' not in contents
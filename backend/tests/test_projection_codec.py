@@ -0,0 +1,80 @@
+import json
+import pytest
+from sqlalchemy import create_engine, text
+from src.models.migrations import add_projection_blob
+from src.utils.projection_codec import MAGIC, decode_columns, decode_projection, encode_projection, summarize_projection
+from src.utils.projection_engine import project_cash_flow, to_rows
+
+YEARLY_ROWS = to_rows(project_cash_flow(5, monthly_income=8000, monthly_expenses=5000, monthly_savings=1500,
+                                        inflation_rate=0.045, investment_return=0.10))
+MONTHLY_ROWS = to_rows(project_cash_flow(2, monthly_savings=1000, investment_return=0.10, inflation_rate=0.045,
+                                         compounding='monthly', resolution='monthly'), resolution='monthly')
+
+@pytest.mark.parametrize('compress', [True, False])
+@pytest.mark.parametrize('rows', [YEARLY_ROWS, MONTHLY_ROWS], ids=['yearly', 'monthly'])
+def test_round_trip(rows, compress):
+    blob = encode_projection(rows, compress=compress)
+    assert blob.startswith(MAGIC)
+    decoded = decode_projection(blob)
+    assert decoded == rows
+    index = 'year' if 'year' in rows[0] else 'month'
+    assert all(type(row[index]) is int for row in decoded)
+
+def test_compressed_and_uncompressed_decode_the_same():
+    assert decode_projection(encode_projection(YEARLY_ROWS, compress=True)) == \
+        decode_projection(encode_projection(YEARLY_ROWS, compress=False))
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_empty_rows(compress):
+    blob = encode_projection([], compress=compress)
+    assert decode_projection(blob) == []
+    assert decode_columns(blob) == {}
+    assert summarize_projection([]) == (0, None)
+
+def test_invalid_blob():
+    with pytest.raises(ValueError):
+        decode_projection(b'XXXX' + encode_projection(YEARLY_ROWS)[4:])
+
+def test_summary():
+    assert summarize_projection(YEARLY_ROWS) == (5, YEARLY_ROWS[-1]['accumulated_savings'])
+    assert summarize_projection(MONTHLY_ROWS) == (2, MONTHLY_ROWS[-1]['accumulated_savings'])
+
+def _legacy_database(tmp_path, projections):
+    """
+    Banco com a tabela cash_flow_projection anterior à migração 2 (séries em JSON)
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE cash_flow_projection (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, '
+            'projection_name VARCHAR(100), projection_data TEXT, created_at DATETIME)'
+        ))
+        connection.execute(
+            text('INSERT INTO cash_flow_projection (id, user_id, projection_name, projection_data) '
+                 'VALUES (:id, 1, :name, :data)'),
+            [{'id': index + 1, 'name': f'p{index}', 'data': data} for index, data in enumerate(projections)]
+        )
+    return engine
+
+def test_migration_converts_json_projections(tmp_path):
+    projections = [json.dumps(YEARLY_ROWS), json.dumps(MONTHLY_ROWS), json.dumps([]), None]
+    engine = _legacy_database(tmp_path, projections)
+
+    with engine.begin() as connection:
+        add_projection_blob(connection)
+    # Idempotente: rodar de novo não altera nada
+    with engine.begin() as connection:
+        add_projection_blob(connection)
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            'SELECT id, projection_data, projection_blob, horizon_years, final_accumulated_savings '
+            'FROM cash_flow_projection ORDER BY id'
+        )).fetchall()
+
+    for (_, data, blob, horizon, final), expected in zip(rows[:3], (YEARLY_ROWS, MONTHLY_ROWS, [])):
+        assert data is None
+        assert decode_projection(blob) == expected
+        assert (horizon, final) == summarize_projection(expected)
+    # Sem séries salvas: nada a converter
+    assert rows[3][1:] == (None, None, None, None)
@@ -0,0 +1,10 @@
+import json
+from datetime import datetime
+import numpy as np
+
+def test_dumps_falls_back_for_integers_beyond_64_bits(app):
+    # Decodificado com o json da biblioteca padrão: o orjson lê inteiros
+    # acima de 64 bits como float
+    value = 2 ** 100
+    data = json.loads(app.json.dumps({'seed': value, 'at': datetime(2024, 1, 2), 'values': np.arange(2)}))
+    assert data == {'seed': value, 'at': '2024-01-02T00:00:00', 'values': [0, 1]}